@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class ApiConfig(AppConfig):
@@ -7,3 +8,10 @@ class ApiConfig(AppConfig):
 
     def ready(self):
         import api.signals
+        from api.autenticacao import verificar_cache_de_usuarios
+        from api.autocompletar import verificar_cache_do_autocompletar
+        from api.roteamento import verificar_cache_das_replicas
+
+        checks.register(verificar_cache_das_replicas, checks.Tags.caches)
+        checks.register(verificar_cache_de_usuarios, checks.Tags.caches, deploy=True)
+        checks.register(verificar_cache_do_autocompletar, checks.Tags.caches, deploy=True)
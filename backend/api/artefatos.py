@@ -0,0 +1,222 @@
+import contextlib
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem bloqueio entre processos (uso em desenvolvimento)
+    fcntl = None
+
+
+class ArmazemArtefatos:
+    """
+    Guarda modelos de sugestão em disco, em um formato que os workers carregam
+    com memory mapping (arquivos .npy abertos com `mmap_mode='r'`): processos que
+    carregam a mesma versão compartilham as páginas do cache do sistema operacional
+    em vez de manter cópias privadas.
+
+    Cada modelo fica em `<diretorio>/<chave>/`, com uma subpasta por versão e um
+    arquivo `ATUAL` que aponta para a versão vigente. A nova versão é gravada por
+    completo antes de o ponteiro ser trocado com `os.replace`, de modo que os leitores
+    sempre veem uma versão inteira, a antiga ou a nova.
+
+    As alterações pequenas não regravam a versão: vão para o arquivo `DIARIO`, uma
+    linha JSON por alteração, marcada com a versão sobre a qual se aplica. Os leitores
+    aplicam o diário à versão que carregaram.
+
+    Atributos:
+        diretorio (str): Pasta raiz dos artefatos.
+    """
+    PONTEIRO = 'ATUAL'
+    DIARIO = 'DIARIO'
+    VERSOES_MANTIDAS = 2
+
+    def __init__(self, diretorio):
+        self.diretorio = str(diretorio)
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def _pasta(self, chave):
+        return os.path.join(self.diretorio, chave)
+
+    def versao(self, chave):
+        """
+        Parâmetros:
+            chave (str): Identificador do modelo (ex.: 'usuario-42').
+        Returns:
+            str: Versão vigente do modelo, ou None se não houver artefato.
+        """
+        try:
+            with open(os.path.join(self._pasta(chave), self.PONTEIRO)) as arquivo:
+                return arquivo.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    @contextlib.contextmanager
+    def bloqueio(self, chave):
+        """
+        Serializa, entre processos, as escritas no artefato de uma chave.
+
+        Parâmetros:
+            chave (str): Identificador do modelo.
+        """
+        pasta = self._pasta(chave)
+        os.makedirs(pasta, exist_ok=True)
+        with open(os.path.join(pasta, '.lock'), 'w') as arquivo:
+            if fcntl is not None:
+                fcntl.flock(arquivo, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(arquivo, fcntl.LOCK_UN)
+
+    def salvar(self, chave, arrays, meta):
+        """
+        Grava uma nova versão do artefato e a torna vigente atomicamente.
+
+        Parâmetros:
+            chave (str): Identificador do modelo.
+            arrays (dict): Nome -> ndarray.
+            meta (dict): Metadados serializáveis em JSON.
+        Returns:
+            str: Versão gravada.
+        """
+        pasta = self._pasta(chave)
+        os.makedirs(pasta, exist_ok=True)
+        versao = f'v{time.time_ns():x}-{os.getpid()}'
+        temporaria = os.path.join(pasta, f'.{versao}.tmp')
+        os.makedirs(temporaria)
+        for nome, array in arrays.items():
+            np.save(os.path.join(temporaria, f'{nome}.npy'), np.ascontiguousarray(array))
+        with open(os.path.join(temporaria, 'meta.json'), 'w') as arquivo:
+            json.dump(meta, arquivo)
+        os.replace(temporaria, os.path.join(pasta, versao))
+
+        ponteiro = os.path.join(pasta, self.PONTEIRO)
+        with open(ponteiro + '.tmp', 'w') as arquivo:
+            arquivo.write(versao)
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+        os.replace(ponteiro + '.tmp', ponteiro)
+        # As entradas do diário já estão na nova versão (e eram de outra base).
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(os.path.join(pasta, self.DIARIO))
+        self._limpar_versoes(pasta, versao)
+        return versao
+
+    def _limpar_versoes(self, pasta, vigente):
+        """
+        Remove versões antigas. Workers que ainda mapeiam uma versão removida
+        continuam lendo-a normalmente até recarregar (o SO só libera os arquivos depois).
+        """
+        versoes = sorted(n for n in os.listdir(pasta) if n.startswith('v') and n != vigente)
+        for nome in versoes[:max(len(versoes) - (self.VERSOES_MANTIDAS - 1), 0)]:
+            shutil.rmtree(os.path.join(pasta, nome), ignore_errors=True)
+
+    def carregar(self, chave):
+        """
+        Mapeia em memória a versão vigente do artefato.
+
+        Parâmetros:
+            chave (str): Identificador do modelo.
+        Returns:
+            tuple: (versão, arrays, meta), ou None se não houver artefato.
+        """
+        for _ in range(2):
+            versao = self.versao(chave)
+            if versao is None:
+                return None
+            pasta = os.path.join(self._pasta(chave), versao)
+            try:
+                with open(os.path.join(pasta, 'meta.json')) as arquivo:
+                    meta = json.load(arquivo)
+                arrays = {
+                    nome[:-len('.npy')]: np.load(os.path.join(pasta, nome), mmap_mode='r')
+                    for nome in os.listdir(pasta)
+                    if nome.endswith('.npy')
+                }
+            except FileNotFoundError:
+                # A versão foi substituída e removida entre a leitura do ponteiro e a abertura.
+                continue
+            return versao, arrays, meta
+        return None
+
+    def remover(self, chave):
+        """
+        Retira o ponteiro da versão vigente, forçando a reconstrução do modelo.
+
+        Parâmetros:
+            chave (str): Identificador do modelo.
+        """
+        for nome in (self.PONTEIRO, self.DIARIO):
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self._pasta(chave), nome))
+
+    def tamanho_diario(self, chave):
+        """
+        Returns:
+            int: Tamanho em bytes do diário da chave (0 se vazio), que muda a cada alteração registrada.
+        """
+        try:
+            return os.stat(os.path.join(self._pasta(chave), self.DIARIO)).st_size
+        except FileNotFoundError:
+            return 0
+
+    def registrar(self, chave, versao, alteracao):
+        """
+        Acrescenta uma alteração ao diário. Deve ser chamada com o bloqueio da chave.
+
+        Parâmetros:
+            chave (str): Identificador do modelo.
+            versao (str): Versão vigente, sobre a qual a alteração se aplica.
+            alteracao (object): Alteração serializável em JSON.
+        """
+        with open(os.path.join(self._pasta(chave), self.DIARIO), 'a') as arquivo:
+            arquivo.write(json.dumps({'base': versao, 'alteracao': alteracao}) + '\n')
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+
+    def diario(self, chave, versao):
+        """
+        Parâmetros:
+            chave (str): Identificador do modelo.
+            versao (str): Versão carregada.
+        Returns:
+            list: Alterações registradas sobre a versão, na ordem em que foram feitas.
+        """
+        try:
+            with open(os.path.join(self._pasta(chave), self.DIARIO)) as arquivo:
+                linhas = arquivo.readlines()
+        except FileNotFoundError:
+            return []
+        alteracoes = []
+        for linha in linhas:
+            try:
+                entrada = json.loads(linha)
+            except ValueError:
+                break  # linha ainda sendo gravada
+            if entrada['base'] == versao:
+                alteracoes.append(entrada['alteracao'])
+        return alteracoes
+
+
+_armazem = None
+
+
+def armazem_artefatos():
+    """
+    Returns:
+        ArmazemArtefatos: Armazém configurado em SUGESTOES_ARTEFATOS_DIR, ou None se desativado.
+    """
+    global _armazem
+    diretorio = getattr(settings, 'SUGESTOES_ARTEFATOS_DIR', '')
+    if not diretorio:
+        return None
+    if _armazem is None or _armazem.diretorio != str(diretorio):
+        _armazem = ArmazemArtefatos(diretorio)
+    return _armazem
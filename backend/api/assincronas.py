@@ -0,0 +1,211 @@
+import asyncio
+import functools
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework_simplejwt.exceptions import InvalidToken
+
+from .autenticacao import JWTAuthenticationEmCache
+from .cache_respostas import cache_respostas
+from .models import Category
+from .resumos import consulta_do_resumo, montar_resumo
+from .roteamento import aleitura_em_replica
+from .serializers import CategorySerializer, ResumoPeriodoSerializer
+from .sugestoes import obter_modelo, regras_para_sugestao, sugerir_com_modelo
+from .views import CategoryViewSet, StandardResultsSetPagination, etag_confere
+
+# Views assíncronas nativas das leituras mais frequentes, para quando a aplicação é
+# servida por ASGI (ver VIEWS_ASSINCRONAS). O DRF não tem views assíncronas, então a
+# autenticação JWT, a paginação e as respostas são feitas aqui, no mesmo formato das
+# views síncronas correspondentes.
+
+_autenticacao = JWTAuthenticationEmCache()
+_listar_ou_criar_categorias = sync_to_async(CategoryViewSet.as_view({'get': 'list', 'post': 'create'}))
+
+
+def _json(dados, status=200):
+    """
+    Returns:
+        HttpResponse: Dados renderizados pelo JSONRenderer do DRF (mesma saída das views síncronas).
+    """
+    return HttpResponse(JSONRenderer().render(dados), status=status, content_type='application/json')
+
+
+async def usuario_autenticado(request):
+    """
+    Autentica a requisição pelo token JWT do cabeçalho Authorization, buscando o
+    usuário no cache da autenticação ou com o ORM assíncrono.
+
+    Parâmetros:
+        request (HttpRequest): Requisição recebida.
+    Returns:
+        User: Usuário ativo dono do token, ou None se o token falta ou não vale.
+    """
+    cabecalho = _autenticacao.get_header(request)
+    if cabecalho is None:
+        return None
+    try:
+        bruto = _autenticacao.get_raw_token(cabecalho)
+        if bruto is None:
+            return None
+        return await _autenticacao.aget_user(_autenticacao.get_validated_token(bruto))
+    except (AuthenticationFailed, InvalidToken):
+        return None
+
+
+def autenticada(view):
+    """
+    Decorator das views assíncronas: aceita só GET e exige um token válido
+    (401 no mesmo formato do DRF caso contrário). O usuário fica em `request.user`.
+    """
+    @functools.wraps(view)
+    async def envoltorio(request, *args, **kwargs):
+        if request.method != 'GET':
+            return _json({'detail': f'Método "{request.method}" não é permitido.'}, status=405)
+        user = await usuario_autenticado(request)
+        if user is None:
+            resposta = _json({'detail': 'As credenciais de autenticação não foram fornecidas.'}, status=401)
+            resposta['WWW-Authenticate'] = _autenticacao.authenticate_header(request)
+            return resposta
+        request.user = user
+        return await view(request, *args, **kwargs)
+    return envoltorio
+
+
+async def resposta_condicional(request, nome, parametros, gerar):
+    """
+    Versão assíncrona de `views.resposta_condicional`: `gerar` é uma corrotina.
+    """
+    etag = await cache_respostas.aetag(request.user.id, nome, parametros)
+    if etag_confere(request, etag):
+        resposta = HttpResponse(status=304)
+        resposta['ETag'] = etag
+        return resposta
+    resposta = await gerar()
+    if resposta.status_code == 200:
+        resposta['ETag'] = etag
+    return resposta
+
+
+@autenticada
+async def transaction_summary(request):
+    """
+    Versão assíncrona de `views.transaction_summary`.
+
+    Parâmetros:
+        request (HttpRequest): Query params opcionais `start`, `end` (AAAA-MM-DD) e
+            `granularity` ('month' ou 'week').
+    Returns:
+        HttpResponse: Totais, `by_category` e `series`.
+    """
+    serializer = ResumoPeriodoSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return _json(serializer.errors, status=400)
+    parametros = serializer.validated_data
+    periodo = (parametros.get('start'), parametros.get('end'), parametros['granularity'])
+
+    async def calcular():
+        linhas = [linha async for linha in consulta_do_resumo(request.user, *periodo)]
+        return montar_resumo(linhas, *periodo)
+
+    async def gerar():
+        resumo = await cache_respostas.aobter(request.user.id, 'resumo', parametros, calcular)
+        return _json({**resumo, 'granularity': parametros['granularity']})
+
+    async with aleitura_em_replica(request.user.id):
+        return await resposta_condicional(request, 'resumo', parametros, gerar)
+
+
+@autenticada
+async def sugerir_categorias(request):
+    """
+    Versão assíncrona de `views.sugerir_categorias`. O cálculo de similaridade roda
+    em um executor, sem bloquear o event loop.
+
+    Parâmetros:
+        request (HttpRequest): Query param `q` (descrição).
+    Returns:
+        HttpResponse: Lista com até 3 categorias sugeridas.
+    """
+    descricao = request.GET.get('q', '').strip().lower()
+    if not descricao:
+        return _json([])
+    # Treinar o modelo (só na primeira consulta do usuário) e ler as regras acessam o banco.
+    async with aleitura_em_replica(request.user.id):
+        modelo = await sync_to_async(obter_modelo)(request.user.id)
+        regras = await sync_to_async(regras_para_sugestao)(modelo, request.user.id)
+    sugestoes = await asyncio.get_running_loop().run_in_executor(
+        None, sugerir_com_modelo, modelo, request.user.id, [descricao], 3, regras,
+    )
+    return _json(sugestoes[0])
+
+
+async def _listar(queryset):
+    return [item async for item in queryset]
+
+
+@autenticada
+async def _listar_categorias(request):
+    paginacao = StandardResultsSetPagination()
+    try:
+        pagina = int(request.GET.get(paginacao.page_query_param, 1))
+        if pagina < 1:
+            raise ValueError
+    except ValueError:
+        return _json({'detail': 'Página inválida.'}, status=404)
+    try:
+        tamanho = int(request.GET[paginacao.page_size_query_param])
+        tamanho = min(tamanho, paginacao.max_page_size) if tamanho > 0 else paginacao.page_size
+    except (KeyError, ValueError):
+        tamanho = paginacao.page_size
+
+    async def calcular():
+        categorias = Category.objects.filter(user=request.user).com_gastos_do_mes().order_by('id')
+        inicio = (pagina - 1) * tamanho
+        # A contagem e a página não dependem uma da outra e são disparadas juntas (o ORM
+        # assíncrono ainda as executa na thread da requisição, uma após a outra).
+        total, itens = await asyncio.gather(
+            categorias.acount(), _listar(categorias[inicio:inicio + tamanho]),
+        )
+        if pagina > 1 and inicio >= total:
+            return None
+        url = request.build_absolute_uri()
+        anterior = None
+        if pagina > 1:
+            anterior = remove_query_param(url, 'page') if pagina == 2 else replace_query_param(url, 'page', pagina - 1)
+        return {
+            'count': total,
+            'next': replace_query_param(url, 'page', pagina + 1) if inicio + tamanho < total else None,
+            'previous': anterior,
+            'results': CategorySerializer(itens, many=True).data,
+        }
+
+    async def gerar():
+        dados = await cache_respostas.aobter(request.user.id, 'categorias', parametros, calcular)
+        if dados is None:
+            return _json({'detail': 'Página inválida.'}, status=404)
+        return _json(dados)
+
+    parametros = {'query': sorted(request.GET.lists()), 'hoje': date.today()}
+    return await resposta_condicional(request, 'categorias', parametros, gerar)
+
+
+@csrf_exempt
+async def listar_categorias(request):
+    """
+    Lista as categorias do usuário (versão assíncrona de `CategoryViewSet.list`,
+    com o mesmo cache, ETag e paginação). A criação (POST) segue pela view síncrona.
+
+    Parâmetros:
+        request (HttpRequest): Query params opcionais `page` e `page_size`.
+    Returns:
+        HttpResponse: Página de categorias.
+    """
+    if request.method != 'GET':
+        return await _listar_ou_criar_categorias(request)
+    return await _listar_categorias(request)
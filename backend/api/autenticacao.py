@@ -0,0 +1,135 @@
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .cache_respostas import cache_compartilhado
+
+
+def _cache():
+    return caches[getattr(settings, 'RESPOSTAS_CACHE_ALIAS', 'default')]
+
+
+def _chave(user_id):
+    return f'usuario:{user_id}'
+
+
+def invalidar_usuario(user_id):
+    """
+    Descarta o usuário guardado pela autenticação, agora e de novo após o commit (uma
+    requisição que o leu antes do commit pode tê-lo guardado com os dados antigos).
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+    """
+    _cache().delete(_chave(user_id))
+    transaction.on_commit(lambda: _cache().delete(_chave(user_id)))
+
+
+def verificar_cache_de_usuarios(app_configs, **kwargs):
+    """
+    System check de implantação (`check --deploy`): sem um cache compartilhado, desativar
+    ou excluir um usuário só o descarta do cache do worker que fez a escrita; nos demais,
+    o token continua aceito até o fim de USUARIOS_CACHE_TIMEOUT.
+
+    Returns:
+        list: Aviso `api.W001` se o cache de usuários estiver ativo e não for compartilhado.
+    """
+    if getattr(settings, 'USUARIOS_CACHE_TIMEOUT', 60) > 0 and not cache_compartilhado(_cache()):
+        return [checks.Warning(
+            'O cache de usuários da autenticação JWT não é compartilhado entre os processos: '
+            'um usuário desativado ou excluído segue autenticado nos outros workers por até '
+            'USUARIOS_CACHE_TIMEOUT segundos.',
+            hint='Configure REDIS_URL ou use USUARIOS_CACHE_TIMEOUT=0.',
+            id='api.W001',
+        )]
+    return []
+
+
+class JWTAuthenticationEmCache(JWTAuthentication):
+    """
+    Autenticação JWT que confia no ID do usuário do token já validado e guarda no
+    cache, por alguns segundos (USUARIOS_CACHE_TIMEOUT), só o necessário para
+    autenticar: o ID, se o usuário está ativo e a versão da credencial (o mesmo hash
+    da senha que vai no token). A requisição recebe um usuário com os demais campos
+    adiados, carregados do banco só se forem usados. Salvar ou excluir o usuário
+    (inclusive desativá-lo) o descarta do cache; escritas que não disparam signals,
+    como `QuerySet.update`, e escritas vistas por outro worker sem cache compartilhado
+    só valem ao fim da validade, que é a janela de revogação.
+    """
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'USUARIOS_CACHE_TIMEOUT', 60)
+
+    def _id_do_token(self, validated_token):
+        try:
+            return validated_token[jwt_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+    @staticmethod
+    def _resumo(user):
+        """
+        Returns:
+            dict: O que o cache guarda do usuário (nunca o hash da senha em si).
+        """
+        return {
+            'pk': user.pk,
+            'is_active': user.is_active,
+            'credencial': get_md5_hash_password(user.password) if jwt_settings.CHECK_REVOKE_TOKEN else None,
+        }
+
+    def _verificar(self, resumo, validated_token):
+        """
+        Aplica ao resumo do usuário, vindo do cache ou do banco, as mesmas verificações
+        da `JWTAuthentication`.
+
+        Returns:
+            User: Usuário com só o ID e `is_active` carregados, se ainda pode usar o token.
+        """
+        if resumo is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if jwt_settings.CHECK_USER_IS_ACTIVE and not resumo['is_active']:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if jwt_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(jwt_settings.REVOKE_TOKEN_CLAIM) != resumo['credencial']:
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        # Os demais campos ficam adiados: o Django os lê do banco no primeiro acesso.
+        return self.user_model.from_db(DEFAULT_DB_ALIAS, ['id', 'is_active'], [resumo['pk'], resumo['is_active']])
+
+    def get_user(self, validated_token):
+        """
+        Retorna o usuário do token pelo cache, consultando o banco só na falta dele.
+
+        Parâmetros:
+            validated_token (Token): Token já validado.
+        Returns:
+            User: Usuário autenticado.
+        """
+        user_id = self._id_do_token(validated_token)
+        resumo = _cache().get(_chave(user_id))
+        if resumo is None:
+            user = self.user_model.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).first()
+            if user is not None:
+                resumo = self._resumo(user)
+                _cache().set(_chave(user_id), resumo, timeout=self.timeout)
+        return self._verificar(resumo, validated_token)
+
+    async def aget_user(self, validated_token):
+        """
+        Versão assíncrona de `get_user`, para as views assíncronas.
+        """
+        user_id = self._id_do_token(validated_token)
+        resumo = await _cache().aget(_chave(user_id))
+        if resumo is None:
+            user = await self.user_model.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).afirst()
+            if user is not None:
+                resumo = self._resumo(user)
+                await _cache().aset(_chave(user_id), resumo, timeout=self.timeout)
+        return self._verificar(resumo, validated_token)
@@ -0,0 +1,335 @@
+import bisect
+import heapq
+import re
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import transaction
+
+from .cache_respostas import cache_compartilhado
+from .models import Transaction
+from .sugestoes import CacheModelos
+from .utils import normalizar
+
+# Quantidade máxima de descrições por consulta.
+LIMITE_MAXIMO = 20
+# Prefixos com mais descrições que isto (os curtos, digitados primeiro) têm o ranking
+# guardado, para não percorrer o intervalo inteiro a cada tecla.
+INTERVALO_MAXIMO = 256
+
+
+def _chave(texto):
+    """
+    Returns:
+        str: Texto normalizado, com espaços repetidos reduzidos a um.
+    """
+    return re.sub(r'\s+', ' ', normalizar(texto)).lstrip()
+
+
+class _Entrada:
+    """
+    Estatísticas de uma descrição normalizada: quantas transações a usam e com quais
+    grafias, categorias e valores.
+    """
+    __slots__ = ('quantidade', 'grafias', 'categorias', 'valores')
+
+    def __init__(self):
+        self.quantidade = 0
+        self.grafias = Counter()
+        self.categorias = Counter()
+        self.valores = Counter()
+
+
+class IndiceDescricoes:
+    """
+    Índice de prefixos das descrições já usadas por um usuário: as descrições
+    normalizadas ficam em uma lista ordenada, e as que começam por um prefixo formam
+    um intervalo contíguo encontrado por busca binária, sem consultar o banco.
+    O ranking dos prefixos muito comuns é guardado e ajustado a cada escrita.
+
+    Atributos:
+        contador (int): Valor do contador de escritas do usuário que o índice reflete
+            (None se o índice deixou de valer).
+    """
+
+    def __init__(self):
+        self.contador = None
+        self._chaves = []
+        self._entradas = {}
+        self._nomes = {}
+        self._rankings = {}
+
+    def __len__(self):
+        return len(self._chaves)
+
+    def aprender(self, itens, nomes=None):
+        """
+        Acrescenta transações ao índice.
+
+        Parâmetros:
+            itens (iterable): Tuplas (descrição, categoria, valor).
+            nomes (dict): Nomes das categorias por ID.
+        """
+        self._nomes.update(nomes or {})
+        for descricao, categoria, valor in itens:
+            chave = _chave(descricao)
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                entrada = self._entradas[chave] = _Entrada()
+                bisect.insort(self._chaves, chave)
+            entrada.quantidade += 1
+            self._promover(chave, entrada.quantidade)
+            entrada.grafias[descricao.strip()] += 1
+            entrada.valores[Decimal(str(valor))] += 1
+            if categoria is not None:
+                entrada.categorias[categoria] += 1
+
+    def esquecer(self, itens):
+        """
+        Retira do índice transações alteradas ou removidas.
+
+        Parâmetros:
+            itens (iterable): Tuplas (descrição, categoria, valor) como estavam gravadas.
+        """
+        for descricao, categoria, valor in itens:
+            chave = _chave(descricao)
+            entrada = self._entradas.get(chave)
+            if entrada is None:
+                continue
+            entrada.quantidade -= 1
+            self._rebaixar(chave)
+            entrada.grafias[descricao.strip()] -= 1
+            entrada.valores[Decimal(str(valor))] -= 1
+            if categoria is not None:
+                entrada.categorias[categoria] -= 1
+            if entrada.quantidade <= 0:
+                del self._entradas[chave]
+                del self._chaves[bisect.bisect_left(self._chaves, chave)]
+            else:
+                # Counter.__pos__ descarta as contagens zeradas.
+                entrada.grafias, entrada.valores, entrada.categorias = (
+                    +entrada.grafias, +entrada.valores, +entrada.categorias
+                )
+
+    def _prefixos_guardados(self, chave):
+        if not self._rankings:
+            return []
+        return [chave[:tamanho] for tamanho in range(1, len(chave) + 1) if chave[:tamanho] in self._rankings]
+
+    def _promover(self, chave, quantidade):
+        """
+        Ajusta os rankings guardados dos prefixos da descrição cuja frequência aumentou.
+        """
+        for prefixo in self._prefixos_guardados(chave):
+            ranking = self._rankings[prefixo]
+            ultima = self._entradas[ranking[-1]].quantidade if ranking else 0
+            if chave in ranking or len(ranking) < LIMITE_MAXIMO or quantidade >= ultima:
+                ranking = [c for c in ranking if c != chave] + [chave]
+                ranking.sort(key=lambda c: (-self._entradas[c].quantidade, c))
+                self._rankings[prefixo] = ranking[:LIMITE_MAXIMO]
+
+    def _rebaixar(self, chave):
+        """
+        Descarta os rankings guardados em que a descrição cuja frequência diminuiu
+        aparece (outra descrição, fora do ranking, pode ter passado à frente).
+        """
+        for prefixo in self._prefixos_guardados(chave):
+            if chave in self._rankings[prefixo]:
+                del self._rankings[prefixo]
+
+    def _ranking(self, prefixo, limite):
+        """
+        Returns:
+            list: Descrições normalizadas que começam pelo prefixo, das mais usadas
+            para as menos (empates em ordem alfabética).
+        """
+        if prefixo in self._rankings:
+            return self._rankings[prefixo][:limite]
+        inicio = bisect.bisect_left(self._chaves, prefixo)
+        fim = bisect.bisect_left(self._chaves, prefixo + '\uffff', inicio)
+        guardar = fim - inicio > INTERVALO_MAXIMO
+        melhores = heapq.nsmallest(
+            LIMITE_MAXIMO if guardar else limite, range(inicio, fim),
+            key=lambda posicao: (-self._entradas[self._chaves[posicao]].quantidade, posicao),
+        )
+        ranking = [self._chaves[posicao] for posicao in melhores]
+        if guardar:
+            self._rankings[prefixo] = ranking
+        return ranking[:limite]
+
+    def renomear_categoria(self, categoria, nome):
+        """
+        Atualiza o nome exibido de uma categoria.
+        """
+        if categoria in self._nomes:
+            self._nomes[categoria] = nome
+
+    def remover_categoria(self, categoria):
+        """
+        Retira uma categoria excluída (suas transações ficam sem categoria).
+        """
+        self._nomes.pop(categoria, None)
+        for entrada in self._entradas.values():
+            entrada.categorias.pop(categoria, None)
+
+    def completar(self, prefixo, limite=5):
+        """
+        Retorna as descrições mais usadas que começam pelo prefixo, com a categoria
+        e o valor mais frequentes de cada uma.
+
+        Parâmetros:
+            prefixo (str): Texto digitado (acentos e maiúsculas são ignorados).
+            limite (int): Quantidade máxima de descrições.
+        Returns:
+            list: Dicionários com description, count, category, category_name e value.
+        """
+        prefixo = _chave(prefixo)
+        if not prefixo:
+            return []
+        resultado = []
+        for chave in self._ranking(prefixo, limite):
+            entrada = self._entradas[chave]
+            categoria = entrada.categorias.most_common(1)[0][0] if entrada.categorias else None
+            resultado.append({
+                'description': entrada.grafias.most_common(1)[0][0],
+                'count': entrada.quantidade,
+                'category': categoria,
+                'category_name': self._nomes.get(categoria),
+                'value': entrada.valores.most_common(1)[0][0],
+            })
+        return resultado
+
+
+cache_indices = CacheModelos(getattr(settings, 'AUTOCOMPLETAR_CACHE_TAMANHO', 256))
+
+
+def _cache():
+    return caches[getattr(settings, 'RESPOSTAS_CACHE_ALIAS', 'default')]
+
+
+def verificar_cache_do_autocompletar(app_configs, **kwargs):
+    """
+    System check de implantação (`check --deploy`): o contador de escritas que invalida
+    os índices de cada processo fica no cache; na memória local, os outros workers não
+    veem as escritas e seguem sugerindo descrições antigas.
+
+    Returns:
+        list: Erro `api.E001` se o cache não for compartilhado entre os processos.
+    """
+    if not cache_compartilhado(_cache()):
+        return [checks.Error(
+            'O autocompletar de descrições exige um cache compartilhado entre os processos.',
+            hint='Configure REDIS_URL (ou outro backend compartilhado em CACHES).',
+            id='api.E001',
+        )]
+    return []
+
+
+def _contador(user_id):
+    """
+    Contador de escritas confirmadas do usuário, compartilhado entre os processos pelo
+    backend de cache. Um contador ausente recomeça de um valor novo.
+    """
+    chave = f'autocompletar:escritas:{user_id}'
+    valor = _cache().get(chave)
+    if valor is None:
+        _cache().add(chave, time.time_ns(), timeout=None)
+        valor = _cache().get(chave)
+    return valor
+
+
+def _incrementar(user_id):
+    chave = f'autocompletar:escritas:{user_id}'
+    try:
+        return _cache().incr(chave)
+    except ValueError:
+        _cache().set(chave, time.time_ns(), timeout=None)
+        return None
+
+
+def construir_indice(user_id):
+    """
+    Monta o índice do usuário a partir de todo o seu histórico.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+    Returns:
+        IndiceDescricoes: Índice montado.
+    """
+    indice = IndiceDescricoes()
+    # Lido antes do histórico: uma escrita confirmada durante a leitura invalida o índice.
+    indice.contador = _contador(user_id)
+    linhas = (
+        Transaction.objects.filter(user_id=user_id)
+        .values_list('description', 'category_id', 'value', 'category__name')
+    )
+    itens, nomes = [], {}
+    for descricao, categoria, valor, nome in linhas.iterator(chunk_size=2000):
+        itens.append((descricao, categoria, valor))
+        if categoria is not None:
+            nomes[categoria] = nome
+        if len(itens) == 2000:
+            indice.aprender(itens, nomes)
+            itens = []
+    indice.aprender(itens, nomes)
+    return indice
+
+
+def obter_indice(user_id):
+    """
+    Retorna o índice do usuário pelo cache em memória, remontando-o quando outro
+    processo confirmou escritas que este índice não recebeu.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+    Returns:
+        IndiceDescricoes: Índice do usuário.
+    """
+    return cache_indices.obter(
+        user_id, construir_indice, lambda indice: indice.contador is not None and indice.contador == _contador(user_id),
+    )
+
+
+def atualizar_indice(user_id, funcao):
+    """
+    Agenda, para depois do commit, a contagem da escrita e sua aplicação incremental
+    ao índice em memória deste processo. O índice só recebe a alteração se refletia
+    exatamente a escrita anterior; se outra escrita foi confirmada por outro processo
+    nesse meio tempo, ele deixa de valer e é remontado na próxima consulta.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+        funcao (callable): Função que recebe o índice e o atualiza.
+    """
+    def apos_commit():
+        contador = _incrementar(user_id)
+
+        def atualizar(indice):
+            if indice.contador is None or contador is None or indice.contador + 1 != contador:
+                indice.contador = None
+                return
+            funcao(indice)
+            indice.contador = contador
+
+        cache_indices.atualizar(user_id, atualizar)
+
+    transaction.on_commit(apos_commit)
+
+
+def invalidar_indice(user_id):
+    """
+    Descarta, depois do commit, o índice do usuário em todos os processos. Usada
+    quando o estado anterior da escrita é desconhecido.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+    """
+    def apos_commit():
+        _incrementar(user_id)
+        cache_indices.invalidar(user_id)
+
+    transaction.on_commit(apos_commit)
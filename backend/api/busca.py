@@ -0,0 +1,61 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import F, Q
+
+from .utils import normalizar
+
+# Configuração sem stemming nem stopwords: o texto já chega normalizado (sem acentos
+# e em minúsculas) e cada termo é buscado como prefixo, a cada tecla digitada.
+CONFIGURACAO = 'simple'
+
+
+def palavras_da_busca(texto):
+    """
+    Normaliza o texto digitado e o divide em palavras.
+
+    Parâmetros:
+        texto (str): Texto da busca.
+    Returns:
+        list: Palavras normalizadas (só letras, dígitos e sublinhado).
+    """
+    return re.findall(r'\w+', normalizar(texto))
+
+
+def texto_completo_disponivel(queryset):
+    """
+    Returns:
+        bool: Se o banco da consulta tem busca textual (PostgreSQL, com a coluna
+        `search_vector` mantida por trigger e indexada por GIN).
+    """
+    return connections[queryset.db].vendor == 'postgresql'
+
+
+def buscar_transacoes(queryset, palavras):
+    """
+    Filtra as transações que contêm todas as palavras. No PostgreSQL, usa a busca
+    textual sobre `search_vector` (cada palavra como prefixo, via índice GIN) e ordena
+    por relevância; nos demais bancos, compara a descrição normalizada por substring.
+
+    Parâmetros:
+        queryset (QuerySet): Transações a filtrar.
+        palavras (list): Palavras já normalizadas (ver `palavras_da_busca`).
+    Returns:
+        QuerySet: Transações encontradas.
+    """
+    if not palavras:
+        return queryset
+    if not texto_completo_disponivel(queryset):
+        condicao = Q()
+        for palavra in palavras:
+            condicao &= Q(normalized_description__contains=palavra)
+        return queryset.filter(condicao)
+    consulta = SearchQuery(
+        ' & '.join(f'{palavra}:*' for palavra in palavras), search_type='raw', config=CONFIGURACAO,
+    )
+    return (
+        queryset.filter(search_vector=consulta)
+        .annotate(relevancia=SearchRank(F('search_vector'), consulta))
+        .order_by('-relevancia', '-date', '-id')
+    )
@@ -0,0 +1,198 @@
+import hashlib
+import json
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+
+
+def cache_compartilhado(backend):
+    """
+    Parâmetros:
+        backend (BaseCache): Backend de cache do Django.
+    Returns:
+        bool: Se o que um processo grava é visto pelos demais (falso para a memória
+            local de cada processo e para o cache desativado).
+    """
+    return not isinstance(backend, (LocMemCache, DummyCache))
+
+
+class CacheRespostas:
+    """
+    Cache das respostas de leitura (resumo e categorias) por usuário, guardado no
+    backend de cache do Django (locmem em desenvolvimento e testes, Redis em produção).
+
+    Cada usuário tem uma versão de dados, trocada a cada escrita em suas transações
+    ou categorias. A versão faz parte da chave das respostas: invalidar é apenas
+    incrementá-la, em O(1), e as respostas antigas expiram sozinhas.
+
+    Com a memória local, a escrita atendida por um worker não troca a versão guardada
+    nos demais: ali a versão e as respostas valem no máximo `timeout_local` segundos,
+    o atraso máximo com que os outros workers passam a ver a escrita.
+
+    Atributos:
+        alias (str): Alias do backend em CACHES.
+        timeout (int): Validade das respostas guardadas, em segundos.
+        timeout_local (int): Validade da versão e das respostas quando o backend não é compartilhado.
+        acertos (int): Leituras atendidas pelo cache neste processo.
+        falhas (int): Leituras que precisaram calcular a resposta neste processo.
+    """
+
+    def __init__(self, alias='default', timeout=86400, timeout_local=30):
+        self.alias = alias
+        self.timeout = timeout
+        self.timeout_local = timeout_local
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    @property
+    def _validade_versao(self):
+        return None if cache_compartilhado(self._cache) else self.timeout_local
+
+    @property
+    def _validade_resposta(self):
+        return self.timeout if cache_compartilhado(self._cache) else min(self.timeout, self.timeout_local)
+
+    @staticmethod
+    def _chave_versao(user_id):
+        return f'dados:versao:{user_id}'
+
+    def versao(self, user_id):
+        """
+        Retorna a versão dos dados do usuário. Uma versão ausente (nunca criada ou
+        descartada pelo backend) recomeça de um valor novo, para que respostas guardadas
+        sob versões antigas nunca sejam reaproveitadas.
+
+        Parâmetros:
+            user_id (int): ID do usuário.
+        Returns:
+            int: Versão atual.
+        """
+        versao = self._cache.get(self._chave_versao(user_id))
+        if versao is None:
+            self._cache.add(self._chave_versao(user_id), time.time_ns(), timeout=self._validade_versao)
+            versao = self._cache.get(self._chave_versao(user_id))
+        return versao
+
+    async def aversao(self, user_id):
+        """
+        Versão assíncrona de `versao`, para as views assíncronas.
+        """
+        versao = await self._cache.aget(self._chave_versao(user_id))
+        if versao is None:
+            await self._cache.aadd(self._chave_versao(user_id), time.time_ns(), timeout=self._validade_versao)
+            versao = await self._cache.aget(self._chave_versao(user_id))
+        return versao
+
+    def _incrementar(self, user_id):
+        try:
+            self._cache.incr(self._chave_versao(user_id))
+        except ValueError:
+            self._cache.set(self._chave_versao(user_id), time.time_ns(), timeout=self._validade_versao)
+
+    def invalidar(self, user_id):
+        """
+        Invalida todas as respostas do usuário. A versão é trocada agora e de novo após
+        o commit: uma leitura feita entre as duas trocas (que ainda não vê a escrita)
+        fica guardada sob uma versão já descartada.
+
+        Parâmetros:
+            user_id (int): ID do usuário.
+        """
+        self._incrementar(user_id)
+        transaction.on_commit(lambda: self._incrementar(user_id))
+
+    @staticmethod
+    def _assinatura(parametros):
+        return hashlib.sha1(json.dumps(parametros, sort_keys=True, default=str).encode()).hexdigest()
+
+    def etag(self, user_id, nome, parametros):
+        """
+        Retorna uma ETag forte para a resposta do endpoint, derivada apenas da versão dos
+        dados do usuário e dos parâmetros: muda sempre que a resposta puder mudar, sem
+        consultar o banco.
+
+        Parâmetros:
+            user_id (int): ID do usuário.
+            nome (str): Nome do endpoint.
+            parametros (object): Parâmetros que alteram a resposta (serializáveis em JSON).
+        Returns:
+            str: ETag entre aspas.
+        """
+        return '"%s"' % self._assinatura([user_id, self.versao(user_id), nome, parametros])
+
+    async def aetag(self, user_id, nome, parametros):
+        """
+        Versão assíncrona de `etag`, para as views assíncronas.
+        """
+        return '"%s"' % self._assinatura([user_id, await self.aversao(user_id), nome, parametros])
+
+    def _contar(self, acerto):
+        with self._lock:
+            if acerto:
+                self.acertos += 1
+            else:
+                self.falhas += 1
+
+    def obter(self, user_id, nome, parametros, calcular):
+        """
+        Retorna a resposta guardada para o usuário, o endpoint e os parâmetros na versão
+        atual dos dados, ou a calcula e guarda.
+
+        Parâmetros:
+            user_id (int): ID do usuário.
+            nome (str): Nome do endpoint.
+            parametros (object): Parâmetros que alteram a resposta (serializáveis em JSON).
+            calcular (callable): Função que calcula os dados da resposta.
+        Returns:
+            object: Dados da resposta.
+        """
+        chave = f'resposta:{user_id}:{self.versao(user_id)}:{nome}:{self._assinatura(parametros)}'
+        dados = self._cache.get(chave)
+        self._contar(dados is not None)
+        if dados is None:
+            dados = calcular()
+            self._cache.set(chave, dados, timeout=self._validade_resposta)
+        return dados
+
+    async def aobter(self, user_id, nome, parametros, calcular):
+        """
+        Versão assíncrona de `obter`: `calcular` é uma corrotina.
+        """
+        chave = f'resposta:{user_id}:{await self.aversao(user_id)}:{nome}:{self._assinatura(parametros)}'
+        dados = await self._cache.aget(chave)
+        self._contar(dados is not None)
+        if dados is None:
+            dados = await calcular()
+            await self._cache.aset(chave, dados, timeout=self._validade_resposta)
+        return dados
+
+    def estatisticas(self):
+        """
+        Returns:
+            dict: Acertos, falhas, taxa de acerto e backend do cache.
+        """
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / total if total else 0.0,
+                'backend': type(self._cache).__name__,
+            }
+
+
+cache_respostas = CacheRespostas(
+    getattr(settings, 'RESPOSTAS_CACHE_ALIAS', 'default'),
+    getattr(settings, 'RESPOSTAS_CACHE_TIMEOUT', 86400),
+    getattr(settings, 'RESPOSTAS_CACHE_TIMEOUT_LOCAL', 30),
+)
@@ -0,0 +1,359 @@
+import threading
+from collections import defaultdict
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+
+
+class ClassificadorIncremental:
+    """
+    Classificador Naive Bayes multinomial sobre atributos com hashing, treinado
+    de forma incremental. Todas as descrições recebidas já devem estar normalizadas
+    (ver `api.utils.normalizar` e `Transaction.normalized_description`): cada transação criada, alterada ou removida atualiza só as
+    contagens dos seus próprios termos, sem reprocessar o histórico.
+
+    A pontuação de cada categoria é linear nos termos da descrição, de modo que as
+    contagens são compiladas (sob demanda, após escritas) em uma matriz esparsa de pesos
+    e classificar uma ou várias descrições custa um produto de matrizes proporcional
+    ao número de termos das descrições, não ao tamanho do histórico.
+
+    O modelo compilado pode ser exportado para um artefato em disco e importado de
+    volta por memory mapping (ver `api.artefatos`); nesse caso as contagens só são
+    reconstruídas em memória se o modelo receber uma atualização.
+
+    Atributos:
+        nomes (dict): ID da categoria -> nome.
+        documentos (dict): ID da categoria -> quantidade de transações aprendidas.
+        versao (str): Versão do artefato de onde o modelo foi carregado, se houver.
+    """
+    N_ATRIBUTOS = 2 ** 18
+    ALFA = 1.0
+    FORMATO = 1
+
+    _hasher = HashingVectorizer(
+        n_features=N_ATRIBUTOS,
+        lowercase=False,
+        alternate_sign=False,
+        norm=None,
+    )
+
+    def __init__(self):
+        self.nomes = {}
+        self.documentos = defaultdict(int)
+        self._contagens = defaultdict(lambda: defaultdict(float))
+        self._termos_categoria = defaultdict(float)
+        self._frequencia_termos = defaultdict(float)
+        self._compilado = None
+        self._materializado = True
+        self.versao = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        """
+        Returns:
+            int: Quantidade de transações aprendidas.
+        """
+        return sum(self.documentos.values())
+
+    @classmethod
+    def vetorizar(cls, descricoes):
+        """
+        Converte descrições em vetores esparsos de contagem de termos (hashing).
+
+        Parâmetros:
+            descricoes (list): Textos normalizados a vetorizar.
+        Returns:
+            csr_matrix: Uma linha por descrição.
+        """
+        return cls._hasher.transform(descricoes)
+
+    def _materializar(self):
+        """
+        Reconstrói as contagens a partir da matriz compilada de um modelo importado
+        (n_tc = α·(exp(W_tc) - 1)), para que ele possa voltar a ser atualizado.
+        """
+        if self._materializado:
+            return
+        ids, termos, pesos, _, _ = self._compilado
+        termo_categoria = pesos.tocoo()
+        contagens = np.rint(np.expm1(termo_categoria.data) * self.ALFA)
+        for linha, coluna, valor in zip(termo_categoria.row, termo_categoria.col, contagens):
+            termo = int(termos[linha])
+            self._contagens[ids[coluna]][termo] = float(valor)
+            self._frequencia_termos[termo] += float(valor)
+        self._materializado = True
+
+    @classmethod
+    def tokenizar(cls, descricao):
+        """
+        Parâmetros:
+            descricao (str): Texto normalizado a dividir.
+        Returns:
+            list: Termos normalizados, como vistos pelo vetorizador.
+        """
+        if not hasattr(cls, '_analisador'):
+            cls._analisador = cls._hasher.build_analyzer()
+        return cls._analisador(descricao)
+
+    def _atualizar(self, descricoes, categorias, sinal):
+        self._materializar()
+        vetores = self.vetorizar(descricoes)
+        for i, categoria_id in enumerate(categorias):
+            inicio, fim = vetores.indptr[i], vetores.indptr[i + 1]
+            contagens = self._contagens[categoria_id]
+            for termo, valor in zip(vetores.indices[inicio:fim], vetores.data[inicio:fim]):
+                valor *= sinal
+                contagens[termo] += valor
+                self._frequencia_termos[termo] += valor
+                if contagens[termo] <= 0:
+                    del contagens[termo]
+                if self._frequencia_termos[termo] <= 0:
+                    del self._frequencia_termos[termo]
+                self._termos_categoria[categoria_id] += valor
+            self.documentos[categoria_id] += sinal
+            if self.documentos[categoria_id] <= 0:
+                self._descartar_categoria(categoria_id)
+        self._compilado = None
+
+    def _descartar_categoria(self, categoria_id):
+        for termo, valor in self._contagens.pop(categoria_id, {}).items():
+            self._frequencia_termos[termo] -= valor
+            if self._frequencia_termos[termo] <= 0:
+                del self._frequencia_termos[termo]
+        self.documentos.pop(categoria_id, None)
+        self._termos_categoria.pop(categoria_id, None)
+        self.nomes.pop(categoria_id, None)
+
+    def aprender(self, descricoes, categorias, nomes):
+        """
+        Acrescenta transações ao modelo (equivalente a um `partial_fit`).
+
+        Parâmetros:
+            descricoes (list): Descrições normalizadas das transações.
+            categorias (list): ID da categoria de cada transação.
+            nomes (dict): ID da categoria -> nome, para as categorias envolvidas.
+        """
+        with self._lock:
+            self.nomes.update(nomes)
+            self._atualizar(descricoes, categorias, 1)
+
+    def esquecer(self, descricoes, categorias):
+        """
+        Remove do modelo transações aprendidas anteriormente (exclusão ou edição).
+
+        Parâmetros:
+            descricoes (list): Descrições como foram aprendidas.
+            categorias (list): ID da categoria de cada transação.
+        """
+        with self._lock:
+            conhecidas = [(d, c) for d, c in zip(descricoes, categorias) if c in self.documentos]
+            if conhecidas:
+                self._atualizar([d for d, _ in conhecidas], [c for _, c in conhecidas], -1)
+
+    def renomear_categoria(self, categoria_id, nome):
+        """
+        Parâmetros:
+            categoria_id (int): ID da categoria.
+            nome (str): Novo nome.
+        """
+        with self._lock:
+            if categoria_id in self.nomes:
+                self.nomes[categoria_id] = nome
+
+    def remover_categoria(self, categoria_id):
+        """
+        Esquece uma categoria excluída (suas transações ficam sem categoria).
+
+        Parâmetros:
+            categoria_id (int): ID da categoria.
+        """
+        with self._lock:
+            if categoria_id in self.documentos:
+                self._materializar()
+                self._descartar_categoria(categoria_id)
+                self._compilado = None
+
+    def _compilar(self):
+        """
+        Converte as contagens na matriz de pesos usada para pontuar:
+        log P(c | x) = prior_c + x · W_c + |x| · b_c (a menos de uma constante), com
+        W_tc = log(1 + n_tc / α) e b_c = log α - log(N_c + α·V).
+        """
+        ids = [c for c in self.documentos if self.documentos[c] > 0]
+        termos = np.array(sorted(self._frequencia_termos), dtype=np.int64)
+        linhas, colunas, valores = [], [], []
+        for coluna, categoria_id in enumerate(ids):
+            contagens = self._contagens[categoria_id]
+            linhas.extend(contagens.keys())
+            colunas.extend([coluna] * len(contagens))
+            valores.extend(contagens.values())
+        # Matriz termo x categoria em CSR, só com os termos já vistos (em vez dos 2^18
+        # atributos do hashing): o produto com as descrições percorre apenas as linhas
+        # dos termos presentes nelas.
+        pesos = sparse.csr_matrix(
+            (np.log1p(np.array(valores) / self.ALFA), (np.searchsorted(termos, linhas), colunas)),
+            shape=(len(termos), len(ids)),
+        )
+        vocabulario = max(len(termos), 1)
+        totais = np.array([self._termos_categoria[c] for c in ids])
+        documentos = np.array([self.documentos[c] for c in ids], dtype=float)
+        vies = np.log(self.ALFA) - np.log(totais + self.ALFA * vocabulario)
+        prior = np.log(documentos / documentos.sum()) if ids else documentos
+        return ids, termos, pesos, vies, prior
+
+    @staticmethod
+    def _projetar(vetores, termos):
+        """
+        Reindexa vetores do espaço de hashing para o vocabulário compacto do modelo,
+        descartando termos nunca vistos.
+        """
+        linhas = np.repeat(np.arange(vetores.shape[0]), np.diff(vetores.indptr))
+        posicoes = np.searchsorted(termos, vetores.indices)
+        conhecidos = posicoes < len(termos)
+        conhecidos[conhecidos] = termos[posicoes[conhecidos]] == vetores.indices[conhecidos]
+        return sparse.csr_matrix(
+            (vetores.data[conhecidos], (linhas[conhecidos], posicoes[conhecidos])),
+            shape=(vetores.shape[0], len(termos)),
+        )
+
+    def _pontuar(self, descricoes):
+        """
+        Returns:
+            tuple: (ids das categorias, matriz descrições x categorias de log-verossimilhanças)
+        """
+        with self._lock:
+            if self._compilado is None:
+                self._compilado = self._compilar()
+            ids, termos, pesos, vies, prior = self._compilado
+        if not ids or not descricoes:
+            return ids, np.zeros((len(descricoes), len(ids)))
+        vetores = self.vetorizar(descricoes)
+        tamanhos = np.asarray(vetores.sum(axis=1))
+        return ids, (self._projetar(vetores, termos) @ pesos).toarray() + tamanhos * vies + prior
+
+    def reconhecidas(self, descricoes):
+        """
+        Indica quais descrições têm algum termo já aprendido. Nas demais, a pontuação
+        depende só da frequência de cada categoria.
+
+        Parâmetros:
+            descricoes (list): Textos normalizados.
+        Returns:
+            ndarray: Um booleano por descrição.
+        """
+        with self._lock:
+            if self._compilado is None:
+                self._compilado = self._compilar()
+            termos = self._compilado[1]
+        if not descricoes:
+            return np.zeros(0, dtype=bool)
+        return self._projetar(self.vetorizar(descricoes), termos).getnnz(axis=1) > 0
+
+    def probabilidades_lote(self, descricoes):
+        """
+        Estima a probabilidade de cada categoria para cada descrição.
+
+        Parâmetros:
+            descricoes (list): Textos normalizados a classificar.
+        Returns:
+            tuple: (nomes das categorias, matriz descrições x categorias com linhas somando 1)
+        """
+        ids, scores = self._pontuar(descricoes)
+        nomes = [self.nomes.get(c, '') for c in ids]
+        if not ids:
+            return nomes, scores
+        scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+        return nomes, scores / scores.sum(axis=1, keepdims=True)
+
+    def sugerir_lote(self, descricoes, limite=3):
+        """
+        Ordena as categorias pela probabilidade estimada para cada descrição.
+
+        Parâmetros:
+            descricoes (list): Textos normalizados a classificar.
+            limite (int): Quantidade máxima de categorias por descrição.
+        Returns:
+            list: Uma lista de categorias para cada descrição, na mesma ordem.
+        """
+        ids, scores = self._pontuar(descricoes)
+        if not ids:
+            return [[] for _ in descricoes]
+        nomes = [self.nomes.get(c, '') for c in ids]
+        ordem = np.argsort(-scores, axis=1, kind='stable')[:, :limite]
+        return [[nomes[i] for i in linha] for linha in ordem]
+
+    def sugerir(self, descricao, limite=3):
+        """
+        Parâmetros:
+            descricao (str): Texto digitado pelo usuário, normalizado.
+            limite (int): Quantidade máxima de categorias retornadas.
+        Returns:
+            list: Nomes das categorias mais prováveis.
+        """
+        return self.sugerir_lote([descricao], limite)[0]
+
+    def exportar(self):
+        """
+        Serializa o modelo compilado para gravação como artefato.
+
+        Returns:
+            tuple: (arrays, meta) — matrizes numpy e metadados serializáveis em JSON.
+        """
+        with self._lock:
+            if self._compilado is None:
+                self._compilado = self._compilar()
+            ids, termos, pesos, vies, prior = self._compilado
+            meta = {
+                'formato': self.FORMATO,
+                'n_atributos': self.N_ATRIBUTOS,
+                'categorias': [
+                    [c, self.nomes.get(c, ''), self.documentos[c], self._termos_categoria[c]]
+                    for c in ids
+                ],
+            }
+        arrays = {
+            'termos': termos,
+            'pesos_data': pesos.data,
+            'pesos_indices': pesos.indices,
+            'pesos_indptr': pesos.indptr,
+            'vies': vies,
+            'prior': prior,
+        }
+        return arrays, meta
+
+    @classmethod
+    def importar(cls, arrays, meta, versao=None):
+        """
+        Reconstrói o modelo a partir de um artefato, sem copiar as matrizes
+        (que podem ser arrays mapeados em memória).
+
+        Parâmetros:
+            arrays (dict): Matrizes gravadas por `exportar`.
+            meta (dict): Metadados gravados por `exportar`.
+            versao (str): Versão do artefato.
+        Returns:
+            ClassificadorIncremental: Modelo pronto para sugerir.
+        Raises:
+            ValueError: Se o artefato foi gerado em um formato incompatível.
+        """
+        if meta.get('formato') != cls.FORMATO or meta.get('n_atributos') != cls.N_ATRIBUTOS:
+            raise ValueError('Artefato de modelo em formato incompatível.')
+        modelo = cls()
+        ids = []
+        for categoria_id, nome, documentos, termos_categoria in meta['categorias']:
+            ids.append(categoria_id)
+            modelo.nomes[categoria_id] = nome
+            modelo.documentos[categoria_id] = documentos
+            modelo._termos_categoria[categoria_id] = termos_categoria
+        termos = arrays['termos']
+        pesos = sparse.csr_matrix(
+            (arrays['pesos_data'], arrays['pesos_indices'], arrays['pesos_indptr']),
+            shape=(len(termos), len(ids)),
+            copy=False,
+        )
+        modelo._compilado = (ids, termos, pesos, arrays['vies'], arrays['prior'])
+        modelo._materializado = False
+        modelo.versao = versao
+        return modelo
+
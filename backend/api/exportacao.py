@@ -0,0 +1,84 @@
+import csv
+import json
+
+CAMPOS = ('id', 'date', 'description', 'value', 'transaction_type', 'category_id', 'category__name', 'category__color')
+CABECALHO_CSV = ('data', 'descricao', 'valor', 'tipo', 'categoria', 'cor_categoria')
+LINHAS_POR_BLOCO = 500
+
+
+class _Eco:
+    """
+    Buffer que apenas devolve o que recebe, para o `csv.writer` gerar linhas sem acumulá-las.
+    """
+
+    def write(self, valor):
+        return valor
+
+
+def _celula_segura(texto):
+    """
+    Evita que planilhas interpretem como fórmula um texto iniciado por =, +, - ou @.
+    """
+    if texto and texto[0] in '=+-@':
+        return "'" + texto
+    return texto
+
+
+def _linhas(queryset, tamanho_lote):
+    """
+    Percorre as transações em lotes (cursor no servidor, no PostgreSQL), com categoria
+    obtida pelo JOIN: a memória usada não depende do tamanho do histórico.
+    """
+    return queryset.order_by('date', 'id').values_list(*CAMPOS).iterator(chunk_size=tamanho_lote)
+
+
+def gerar_csv(queryset, tamanho_lote=2000):
+    """
+    Gera o CSV das transações em blocos de texto, no formato aceito pela importação de extratos.
+
+    Parâmetros:
+        queryset (QuerySet): Transações a exportar.
+        tamanho_lote (int): Linhas lidas do banco por vez.
+    Returns:
+        generator: Blocos de texto CSV.
+    """
+    escritor = csv.writer(_Eco())
+    bloco = [escritor.writerow(CABECALHO_CSV)]
+    for _, data, descricao, valor, tipo, _, categoria, cor in _linhas(queryset, tamanho_lote):
+        bloco.append(escritor.writerow((
+            data.isoformat(), _celula_segura(descricao), valor, tipo, _celula_segura(categoria or ''), cor or '',
+        )))
+        if len(bloco) >= LINHAS_POR_BLOCO:
+            yield ''.join(bloco)
+            bloco = []
+    if bloco:
+        yield ''.join(bloco)
+
+
+def gerar_ndjson(queryset, tamanho_lote=2000):
+    """
+    Gera as transações em JSON Lines (um objeto por linha, com os campos da API).
+
+    Parâmetros:
+        queryset (QuerySet): Transações a exportar.
+        tamanho_lote (int): Linhas lidas do banco por vez.
+    Returns:
+        generator: Blocos de texto NDJSON.
+    """
+    bloco = []
+    for id_, data, descricao, valor, tipo, categoria_id, categoria, cor in _linhas(queryset, tamanho_lote):
+        bloco.append(json.dumps({
+            'id': id_, 'description': descricao, 'value': str(valor), 'date': data.isoformat(),
+            'transaction_type': tipo, 'category': categoria_id, 'category_name': categoria, 'category_color': cor,
+        }, ensure_ascii=False) + '\n')
+        if len(bloco) >= LINHAS_POR_BLOCO:
+            yield ''.join(bloco)
+            bloco = []
+    if bloco:
+        yield ''.join(bloco)
+
+
+FORMATOS = {
+    'csv': (gerar_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (gerar_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
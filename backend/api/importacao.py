@@ -0,0 +1,395 @@
+import codecs
+import csv
+import io
+import itertools
+import os
+import re
+import uuid
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import transaction
+
+from .lote import criar_transacoes, separar_duplicadas
+from .models import Category, StatementImport, Transaction
+from .regras import matcher_do_usuario
+from .serializers import TransactionSerializer
+from .sugestoes import sugestoes_confiaveis
+from .utils import normalizar
+
+TAMANHO_LOTE = 1000
+MAXIMO_ERROS_GUARDADOS = 1000
+# Probabilidade mínima para uma sugestão do modelo categorizar uma linha importada.
+CONFIANCA_MINIMA = 0.6
+# Tipos aceitos por uma categoria ainda sem transações.
+TIPOS_LINHA = frozenset({'income', 'expense'})
+
+COLUNAS_CSV = {
+    'data': 'date', 'date': 'date',
+    'descricao': 'description', 'description': 'description', 'historico': 'description', 'memo': 'description',
+    'valor': 'value', 'value': 'value', 'amount': 'value',
+    'tipo': 'transaction_type', 'type': 'transaction_type', 'transaction_type': 'transaction_type',
+    'categoria': 'category', 'category': 'category',
+}
+TIPOS = {
+    'receita': 'income', 'income': 'income', 'credito': 'income', 'c': 'income', 'credit': 'income',
+    'despesa': 'expense', 'expense': 'expense', 'debito': 'expense', 'd': 'expense', 'debit': 'expense',
+}
+FORMATOS_DATA = ('%Y-%m-%d', '%d/%m/%Y', '%d/%m/%y', '%d-%m-%Y')
+
+
+class ErroImportacao(Exception):
+    """
+    Erro que impede a leitura do arquivo inteiro (ex.: colunas obrigatórias ausentes).
+    """
+
+
+class ErroLinha(ValueError):
+    """
+    Erro de conversão de uma linha, registrado sem interromper a importação.
+    """
+
+    def __init__(self, campo, mensagem):
+        super().__init__(mensagem)
+        self.erros = {campo: [mensagem]}
+
+
+def converter_data(texto):
+    """
+    Parâmetros:
+        texto (str): Data em AAAA-MM-DD, DD/MM/AAAA, DD/MM/AA, DD-MM-AAAA ou AAAAMMDD[...] (OFX).
+    Returns:
+        str: Data no formato ISO.
+    Raises:
+        ErroLinha: Se a data não for reconhecida.
+    """
+    texto = texto.strip()
+    if re.match(r'^\d{8}', texto):
+        texto = f'{texto[:4]}-{texto[4:6]}-{texto[6:8]}'
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date().isoformat()
+        except ValueError:
+            continue
+    raise ErroLinha('date', f'Data inválida: {texto!r}.')
+
+
+def converter_valor(texto):
+    """
+    Converte valores como "1.234,56", "1,234.56", "-50,00" ou "R$ 10".
+
+    Parâmetros:
+        texto (str): Valor do extrato.
+    Returns:
+        Decimal: Valor com sinal.
+    Raises:
+        ErroLinha: Se o valor não for numérico.
+    """
+    limpo = texto.replace('R$', '').replace(' ', '').strip()
+    if ',' in limpo and '.' in limpo:
+        if limpo.rfind(',') > limpo.rfind('.'):
+            limpo = limpo.replace('.', '').replace(',', '.')
+        else:
+            limpo = limpo.replace(',', '')
+    elif ',' in limpo:
+        limpo = limpo.replace(',', '.')
+    try:
+        valor = Decimal(limpo)
+    except InvalidOperation:
+        raise ErroLinha('value', f'Valor inválido: {texto!r}.')
+    if not valor.is_finite():
+        raise ErroLinha('value', f'Valor inválido: {texto!r}.')
+    return valor
+
+
+def montar_item(data, descricao, valor, tipo='', categoria=''):
+    """
+    Converte os campos brutos de uma linha nos dados esperados por `TransactionSerializer`.
+    Sem tipo explícito, valores negativos são despesas e positivos, receitas.
+
+    Returns:
+        dict: Dados da transação, com o nome da categoria em `categoria_nome`.
+    Raises:
+        ErroLinha: Se algum campo não puder ser convertido.
+    """
+    valor = converter_valor(valor)
+    tipo_normalizado = normalizar(tipo or '').strip()
+    if tipo_normalizado:
+        if tipo_normalizado not in TIPOS:
+            raise ErroLinha('transaction_type', f'Tipo inválido: {tipo!r}.')
+        tipo = TIPOS[tipo_normalizado]
+    else:
+        tipo = 'expense' if valor < 0 else 'income'
+    return {
+        'description': (descricao or '').strip()[:200],
+        'value': str(abs(valor)),
+        'date': converter_data(data),
+        'transaction_type': tipo,
+        'categoria_nome': (categoria or '').strip(),
+    }
+
+
+def ler_csv(arquivo):
+    """
+    Lê um extrato CSV (separado por vírgula ou ponto e vírgula, com cabeçalho) como
+    um fluxo, sem carregar o arquivo inteiro.
+
+    Parâmetros:
+        arquivo (file): Arquivo binário.
+    Returns:
+        generator: Tuplas (número da linha, dados ou None, erros ou None).
+    Raises:
+        ErroImportacao: Se faltarem as colunas de data, descrição ou valor.
+    """
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', errors='replace', newline='')
+    primeira = texto.readline()
+    separador = ';' if primeira.count(';') > primeira.count(',') else ','
+    cabecalho = next(csv.reader([primeira], delimiter=separador), [])
+    colunas = {}
+    for posicao, nome in enumerate(cabecalho):
+        campo = COLUNAS_CSV.get(normalizar(nome).strip())
+        if campo and campo not in colunas:
+            colunas[campo] = posicao
+    faltando = {'date', 'description', 'value'} - colunas.keys()
+    if faltando:
+        raise ErroImportacao('Colunas obrigatórias ausentes no CSV: ' + ', '.join(sorted(faltando)) + '.')
+
+    for numero, campos in enumerate(csv.reader(texto, delimiter=separador), start=2):
+        if not any(c.strip() for c in campos):
+            continue
+        brutos = {campo: campos[posicao] if posicao < len(campos) else '' for campo, posicao in colunas.items()}
+        try:
+            item = montar_item(
+                brutos['date'], brutos['description'], brutos['value'],
+                brutos.get('transaction_type', ''), brutos.get('category', ''),
+            )
+        except ErroLinha as erro:
+            yield numero, None, erro.erros
+        else:
+            yield numero, item, None
+
+
+_MARCACAO_OFX = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def _marcacoes_ofx(texto, tamanho_bloco=64 * 1024):
+    """
+    Percorre as marcações de um OFX (SGML ou XML) em blocos, inclusive arquivos
+    gravados em uma única linha.
+
+    Returns:
+        generator: Tuplas (fechamento, nome da marcação em maiúsculas, texto seguinte).
+    """
+    resto = ''
+    while True:
+        bloco = texto.read(tamanho_bloco)
+        resto += bloco
+        # Só processa até a última marcação completa; o restante aguarda o próximo bloco.
+        limite = len(resto) if not bloco else resto.rfind('<')
+        for marcacao in _MARCACAO_OFX.finditer(resto, 0, max(limite, 0)):
+            yield marcacao.group(1) == '/', marcacao.group(2).upper(), marcacao.group(3).strip()
+        if not bloco:
+            return
+        resto = resto[max(limite, 0):]
+
+
+def ler_ofx(arquivo):
+    """
+    Lê as transações (<STMTTRN>) de um extrato OFX como um fluxo.
+
+    Parâmetros:
+        arquivo (file): Arquivo binário.
+    Returns:
+        generator: Tuplas (número da transação no arquivo, dados ou None, erros ou None).
+    """
+    cabecalho = arquivo.read(1024)
+    arquivo.seek(0)
+    codificacao = 'cp1252' if re.search(rb'CHARSET:\s*1252|encoding="?(windows-1252|iso-8859-1)', cabecalho, re.I) else 'utf-8'
+    texto = codecs.getreader(codificacao)(arquivo, errors='replace')
+
+    numero = 0
+    atual = None
+    for fechamento, nome, conteudo in _marcacoes_ofx(texto):
+        if nome == 'STMTTRN':
+            if atual is not None:
+                numero += 1
+                yield _item_ofx(numero, atual)
+            atual = None if fechamento else {}
+        elif atual is not None and not fechamento:
+            atual[nome] = conteudo
+    if atual is not None:
+        numero += 1
+        yield _item_ofx(numero, atual)
+
+
+def _item_ofx(numero, campos):
+    descricao = campos.get('MEMO') or campos.get('NAME') or ''
+    tipo = {'CREDIT': 'income', 'DEBIT': 'expense'}.get(campos.get('TRNTYPE', '').upper(), '')
+    try:
+        return numero, montar_item(campos.get('DTPOSTED', ''), descricao, campos.get('TRNAMT', ''), tipo), None
+    except ErroLinha as erro:
+        return numero, None, erro.erros
+
+
+LEITORES = {'csv': ler_csv, 'ofx': ler_ofx}
+
+
+def criar_importacao(user, arquivo, nome, formato, ignorar_duplicadas=True):
+    """
+    Guarda o arquivo enviado (em blocos) e registra a importação pendente.
+
+    Parâmetros:
+        user (User): Dono das transações.
+        arquivo (File): Arquivo enviado, lido com `chunks()`.
+        nome (str): Nome original do arquivo.
+        formato (str): 'csv' ou 'ofx'.
+        ignorar_duplicadas (bool): Pula linhas que já existem (ou só as sinaliza, se falso).
+    Returns:
+        StatementImport: Importação criada.
+    """
+    pasta = os.path.join(settings.IMPORTACOES_DIR, str(user.id))
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f'{uuid.uuid4().hex}.{formato}')
+    with open(caminho, 'wb') as destino:
+        for bloco in arquivo.chunks():
+            destino.write(bloco)
+    return StatementImport.objects.create(
+        user=user, file_name=nome[:255], file_format=formato, file_path=caminho,
+        skip_duplicates=ignorar_duplicadas,
+    )
+
+
+def _em_lotes(linhas, tamanho):
+    while True:
+        lote = list(itertools.islice(linhas, tamanho))
+        if not lote:
+            return
+        yield lote
+
+
+def _tipos_das_categorias(user):
+    """
+    Returns:
+        dict: ID da categoria -> tipos ('income'/'expense') das transações que ela já tem.
+    """
+    tipos = {}
+    linhas = (
+        Transaction.objects.filter(user=user).exclude(category=None)
+        .values_list('category_id', 'transaction_type').distinct()
+    )
+    for categoria_id, tipo in linhas:
+        tipos.setdefault(categoria_id, set()).add(tipo)
+    return tipos
+
+
+def _processar_lote(importacao, lote, categorias, tipos, matcher_usuario=None):
+    """
+    Valida e grava um lote de linhas, atribuindo categorias pelo nome informado ou,
+    na falta dele, por uma sugestão confiável (regra de palavra-chave ou modelo com
+    probabilidade de pelo menos CONFIANCA_MINIMA), e pulando (ou só sinalizando) as
+    linhas que já existem. Uma sugestão só vale para categorias já usadas com o tipo
+    da linha ou ainda sem transações; sem sugestão assim, a linha fica sem categoria.
+    O lote e o avanço da importação são gravados na mesma transação do banco.
+    """
+    user = importacao.user
+    erros = []
+    itens = []
+    for numero, item, erro in lote:
+        if erro is not None:
+            erros.append({'linha': numero, 'erros': erro})
+            continue
+        categoria = categorias.get(normalizar(item.pop('categoria_nome')).strip())
+        item['category'] = categoria.id if categoria else None
+        itens.append((numero, item))
+
+    sem_categoria = [item for _, item in itens if item['category'] is None and item['description']]
+    if sem_categoria:
+        candidatas = sugestoes_confiaveis(
+            user.id, [item['description'] for item in sem_categoria], CONFIANCA_MINIMA, matcher_usuario,
+        )
+        for item, nomes in zip(sem_categoria, candidatas):
+            for nome in nomes:
+                categoria = categorias.get(normalizar(nome).strip())
+                if categoria is not None and item['transaction_type'] in tipos.get(categoria.id, TIPOS_LINHA):
+                    item['category'] = categoria.id
+                    break
+
+    contexto = {'user': user, 'categorias': {c.id: c for c in categorias.values()}}
+    validos = []
+    numeros = []
+    for numero, item in itens:
+        serializer = TransactionSerializer(data=item, context=contexto)
+        if serializer.is_valid():
+            validos.append(serializer.validated_data)
+            numeros.append(numero)
+        else:
+            erros.append({'linha': numero, 'erros': serializer.errors})
+
+    with transaction.atomic():
+        # Uma consulta pelo índice (user, fingerprint) reconhece as linhas já importadas.
+        novos, duplicadas = separar_duplicadas(user, validos) if validos else ([], [])
+        if not importacao.skip_duplicates:
+            novos = validos
+        criadas = criar_transacoes(user, novos) if novos else []
+        importacao.processed_rows += len(lote)
+        importacao.created_count += len(criadas)
+        importacao.error_count += len(erros)
+        importacao.duplicate_count += len(duplicadas)
+        espaco = MAXIMO_ERROS_GUARDADOS - len(importacao.errors)
+        if espaco > 0:
+            importacao.errors.extend(sorted(erros, key=lambda erro: erro['linha'])[:espaco])
+        espaco = MAXIMO_ERROS_GUARDADOS - len(importacao.duplicate_rows)
+        if espaco > 0:
+            importacao.duplicate_rows.extend(numeros[posicao] for posicao in duplicadas[:espaco])
+        importacao.save(update_fields=[
+            'processed_rows', 'created_count', 'error_count', 'errors',
+            'duplicate_count', 'duplicate_rows', 'updated_at',
+        ])
+
+
+def processar_importacao(importacao, tamanho_lote=TAMANHO_LOTE, progresso=None):
+    """
+    Processa (ou retoma) uma importação lendo o arquivo como fluxo, em lotes de
+    tamanho fixo: a memória usada não depende do tamanho do extrato. As linhas já
+    contadas em `processed_rows` são puladas, o que torna a retomada segura.
+
+    Parâmetros:
+        importacao (StatementImport): Importação pendente, interrompida ou com falha.
+        tamanho_lote (int): Linhas por lote.
+        progresso (callable): Chamado com a importação após cada lote gravado.
+    Returns:
+        StatementImport: Importação atualizada.
+    """
+    importacao.status = 'processing'
+    importacao.message = ''
+    importacao.save(update_fields=['status', 'message', 'updated_at'])
+    categorias = {normalizar(c.name).strip(): c for c in Category.objects.filter(user=importacao.user)}
+    tipos = _tipos_das_categorias(importacao.user)
+    matcher_usuario = matcher_do_usuario(importacao.user.id)
+    try:
+        with open(importacao.file_path, 'rb') as arquivo:
+            linhas = LEITORES[importacao.file_format](arquivo)
+            linhas = itertools.islice(linhas, importacao.processed_rows, None)
+            for lote in _em_lotes(linhas, tamanho_lote):
+                _processar_lote(importacao, lote, categorias, tipos, matcher_usuario)
+                if progresso is not None:
+                    progresso(importacao)
+    except (ErroImportacao, OSError) as erro:
+        importacao.status = 'failed'
+        importacao.message = str(erro)
+        importacao.save(update_fields=['status', 'message', 'updated_at'])
+        return importacao
+    except Exception as erro:
+        importacao.status = 'failed'
+        importacao.message = f'Erro inesperado: {erro}'
+        importacao.save(update_fields=['status', 'message', 'updated_at'])
+        raise
+
+    importacao.status = 'done'
+    importacao.save(update_fields=['status', 'updated_at'])
+    try:
+        os.remove(importacao.file_path)
+    except OSError:
+        pass
+    return importacao
@@ -0,0 +1,206 @@
+import contextlib
+from collections import Counter
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import Count
+
+from . import resumos
+from .autocompletar import atualizar_indice
+from .cache_respostas import cache_respostas
+from .models import Transaction
+from .roteamento import registrar_escrita
+from .sincronizacao import registrar_alteracoes
+from .sugestoes import atualizar_modelo
+from .utils import fingerprint_transacao, normalizar
+
+_em_lote = ContextVar('em_lote', default=False)
+
+CAMPOS_EDITAVEIS = ('description', 'value', 'date', 'transaction_type', 'category')
+
+
+def em_lote():
+    """
+    Returns:
+        bool: Se uma operação em lote está em andamento (os signals por transação
+        são dispensados e a operação atualiza consolidado e sugestões de uma vez).
+    """
+    return _em_lote.get()
+
+
+@contextlib.contextmanager
+def _operacao_em_lote():
+    token = _em_lote.set(True)
+    try:
+        yield
+    finally:
+        _em_lote.reset(token)
+
+
+def _valores(valores):
+    return {campo: valores[campo] for campo in ('user_id', 'category_id', 'date', 'transaction_type', 'value')}
+
+
+def _atualizar_sugestoes(user_id, esquecer, aprender, nomes):
+    """
+    Agenda, para depois do commit, uma única atualização do modelo de sugestão do
+    usuário com todas as transações esquecidas e aprendidas no lote.
+    """
+    esquecer = [(descricao, categoria) for descricao, categoria in esquecer if categoria is not None]
+    aprender = [(descricao, categoria) for descricao, categoria in aprender if categoria is not None]
+    if not esquecer and not aprender:
+        return
+
+    alteracoes = []
+    if esquecer:
+        alteracoes.append(('esquecer', *map(list, zip(*esquecer))))
+    if aprender:
+        alteracoes.append(('aprender', *map(list, zip(*aprender)), nomes))
+    transaction.on_commit(lambda: atualizar_modelo(user_id, alteracoes))
+
+
+def _atualizar_autocompletar(user_id, esquecer, aprender, nomes):
+    """
+    Agenda uma única atualização do índice de autocompletar do usuário com todas as
+    transações retiradas e acrescentadas no lote.
+    """
+    def atualizar(indice):
+        indice.esquecer(esquecer)
+        indice.aprender(aprender, nomes)
+
+    atualizar_indice(user_id, atualizar)
+
+
+def separar_duplicadas(user, dados):
+    """
+    Separa os itens que já existem para o usuário (mesmo fingerprint) com uma única
+    consulta indexada por lote. A multiplicidade é respeitada: se o banco tem duas
+    transações iguais e o lote traz três, só a terceira é considerada nova.
+
+    Parâmetros:
+        user (User): Dono das transações.
+        dados (list): Dados já validados de cada transação.
+    Returns:
+        tuple: (itens novos, posições dos itens duplicados).
+    """
+    impressoes = [
+        fingerprint_transacao(item['date'], item['value'], item['transaction_type'], normalizar(item['description'])[:200])
+        for item in dados
+    ]
+    existentes = Counter(dict(
+        Transaction.objects.filter(user=user, fingerprint__in=set(impressoes))
+        .values('fingerprint').annotate(quantidade=Count('id')).order_by()
+        .values_list('fingerprint', 'quantidade')
+    ))
+    novos = []
+    duplicadas = []
+    for posicao, (item, impressao) in enumerate(zip(dados, impressoes)):
+        if existentes[impressao] > 0:
+            existentes[impressao] -= 1
+            duplicadas.append(posicao)
+        else:
+            novos.append(item)
+    return novos, duplicadas
+
+
+def criar_transacoes(user, dados):
+    """
+    Cria várias transações com um INSERT em lote, atualizando o consolidado mensal
+    e o modelo de sugestão uma vez para o lote inteiro.
+
+    Parâmetros:
+        user (User): Dono das transações.
+        dados (list): Dados já validados de cada transação.
+    Returns:
+        list: Transações criadas, na ordem recebida.
+    """
+    instancias = [Transaction(user=user, **item) for item in dados]
+    for instancia in instancias:
+        instancia.preencher_campos_derivados()
+    with transaction.atomic(), _operacao_em_lote():
+        Transaction.objects.bulk_create(instancias, batch_size=500)
+        for instancia in instancias:
+            instancia.registrar_valores_salvos()
+        resumos.aplicar_transacoes((_valores(t.valores_salvos), 1) for t in instancias)
+        registrar_alteracoes(user.id, 'transaction', [t.pk for t in instancias])
+        cache_respostas.invalidar(user.id)
+        registrar_escrita(user.id)
+        nomes = {t.category_id: t.category.name for t in instancias if t.category_id is not None}
+        _atualizar_sugestoes(user.id, [], [(t.normalized_description, t.category_id) for t in instancias], nomes)
+        _atualizar_autocompletar(user.id, [], [(t.description, t.category_id, t.value) for t in instancias], nomes)
+    return instancias
+
+
+def atualizar_transacoes(user, alteracoes):
+    """
+    Aplica edições parciais a várias transações com um UPDATE em lote, retirando do
+    consolidado e do modelo de sugestão a versão anterior de cada uma.
+
+    Parâmetros:
+        user (User): Dono das transações.
+        alteracoes (list): Pares (transação carregada do banco, dados já validados).
+    Returns:
+        list: Transações atualizadas.
+    """
+    campos = {'normalized_description', 'fingerprint'}
+    instancias = []
+    for instancia, dados in alteracoes:
+        for campo, valor in dados.items():
+            if campo in CAMPOS_EDITAVEIS:
+                setattr(instancia, campo, valor)
+                campos.add(campo)
+        instancia.preencher_campos_derivados()
+        instancias.append(instancia)
+
+    anteriores = [t.valores_salvos for t in instancias]
+    with transaction.atomic(), _operacao_em_lote():
+        Transaction.objects.bulk_update(instancias, sorted(campos), batch_size=500)
+        for instancia in instancias:
+            instancia.registrar_valores_salvos()
+        resumos.aplicar_transacoes(
+            [(_valores(valores), -1) for valores in anteriores]
+            + [(_valores(t.valores_salvos), 1) for t in instancias]
+        )
+        registrar_alteracoes(user.id, 'transaction', [t.pk for t in instancias])
+        cache_respostas.invalidar(user.id)
+        registrar_escrita(user.id)
+        nomes = {t.category_id: t.category.name for t in instancias if t.category_id is not None}
+        _atualizar_sugestoes(
+            user.id,
+            [(valores['normalized_description'], valores['category_id']) for valores in anteriores],
+            [(t.normalized_description, t.category_id) for t in instancias],
+            nomes,
+        )
+        _atualizar_autocompletar(
+            user.id,
+            [(valores['description'], valores['category_id'], valores['value']) for valores in anteriores],
+            [(t.description, t.category_id, t.value) for t in instancias],
+            nomes,
+        )
+    return instancias
+
+
+def remover_transacoes(user, instancias):
+    """
+    Remove várias transações com um DELETE em lote.
+
+    Parâmetros:
+        user (User): Dono das transações.
+        instancias (list): Transações carregadas do banco.
+    Returns:
+        int: Quantidade de transações removidas.
+    """
+    anteriores = [t.valores_salvos for t in instancias]
+    with transaction.atomic(), _operacao_em_lote():
+        removidas, _ = Transaction.objects.filter(user=user, pk__in=[t.pk for t in instancias]).delete()
+        resumos.aplicar_transacoes((_valores(valores), -1) for valores in anteriores)
+        registrar_alteracoes(user.id, 'transaction', [t.pk for t in instancias], removidos=True)
+        cache_respostas.invalidar(user.id)
+        registrar_escrita(user.id)
+        _atualizar_sugestoes(
+            user.id, [(valores['normalized_description'], valores['category_id']) for valores in anteriores], [], {},
+        )
+        _atualizar_autocompletar(
+            user.id, [(valores['description'], valores['category_id'], valores['value']) for valores in anteriores], [], {},
+        )
+    return removidas
@@ -0,0 +1,90 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importacao import TAMANHO_LOTE, criar_importacao, processar_importacao
+from api.models import StatementImport, User
+from api.utils import formato_do_arquivo
+
+
+class _ArquivoLocal:
+    """
+    Adapta um arquivo aberto à interface `chunks()` dos arquivos enviados.
+    """
+
+    def __init__(self, arquivo, tamanho=1024 * 1024):
+        self.arquivo = arquivo
+        self.tamanho = tamanho
+
+    def chunks(self):
+        while bloco := self.arquivo.read(self.tamanho):
+            yield bloco
+
+
+class Command(BaseCommand):
+    """
+    Importa um extrato CSV ou OFX para um usuário, em lotes e com relatório de
+    progresso, ou retoma uma importação interrompida.
+
+    Uso:
+        python manage.py importar_extrato ARQUIVO --usuario ID [--formato csv|ofx] [--lote N] [--manter-duplicadas]
+        python manage.py importar_extrato --retomar ID_IMPORTACAO
+    """
+    help = 'Importa (ou retoma a importação de) um extrato bancário CSV ou OFX.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', nargs='?', help='Caminho do extrato.')
+        parser.add_argument('--usuario', type=int, help='ID do usuário dono das transações.')
+        parser.add_argument('--formato', choices=['csv', 'ofx'], help='Formato (padrão: pela extensão).')
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE, help='Linhas por lote.')
+        parser.add_argument('--retomar', type=int, help='ID de uma importação a retomar.')
+        parser.add_argument(
+            '--manter-duplicadas', action='store_true',
+            help='Importa também as linhas que já existem, apenas sinalizando-as.',
+        )
+
+    def handle(self, *args, **options):
+        if options['retomar'] is not None:
+            try:
+                importacao = StatementImport.objects.get(pk=options['retomar'])
+            except StatementImport.DoesNotExist:
+                raise CommandError(f"Importação {options['retomar']} não encontrada.")
+            if importacao.status == 'done':
+                raise CommandError('A importação já foi concluída.')
+        else:
+            if not options['arquivo'] or options['usuario'] is None:
+                raise CommandError('Informe o arquivo e --usuario (ou --retomar ID).')
+            try:
+                user = User.objects.get(pk=options['usuario'])
+            except User.DoesNotExist:
+                raise CommandError(f"Usuário {options['usuario']} não encontrado.")
+            formato = options['formato'] or formato_do_arquivo(options['arquivo'])
+            if formato is None:
+                raise CommandError('Informe o formato do arquivo com --formato.')
+            try:
+                with open(options['arquivo'], 'rb') as arquivo:
+                    importacao = criar_importacao(
+                        user, _ArquivoLocal(arquivo), os.path.basename(options['arquivo']), formato,
+                        ignorar_duplicadas=not options['manter_duplicadas'],
+                    )
+            except OSError as erro:
+                raise CommandError(str(erro))
+
+        def progresso(importacao):
+            self.stdout.write(
+                f'{importacao.processed_rows} linhas processadas, '
+                f'{importacao.created_count} transações criadas, {importacao.error_count} erros'
+            )
+
+        processar_importacao(importacao, tamanho_lote=max(options['lote'], 1), progresso=progresso)
+        for erro in importacao.errors[:20]:
+            self.stdout.write(f"Linha {erro['linha']}: {erro['erros']}")
+        if importacao.status == 'failed':
+            raise CommandError(
+                f'Importação {importacao.pk} falhou: {importacao.message} '
+                f'(retome com --retomar {importacao.pk}).'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Importação {importacao.pk} concluída: {importacao.created_count} transações criadas, '
+            f'{importacao.error_count} linhas com erro.'
+        ))
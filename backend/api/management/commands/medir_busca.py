@@ -0,0 +1,75 @@
+import random
+import statistics
+import time
+import uuid
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from api.busca import buscar_transacoes, palavras_da_busca, texto_completo_disponivel
+from api.models import Transaction, User
+
+PALAVRAS = (
+    'mercado', 'padaria', 'café', 'posto', 'ipiranga', 'farmácia', 'aluguel', 'salário', 'uber', 'ifood',
+    'academia', 'cinema', 'livraria', 'pão', 'açúcar', 'restaurante', 'energia', 'internet', 'celular', 'pix',
+)
+TERMOS = ('cafe', 'posto ipiranga', 'pa', 'farmacia pix', 'inexistente')
+
+
+class Command(BaseCommand):
+    """
+    Mede a latência da busca de transações (a mesma usada pela listagem) em um
+    usuário temporário com muitas transações. Tudo é criado dentro de uma transação
+    do banco desfeita ao final, sem deixar dados.
+
+    Uso:
+        python manage.py medir_busca [--linhas N] [--repeticoes N]
+    """
+    help = 'Mede a latência da busca de transações com um histórico grande.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--linhas', type=int, default=100000, help='Transações do usuário de teste.')
+        parser.add_argument('--repeticoes', type=int, default=20, help='Execuções de cada busca.')
+
+    def handle(self, *args, **options):
+        aleatorio = random.Random(0)
+        with transaction.atomic():
+            sufixo = uuid.uuid4().hex[:12]
+            user = User.objects.create_user(
+                email=f'medir-busca-{sufixo}@example.com', username=f'medir-busca-{sufixo}', name='Medição',
+            )
+            lote = []
+            for i in range(options['linhas']):
+                instancia = Transaction(
+                    user=user, description=' '.join(aleatorio.sample(PALAVRAS, 3)).title(),
+                    value=aleatorio.randint(1, 50000) / 100, transaction_type='expense',
+                    date=date(2020, 1, 1) + timedelta(days=i % 1800),
+                )
+                instancia.preencher_campos_derivados()
+                lote.append(instancia)
+                if len(lote) == 5000:
+                    Transaction.objects.bulk_create(lote)
+                    lote = []
+            Transaction.objects.bulk_create(lote)
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE api_transaction')
+
+            queryset = Transaction.objects.filter(user=user)
+            modo = 'busca textual (GIN)' if texto_completo_disponivel(queryset) else 'substring na descrição normalizada'
+            self.stdout.write(f"{options['linhas']} transações, {modo}:")
+            for termo in TERMOS:
+                busca = buscar_transacoes(queryset, palavras_da_busca(termo))
+                tempos = []
+                for _ in range(options['repeticoes']):
+                    inicio = time.perf_counter()
+                    list(busca[:20])
+                    tempos.append((time.perf_counter() - inicio) * 1000)
+                tempos.sort()
+                p95 = tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))]
+                self.stdout.write(
+                    f'  {termo!r}: {busca.count()} resultados, '
+                    f'mediana {statistics.median(tempos):.1f} ms, p95 {p95:.1f} ms'
+                )
+            transaction.set_rollback(True)
@@ -0,0 +1,110 @@
+import asyncio
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from asgiref.sync import ThreadSensitiveContext
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import AsyncRequestFactory, RequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import assincronas, views
+from api.models import Category, Transaction, User
+
+DESCRICOES = ('Mercado Extra', 'Padaria Pão Quente', 'Posto Ipiranga', 'Farmácia Pague Menos', 'Uber', 'Ifood')
+
+
+class Command(BaseCommand):
+    """
+    Compara a vazão das views síncronas (atendidas por um pool de threads, como em
+    WSGI) com a das views assíncronas (concorrentes no event loop, como em ASGI) no
+    resumo, nas sugestões e na listagem de categorias. Cada requisição tem parâmetros
+    distintos, para medir as views e não o cache de respostas. Os dados são criados
+    em um usuário temporário, removido ao final.
+
+    Uso:
+        python manage.py medir_vazao [--requisicoes N] [--concorrencia N] [--transacoes N]
+    """
+    help = 'Compara a vazão das views síncronas e assíncronas de leitura.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=300, help='Requisições por endpoint e modo.')
+        parser.add_argument('--concorrencia', type=int, default=20, help='Requisições simultâneas.')
+        parser.add_argument('--transacoes', type=int, default=2000, help='Transações do usuário de teste.')
+
+    def handle(self, *args, **options):
+        aleatorio = random.Random(0)
+        sufixo = uuid.uuid4().hex[:12]
+        user = User.objects.create_user(
+            email=f'medir-vazao-{sufixo}@example.com', username=f'medir-vazao-{sufixo}', name='Medição',
+        )
+        try:
+            categorias = [Category.objects.create(user=user, name=f'Categoria {i}') for i in range(10)]
+            lote = []
+            for i in range(options['transacoes']):
+                instancia = Transaction(
+                    user=user, description=aleatorio.choice(DESCRICOES), category=aleatorio.choice(categorias),
+                    value=aleatorio.randint(1, 50000) / 100, transaction_type=aleatorio.choice(['expense', 'income']),
+                    date=date.today() - timedelta(days=i % 730),
+                )
+                instancia.preencher_campos_derivados()
+                lote.append(instancia)
+            Transaction.objects.bulk_create(lote, batch_size=1000)
+            cabecalho = f'Bearer {RefreshToken.for_user(user).access_token}'
+
+            endpoints = [
+                ('resumo', views.transaction_summary, assincronas.transaction_summary,
+                 '/api/transactions/summary/', lambda i: {'granularity': 'week', 'start': date.today() - timedelta(days=i)}),
+                ('sugestões', views.sugerir_categorias, assincronas.sugerir_categorias,
+                 '/api/categorias/sugestoes/', lambda i: {'q': f'{aleatorio.choice(DESCRICOES)} {i}'}),
+                ('categorias', views.CategoryViewSet.as_view({'get': 'list'}), assincronas.listar_categorias,
+                 '/api/categories/', lambda i: {'page_size': 5, 'n': i}),
+            ]
+            for nome, sincrona, assincrona, url, parametros in endpoints:
+                sincronas = self._vazao_sincrona(sincrona, url, parametros, cabecalho, options)
+                assincronas_ = self._vazao_assincrona(assincrona, url, parametros, cabecalho, options)
+                self.stdout.write(
+                    f'{nome}: WSGI {sincronas:.0f} req/s, ASGI {assincronas_:.0f} req/s '
+                    f'({assincronas_ / sincronas:.2f}x)'
+                )
+        finally:
+            user.delete()
+
+    def _vazao_sincrona(self, view, url, parametros, cabecalho, options):
+        fabrica = RequestFactory()
+
+        def atender(i):
+            response = view(fabrica.get(url, parametros(i), headers={'Authorization': cabecalho}))
+            response.render()
+            close_old_connections()
+            return response.status_code
+
+        with ThreadPoolExecutor(max_workers=options['concorrencia']) as executor:
+            inicio = time.perf_counter()
+            codigos = set(executor.map(atender, range(options['requisicoes'])))
+            duracao = time.perf_counter() - inicio
+        assert codigos == {200}, codigos
+        return options['requisicoes'] / duracao
+
+    def _vazao_assincrona(self, view, url, parametros, cabecalho, options):
+        fabrica = AsyncRequestFactory()
+
+        async def medir():
+            semaforo = asyncio.Semaphore(options['concorrencia'])
+
+            async def atender(i):
+                # Como o handler ASGI do Django: cada requisição com sua thread para o ORM.
+                async with semaforo, ThreadSensitiveContext():
+                    response = await view(fabrica.get(url, parametros(i), headers={'Authorization': cabecalho}))
+                    return response.status_code
+
+            inicio = time.perf_counter()
+            codigos = set(await asyncio.gather(*(atender(i) for i in range(options['requisicoes']))))
+            duracao = time.perf_counter() - inicio
+            assert codigos == {200}, codigos
+            return options['requisicoes'] / duracao
+
+        return asyncio.run(medir())
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.classificador import ClassificadorIncremental
+from api.models import Transaction
+from api.sugestoes import reconstruir_modelo
+
+
+class Command(BaseCommand):
+    """
+    Reconstrói, a partir do histórico, o classificador de sugestões de categorias
+    de um usuário ou de todos os usuários com transações categorizadas. Com
+    SUGESTOES_ARTEFATOS_DIR configurado, grava uma nova versão de cada artefato,
+    que os workers em execução passam a usar na consulta seguinte.
+
+    Uso:
+        python manage.py reconstruir_modelos_sugestao [--usuario ID] [--avaliar]
+    """
+    help = 'Reconstrói os modelos de sugestão de categorias a partir do histórico.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', type=int, help='ID do usuário (padrão: todos).')
+        parser.add_argument(
+            '--avaliar', action='store_true',
+            help='Mede a acurácia treinando com 80%% do histórico e testando nos 20%% mais recentes.',
+        )
+
+    def handle(self, *args, **options):
+        usuarios = (
+            Transaction.objects.exclude(category=None)
+            .values_list('user_id', flat=True)
+            .distinct()
+            .order_by('user_id')
+        )
+        if options['usuario'] is not None:
+            usuarios = usuarios.filter(user_id=options['usuario'])
+            if not usuarios.exists():
+                raise CommandError(f"Usuário {options['usuario']} não tem transações categorizadas.")
+
+        for user_id in usuarios.iterator():
+            modelo = reconstruir_modelo(user_id)
+            mensagem = f'Usuário {user_id}: {len(modelo)} transações, {len(modelo.nomes)} categorias'
+            if options['avaliar']:
+                mensagem += ', acurácia top-1 %.1f%%' % (100 * self.avaliar(user_id))
+            self.stdout.write(mensagem)
+        self.stdout.write(self.style.SUCCESS('Modelos reconstruídos.'))
+
+    def avaliar(self, user_id):
+        """
+        Treina incrementalmente com as transações mais antigas e mede o acerto nas mais recentes.
+
+        Parâmetros:
+            user_id (int): ID do usuário.
+        Returns:
+            float: Fração de acertos da primeira sugestão.
+        """
+        linhas = list(
+            Transaction.objects.filter(user_id=user_id)
+            .exclude(category=None)
+            .order_by('date', 'id')
+            .values_list('normalized_description', 'category_id', 'category__name')
+        )
+        corte = int(len(linhas) * 0.8)
+        treino, teste = linhas[:corte], linhas[corte:]
+        if not treino or not teste:
+            return 0.0
+
+        modelo = ClassificadorIncremental()
+        modelo.aprender([d for d, _, _ in treino], [c for _, c, _ in treino], {c: n for _, c, n in treino})
+        previstas = modelo.sugerir_lote([d for d, _, _ in teste], limite=1)
+        acertos = sum(1 for sugestao, (_, _, nome) in zip(previstas, teste) if sugestao and sugestao[0] == nome)
+        return acertos / len(teste)
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.resumos import reconstruir_resumos, verificar_resumos
+
+
+class Command(BaseCommand):
+    """
+    Recalcula o consolidado mensal (`MonthlySummary`) a partir das transações, ou
+    apenas confere se ele bate com a agregação das transações brutas. Necessário
+    depois de escritas que não disparam signals (ex.: `QuerySet.update`).
+
+    Uso:
+        python manage.py reconstruir_resumos [--usuario ID] [--verificar]
+    """
+    help = 'Reconstrói ou verifica o consolidado mensal das transações.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', type=int, help='ID do usuário (padrão: todos).')
+        parser.add_argument(
+            '--verificar', action='store_true',
+            help='Apenas compara o consolidado com as transações, sem alterá-lo.',
+        )
+
+    def handle(self, *args, **options):
+        if options['verificar']:
+            divergencias = verificar_resumos(options['usuario'])
+            for (user_id, category_id, mes, tipo), esperado, atual in divergencias:
+                self.stdout.write(
+                    f'Usuário {user_id}, categoria {category_id}, {mes:%m/%Y}, {tipo}: '
+                    f'esperado {esperado}, consolidado {atual}'
+                )
+            if divergencias:
+                raise CommandError(f'{len(divergencias)} divergência(s) no consolidado mensal.')
+            self.stdout.write(self.style.SUCCESS('Consolidado mensal confere com as transações.'))
+            return
+
+        linhas = reconstruir_resumos(options['usuario'])
+        self.stdout.write(self.style.SUCCESS(f'Consolidado mensal reconstruído: {linhas} linhas.'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.core.exceptions import ImproperlyConfigured
+
+from api.sugestoes import construir_modelo_global, publicar_modelo_global
+
+
+class Command(BaseCommand):
+    """
+    Treina, com o histórico anonimizado de todos os usuários, o modelo global usado
+    nas sugestões de usuários com pouco histórico, e o publica como nova versão do
+    artefato `global` (os workers passam a usá-lo na consulta seguinte).
+
+    Uso:
+        python manage.py treinar_modelo_global [--minimo-usuarios N]
+    """
+    help = 'Treina e publica o modelo global de sugestão de categorias.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--minimo-usuarios', type=int, default=3,
+            help='Quantidade mínima de usuários distintos para manter uma categoria ou termo (padrão: 3).',
+        )
+
+    def handle(self, *args, **options):
+        modelo = construir_modelo_global(options['minimo_usuarios'])
+        try:
+            versao = publicar_modelo_global(modelo)
+        except ImproperlyConfigured as erro:
+            raise CommandError(str(erro))
+        self.stdout.write(
+            f'{len(modelo)} transações, {len(modelo.nomes)} categorias candidatas.'
+        )
+        self.stdout.write(self.style.SUCCESS(f'Modelo global publicado (versão {versao}).'))
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+from api.utils import normalizar
+
+
+def preencher_descricao_normalizada(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    transacoes = Transaction.objects.using(schema_editor.connection.alias)
+    lote = []
+    for transacao in transacoes.only('id', 'description').iterator(chunk_size=2000):
+        transacao.normalized_description = normalizar(transacao.description)[:200]
+        lote.append(transacao)
+        if len(lote) == 2000:
+            transacoes.bulk_update(lote, ['normalized_description'])
+            lote = []
+    if lote:
+        transacoes.bulk_update(lote, ['normalized_description'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_alter_transaction_category_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='normalized_description',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(preencher_descricao_normalizada, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'normalized_description'], name='transaction_user_normdesc_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def consolidar_existentes(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    MonthlySummary = apps.get_model('api', 'MonthlySummary')
+    banco = schema_editor.connection.alias
+    linhas = (
+        Transaction.objects.using(banco)
+        .annotate(mes=TruncMonth('date'))
+        .values('user_id', 'category_id', 'mes', 'transaction_type')
+        .annotate(soma=Sum('value'), quantidade=Count('id'))
+        .order_by()
+    )
+    lote = []
+    for linha in linhas.iterator(chunk_size=2000):
+        lote.append(MonthlySummary(
+            user_id=linha['user_id'], category_id=linha['category_id'], month=linha['mes'],
+            transaction_type=linha['transaction_type'], total=linha['soma'], count=linha['quantidade'],
+        ))
+        if len(lote) == 2000:
+            MonthlySummary.objects.using(banco).bulk_create(lote)
+            lote = []
+    if lote:
+        MonthlySummary.objects.using(banco).bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_transaction_normalized_description'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('transaction_type', models.CharField(choices=[('expense', 'Despesa'), ('income', 'Receita')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to='api.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(condition=models.Q(('category__isnull', False)), fields=('user', 'category', 'month', 'transaction_type'), name='monthly_summary_unique_category'), models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('user', 'month', 'transaction_type'), name='monthly_summary_unique_uncategorized')],
+            },
+        ),
+        migrations.RunPython(consolidar_existentes, migrations.RunPython.noop),
+    ]
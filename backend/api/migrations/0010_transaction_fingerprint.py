@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+from api.utils import fingerprint_transacao
+
+
+def preencher_fingerprint(apps, schema_editor):
+    Transaction = apps.get_model('api', 'Transaction')
+    transacoes = Transaction.objects.using(schema_editor.connection.alias)
+    campos = ('id', 'date', 'value', 'transaction_type', 'normalized_description')
+    lote = []
+    for transacao in transacoes.only(*campos).iterator(chunk_size=2000):
+        transacao.fingerprint = fingerprint_transacao(
+            transacao.date, transacao.value, transacao.transaction_type, transacao.normalized_description,
+        )
+        lote.append(transacao)
+        if len(lote) == 2000:
+            transacoes.bulk_update(lote, ['fingerprint'])
+            lote = []
+    if lote:
+        transacoes.bulk_update(lote, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_statementimport'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.RunPython(preencher_fingerprint, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['user', 'fingerprint'], name='transaction_user_fprint_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_transaction_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='statementimport',
+            name='duplicate_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='statementimport',
+            name='duplicate_rows',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='statementimport',
+            name='skip_duplicates',
+            field=models.BooleanField(default=True),
+        ),
+    ]
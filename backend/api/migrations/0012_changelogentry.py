@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:33
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def registrar_existentes(apps, schema_editor):
+    ChangeLogEntry = apps.get_model('api', 'ChangeLogEntry')
+    banco = schema_editor.connection.alias
+    for nome, entidade in (('Category', 'category'), ('Transaction', 'transaction')):
+        modelo = apps.get_model('api', nome)
+        lote = []
+        for object_id, user_id in modelo.objects.using(banco).order_by('id').values_list('id', 'user_id').iterator(chunk_size=2000):
+            lote.append(ChangeLogEntry(user_id=user_id, entity=entidade, object_id=object_id))
+            if len(lote) == 2000:
+                ChangeLogEntry.objects.using(banco).bulk_create(lote)
+                lote = []
+        if lote:
+            ChangeLogEntry.objects.using(banco).bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_statementimport_duplicates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(choices=[('transaction', 'Transação'), ('category', 'Categoria')], max_length=11)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='change_log', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'id'], name='changelog_user_id_idx'), models.Index(fields=['user', 'entity', 'object_id'], name='changelog_user_object_idx')],
+            },
+        ),
+        migrations.RunPython(registrar_existentes, migrations.RunPython.noop),
+    ]
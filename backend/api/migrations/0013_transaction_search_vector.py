@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:36
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+# A coluna é mantida pelo próprio banco (inclusive em bulk_create, bulk_update e
+# QuerySet.update) e indexada por GIN. O trigger só roda em inserções e em updates
+# que gravam a descrição normalizada: edições em massa de valor ou categoria não
+# recalculam o tsvector. Trigger e índice só existem no PostgreSQL; nos demais
+# bancos a coluna fica nula e a busca compara a descrição normalizada.
+CRIAR_BUSCA = [
+    '''
+    CREATE TRIGGER api_transaction_search_vector_trg
+    BEFORE INSERT OR UPDATE OF normalized_description ON api_transaction
+    FOR EACH ROW EXECUTE FUNCTION
+    tsvector_update_trigger(search_vector, 'pg_catalog.simple', normalized_description)
+    ''',
+    "UPDATE api_transaction SET search_vector = to_tsvector('pg_catalog.simple', normalized_description)",
+    'CREATE INDEX transaction_search_gin_idx ON api_transaction USING gin (search_vector)',
+]
+REMOVER_BUSCA = [
+    'DROP INDEX IF EXISTS transaction_search_gin_idx',
+    'DROP TRIGGER IF EXISTS api_transaction_search_vector_trg ON api_transaction',
+]
+
+
+def _executar_no_postgresql(comandos):
+    def executar(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for comando in comandos:
+            schema_editor.execute(comando)
+    return executar
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_changelogentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='transaction',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(_executar_no_postgresql(CRIAR_BUSCA), _executar_no_postgresql(REMOVER_BUSCA)),
+    ]
@@ -1,5 +1,11 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from datetime import date
+from decimal import Decimal
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, router, transaction
+from django.db.models import Case, Q, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+from .utils import fingerprint_transacao, normalizar
 
 
 class User(AbstractUser):
@@ -32,6 +38,43 @@ class User(AbstractUser):
         return self.email
 
 
+class CategoryQuerySet(models.QuerySet):
+    def com_gastos_do_mes(self, referencia=None):
+        """
+        Anota, em uma única consulta agrupada, o total e a quantidade de despesas do
+        mês de referência e o percentual da meta mensal já gasto. Os valores vêm do
+        consolidado mensal (`MonthlySummary`), sem percorrer as transações do mês.
+        
+        Parâmetros:
+            referencia (date): Dia do mês considerado (padrão: hoje).
+        Returns:
+            QuerySet: Categorias com `current_spent`, `current_count` e `current_percentage`.
+        """
+        referencia = referencia or date.today()
+        do_mes = Q(
+            monthly_summaries__transaction_type='expense',
+            monthly_summaries__month=referencia.replace(day=1),
+        )
+        return self.annotate(
+            current_spent=Coalesce(
+                Sum('monthly_summaries__total', filter=do_mes),
+                Value(Decimal('0')),
+                output_field=models.DecimalField(max_digits=14, decimal_places=2),
+            ),
+            current_count=Coalesce(Sum('monthly_summaries__count', filter=do_mes), Value(0)),
+        ).annotate(
+            # Divisão em ponto flutuante: em alguns bancos a divisão de decimais inteiros trunca.
+            current_percentage=Case(
+                When(
+                    monthly_limit__gt=0,
+                    then=Cast('current_spent', models.FloatField()) * 100.0 / Cast('monthly_limit', models.FloatField()),
+                ),
+                default=None,
+                output_field=models.FloatField(),
+            ),
+        )
+
+
 class Category(models.Model):
     """
     Representa uma categoria de transação financeira, associada a um usuário.
@@ -45,6 +88,8 @@ class Category(models.Model):
     color = models.CharField(max_length=7, default='#167ec5')
     monthly_limit = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
 
+    objects = CategoryQuerySet.as_manager()
+
     def __str__(self):
         """
         Retorna o nome da categoria como representação textual.
@@ -66,6 +111,10 @@ class Transaction(models.Model):
         date (date): Data da transação.
         category (Category): Categoria associada.
         user (User): Usuário dono da transação.
+        normalized_description (str): Descrição normalizada (sem acentos, minúscula), calculada ao salvar.
+        fingerprint (str): Hash de data, valor, tipo e descrição normalizada, usado para detectar duplicatas.
+        search_vector (tsvector): Descrição normalizada indexada para a busca textual, mantida por trigger
+            no PostgreSQL (nula nos demais bancos).
     """
     TRANSACTION_TYPES = (
         ('income', 'Receita'),
@@ -77,7 +126,24 @@ class Transaction(models.Model):
     transaction_type = models.CharField(max_length=10, choices=[('expense', 'Despesa'), ('income', 'Receita')])
     date = models.DateField()
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='transactions')
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Sem o índice simples da FK: os índices compostos abaixo começam por `user`.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
+    normalized_description = models.CharField(max_length=200, blank=True, default='', editable=False)
+    fingerprint = models.CharField(max_length=32, blank=True, default='', editable=False)
+    # Preenchida pelo banco; o índice GIN só existe no PostgreSQL (ver migração 0013).
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        # Todas as consultas filtram por usuário; os demais campos seguem os filtros
+        # e ordenações da listagem, do resumo e das sugestões.
+        indexes = [
+            models.Index(fields=['user', 'normalized_description'], name='transaction_user_normdesc_idx'),
+            models.Index(fields=['user', 'date'], name='transaction_user_date_idx'),
+            models.Index(fields=['user', 'transaction_type', 'date'], name='transaction_user_type_date_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='transaction_user_cat_date_idx'),
+            models.Index(fields=['user', 'value'], name='transaction_user_value_idx'),
+            models.Index(fields=['user', 'fingerprint'], name='transaction_user_fprint_idx'),
+        ]
 
     def __str__(self):
         """
@@ -87,3 +153,220 @@ class Transaction(models.Model):
             str: Descrição e valor da transação.
         """
         return f"{self.description} - {self.value}"
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Guarda os valores carregados do banco para que os signals saibam o estado
+        anterior de uma transação editada ou removida sem consultar o banco novamente.
+        """
+        instance = super().from_db(db, field_names, values)
+        instance._valores_salvos = dict(zip(field_names, values))
+        return instance
+
+    def preencher_campos_derivados(self):
+        """
+        Calcula os campos derivados (descrição normalizada e fingerprint). Chamado por `save`; caminhos que
+        gravam sem passar por `save` (como `bulk_create`) devem chamá-lo antes.
+        """
+        self.normalized_description = normalizar(self.description)[:200]
+        self.fingerprint = fingerprint_transacao(
+            self.date, self.value, self.transaction_type, self.normalized_description,
+        )
+
+    def save(self, *args, **kwargs):
+        """
+        Salva a transação, recalculando os campos derivados, e atualiza o registro
+        dos valores persistidos. A gravação e a atualização do consolidado mensal
+        (feita pelos signals) acontecem na mesma transação do banco.
+        """
+        self.preencher_campos_derivados()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            derivados = set()
+            if 'description' in update_fields:
+                derivados.add('normalized_description')
+            if {'description', 'date', 'value', 'transaction_type'} & set(update_fields):
+                derivados.add('fingerprint')
+            kwargs['update_fields'] = {*update_fields, *derivados}
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+        self.registrar_valores_salvos()
+
+    def registrar_valores_salvos(self):
+        """
+        Registra os valores atuais como o estado persistido. Chamado por `save`;
+        caminhos que gravam sem passar por `save` devem chamá-lo depois.
+        """
+        self._valores_salvos = {f.attname: getattr(self, f.attname) for f in self._meta.concrete_fields}
+
+    @property
+    def valores_salvos(self):
+        """
+        Returns:
+            dict: Valores da transação como estão no banco, ou None se desconhecidos.
+        """
+        return getattr(self, '_valores_salvos', None)
+
+
+class MonthlySummary(models.Model):
+    """
+    Consolidado mensal das transações, mantido incrementalmente a cada escrita
+    (ver `api/resumos.py`) para que resumos e metas não reagreguem todo o histórico.
+    
+    Atributos:
+        user (User): Usuário dono das transações.
+        category (Category): Categoria (nula para transações sem categoria).
+        month (date): Primeiro dia do mês.
+        transaction_type (str): Tipo ('income' ou 'expense').
+        total (Decimal): Soma dos valores.
+        count (int): Quantidade de transações.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_summaries')
+    category = models.ForeignKey(Category, on_delete=models.CASCADE, null=True, blank=True, related_name='monthly_summaries')
+    month = models.DateField()
+    transaction_type = models.CharField(max_length=10, choices=[('expense', 'Despesa'), ('income', 'Receita')])
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'category', 'month', 'transaction_type'],
+                condition=Q(category__isnull=False),
+                name='monthly_summary_unique_category',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'month', 'transaction_type'],
+                condition=Q(category__isnull=True),
+                name='monthly_summary_unique_uncategorized',
+            ),
+        ]
+
+    def __str__(self):
+        """
+        Returns:
+            str: Mês, tipo e total consolidado.
+        """
+        return f"{self.month:%m/%Y} {self.transaction_type} - {self.total}"
+
+
+class StatementImport(models.Model):
+    """
+    Importação de um extrato bancário (CSV ou OFX), processada em lotes (ver
+    `api/importacao.py`). Cada lote é gravado junto com o avanço de `processed_rows`,
+    de modo que uma importação interrompida pode ser retomada do ponto em que parou.
+    
+    Atributos:
+        user (User): Usuário dono das transações importadas.
+        file_name (str): Nome original do arquivo.
+        file_format (str): Formato ('csv' ou 'ofx').
+        file_path (str): Caminho do arquivo guardado até o fim da importação.
+        status (str): Situação ('pending', 'processing', 'done' ou 'failed').
+        processed_rows (int): Linhas do arquivo já processadas (gravadas ou rejeitadas).
+        created_count (int): Transações criadas.
+        error_count (int): Linhas rejeitadas.
+        errors (list): Erros por linha (os primeiros, até o limite guardado).
+        skip_duplicates (bool): Se linhas já existentes (mesmo fingerprint) são puladas ou apenas sinalizadas.
+        duplicate_count (int): Linhas reconhecidas como duplicatas.
+        duplicate_rows (list): Números das linhas duplicadas (os primeiros, até o limite guardado).
+        message (str): Motivo da falha, se houver.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pendente'),
+        ('processing', 'Processando'),
+        ('done', 'Concluída'),
+        ('failed', 'Falhou'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='statement_imports')
+    file_name = models.CharField(max_length=255)
+    file_format = models.CharField(max_length=3, choices=[('csv', 'CSV'), ('ofx', 'OFX')])
+    file_path = models.CharField(max_length=500)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    skip_duplicates = models.BooleanField(default=True)
+    duplicate_count = models.PositiveIntegerField(default=0)
+    duplicate_rows = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        """
+        Returns:
+            str: Nome do arquivo e situação da importação.
+        """
+        return f"{self.file_name} ({self.status})"
+
+
+class ChangeLogEntry(models.Model):
+    """
+    Registro de alterações usado pela sincronização incremental (ver `api/sincronizacao.py`).
+    Cada transação ou categoria do usuário tem no máximo um registro, o da sua última
+    alteração (os anteriores são descartados); exclusões ficam como marcações (tombstones).
+    O `id` crescente é o token de sincronização.
+    
+    Atributos:
+        user (User): Usuário dono do objeto alterado.
+        entity (str): Tipo do objeto ('transaction' ou 'category').
+        object_id (int): ID do objeto alterado.
+        deleted (bool): Se o objeto foi excluído.
+        created_at (datetime): Momento do registro (define quando ele pode entrar na sincronização).
+    """
+    ENTITY_CHOICES = [
+        ('transaction', 'Transação'),
+        ('category', 'Categoria'),
+    ]
+
+    # Sem o índice simples da FK: os índices abaixo começam por `user`.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='change_log', db_index=False)
+    entity = models.CharField(max_length=11, choices=ENTITY_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id'], name='changelog_user_id_idx'),
+            models.Index(fields=['user', 'entity', 'object_id'], name='changelog_user_object_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Returns:
+            str: Tipo e ID do objeto, com a indicação de exclusão.
+        """
+        return f"{self.entity} {self.object_id}{' (excluído)' if self.deleted else ''}"
+
+
+class CategoryRule(models.Model):
+    """
+    Palavra-chave de uma regra própria do usuário para as sugestões de categoria
+    (ver `api/regras.py`), somada às regras fixas globais.
+    
+    Atributos:
+        user (User): Dono da regra.
+        category (str): Nome da categoria sugerida.
+        keyword (str): Palavra-chave que, encontrada na descrição, sugere a categoria.
+    """
+    # Sem o índice simples da FK: a restrição de unicidade abaixo começa por `user`.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='category_rules', db_index=False)
+    category = models.CharField(max_length=100)
+    keyword = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'category', 'keyword'], name='categoryrule_unique'),
+        ]
+
+    def __str__(self):
+        """
+        Returns:
+            str: Palavra-chave e categoria sugerida.
+        """
+        return f"{self.keyword} → {self.category}"
@@ -0,0 +1,130 @@
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class PaginacaoPorCursor(BasePagination):
+    """
+    Paginação por chave (keyset) para listas longas e rolagem infinita: cada página
+    continua a partir do último item da anterior, com um filtro `(campo, id) < cursor`
+    apoiado em índice, sem `COUNT(*)` nem `OFFSET`. A página N custa o mesmo que a primeira.
+
+    A chave é o primeiro campo da ordenação pedida (entre `campos_ordenacao`, padrão
+    `-date`) desempatado pelo `id` no mesmo sentido; o cursor é opaco para o cliente.
+    Ordenações sem chave possível (como a relevância da busca textual) não usam esta
+    paginação: ver `aceita`.
+
+    Atributos:
+        page_size (int): Itens por página.
+        page_size_query_param (str): Parâmetro que altera o tamanho da página.
+        max_page_size (int): Tamanho máximo de página aceito.
+        campos_ordenacao (tuple): Campos aceitos como chave.
+        ordenacao_padrao (str): Chave usada quando não há ordenação.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    campos_ordenacao = ('date', 'value')
+    ordenacao_padrao = '-date'
+
+    def _tamanho_pagina(self, request):
+        try:
+            tamanho = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(tamanho, 1), self.max_page_size)
+
+    def aceita(self, queryset):
+        """
+        Indica se o queryset pode ser paginado por cursor: sem ordenação explícita ou
+        ordenado primeiro por um dos `campos_ordenacao`. Um valor calculado na consulta,
+        como a relevância da busca, não serve de chave, e paginar pela data mudaria a
+        ordem dos resultados.
+
+        Returns:
+            bool: True se a ordenação do queryset tem chave.
+        """
+        ordenacao = queryset.query.order_by
+        return not ordenacao or (
+            isinstance(ordenacao[0], str) and ordenacao[0].lstrip('-') in self.campos_ordenacao
+        )
+
+    def _ordenacao(self, queryset):
+        """
+        Returns:
+            str: Campo da chave, com '-' se decrescente.
+        """
+        for campo in queryset.query.order_by:
+            if isinstance(campo, str) and campo.lstrip('-') in self.campos_ordenacao:
+                return campo
+        return self.ordenacao_padrao
+
+    def codificar_cursor(self, ordenacao, item):
+        campo = ordenacao.lstrip('-')
+        posicao = {'o': ordenacao, 'v': str(getattr(item, campo)), 'id': item.pk}
+        return base64.urlsafe_b64encode(json.dumps(posicao).encode()).decode()
+
+    def decodificar_cursor(self, cursor, ordenacao, modelo):
+        """
+        Returns:
+            tuple: (valor do campo, id) do último item da página anterior.
+        Raises:
+            NotFound: Cursor inválido ou gerado para outra ordenação.
+        """
+        try:
+            posicao = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if posicao['o'] != ordenacao:
+                raise ValueError
+            valor = modelo._meta.get_field(ordenacao.lstrip('-')).to_python(posicao['v'])
+            return valor, int(posicao['id'])
+        except Exception:
+            raise NotFound('Cursor inválido.')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """
+        Retorna os itens da página indicada pelo cursor (ou a primeira página).
+        """
+        self.request = request
+        self.ordenacao = self._ordenacao(queryset)
+        campo = self.ordenacao.lstrip('-')
+        decrescente = self.ordenacao.startswith('-')
+        queryset = queryset.order_by(self.ordenacao, '-pk' if decrescente else 'pk')
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            valor, pk = self.decodificar_cursor(cursor, self.ordenacao, queryset.model)
+            operador = 'lt' if decrescente else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{campo}__{operador}': valor}) | Q(**{campo: valor, f'pk__{operador}': pk})
+            )
+
+        tamanho = self._tamanho_pagina(request)
+        itens = list(queryset[:tamanho + 1])
+        self.tem_proxima = len(itens) > tamanho
+        self.itens = itens[:tamanho]
+        return self.itens
+
+    def get_next_link(self):
+        if not self.tem_proxima:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.codificar_cursor(self.ordenacao, self.itens[-1]))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
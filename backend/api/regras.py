@@ -0,0 +1,193 @@
+import functools
+import re
+
+from django.db import transaction
+
+from .models import CategoryRule
+from .utils import normalizar
+
+
+REGRAS_FIXAS = {
+    "Alimentação": ["mercado", "comida", "restaurante", "supermercado", "lanche", "almoço", "jantar", "café"],
+    "Transporte": ["uber", "gasolina", "ônibus", "metrô", "99", "moto", "bicicleta"],
+    "Saúde": ["farmácia", "remédio", "médico", "hospital", "dentista"],
+    "Roupas": ["roupa", "vestido", "calça", "camiseta", "camisa", "saia", "calção", "bermuda", "short",  "cueca", "calcinha", "sutiã", "roupa íntima"],
+    "Calçados": ["sapato", "tênis", "sandália", "chinelo", "bota", "botas", "sneaker", "tenis de corrida", "tenis de caminhada"],
+    "Lazer": ["cinema", "teatro", "show", "stand up"],
+    "Casa": ["aluguel", "condomínio", "água", "luz", "internet"],
+    "Outros": ["presente", "presente para alguém", "presente para mim"],
+}
+
+
+class MatcherRegras:
+    """
+    Tabela de palavras-chave normalizada, sem duplicatas e compilada em uma única
+    expressão regular, que encontra todas as categorias de uma descrição em uma só passada.
+
+    A expressão é um lookahead com as palavras ordenadas da maior para a menor, de modo
+    que cada posição do texto casa a palavra mais longa que começa ali. As palavras mais
+    curtas que começam na mesma posição são necessariamente prefixos dela, e por isso são
+    pré-calculadas na compilação: o resultado equivale ao de um autômato Aho-Corasick.
+
+    Atributos:
+        categorias (list): Categorias na ordem da tabela original (critério de desempate).
+        palavras (dict): Palavra-chave normalizada -> categoria.
+    """
+
+    def __init__(self, regras):
+        """
+        Normaliza, deduplica e compila a tabela de regras.
+
+        Parâmetros:
+            regras (dict): Categoria -> lista de palavras-chave.
+        """
+        self.categorias = list(regras)
+        self.palavras = {}
+        for categoria, palavras in regras.items():
+            for palavra in palavras:
+                palavra = normalizar(palavra).strip()
+                if palavra:
+                    self.palavras.setdefault(palavra, categoria)
+
+        # Para cada palavra, as palavras (dela e de seus prefixos) que casam junto com ela.
+        self._casadas = {
+            palavra: tuple(p for p in self.palavras if palavra.startswith(p))
+            for palavra in self.palavras
+        }
+        self._ordem = {categoria: i for i, categoria in enumerate(self.categorias)}
+        self._padrao = None
+        if self.palavras:
+            alternativas = sorted(self.palavras, key=len, reverse=True)
+            self._padrao = re.compile('(?=(%s))' % '|'.join(map(re.escape, alternativas)))
+
+    def pontuar(self, texto):
+        """
+        Conta quantas palavras-chave distintas de cada categoria aparecem no texto.
+
+        Parâmetros:
+            texto (str): Descrição já normalizada.
+        Returns:
+            dict: Categoria -> quantidade de palavras-chave encontradas.
+        """
+        if self._padrao is None:
+            return {}
+        encontradas = set()
+        for palavra in self._padrao.findall(texto):
+            encontradas.update(self._casadas[palavra])
+        pontos = {}
+        for palavra in encontradas:
+            categoria = self.palavras[palavra]
+            pontos[categoria] = pontos.get(categoria, 0) + 1
+        return pontos
+
+    def ordenar(self, pontos):
+        """
+        Ordena as categorias pontuadas (mais palavras encontradas primeiro, depois ordem da tabela).
+
+        Parâmetros:
+            pontos (dict): Categoria -> pontuação.
+        Returns:
+            list: Categorias ordenadas.
+        """
+        return sorted(pontos, key=lambda categoria: (-pontos[categoria], self._ordem.get(categoria, len(self._ordem))))
+
+
+matcher_global = MatcherRegras(REGRAS_FIXAS)
+
+
+def definir_regras_usuario(user_id, regras):
+    """
+    Grava as regras próprias de um usuário (substituindo as anteriores), sem
+    recompilar a tabela global. As sugestões passam a usá-las após o commit.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+        regras (dict): Categoria -> lista de palavras-chave.
+    """
+    linhas = {}
+    for categoria, palavras in regras.items():
+        for palavra in palavras:
+            linhas.setdefault((categoria, palavra.strip()), None)
+    with transaction.atomic():
+        CategoryRule.objects.filter(user_id=user_id).delete()
+        CategoryRule.objects.bulk_create(
+            CategoryRule(user_id=user_id, category=categoria, keyword=palavra) for categoria, palavra in linhas if palavra
+        )
+        _invalidar_sugestoes(user_id)
+
+
+def remover_regras_usuario(user_id):
+    """
+    Remove as regras próprias de um usuário.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+    """
+    with transaction.atomic():
+        CategoryRule.objects.filter(user_id=user_id).delete()
+        _invalidar_sugestoes(user_id)
+
+
+def _invalidar_sugestoes(user_id):
+    # Importado aqui: o módulo de sugestões depende deste.
+    from .sugestoes import invalidar_regras
+    transaction.on_commit(lambda: invalidar_regras(user_id))
+
+
+@functools.lru_cache(maxsize=256)
+def _compilar(linhas):
+    regras = {}
+    for categoria, palavra in linhas:
+        regras.setdefault(categoria, []).append(palavra)
+    return MatcherRegras(regras)
+
+
+def matcher_do_usuario(user_id):
+    """
+    Lê do banco as regras próprias do usuário (uma consulta, igual em todos os
+    processos) e retorna o matcher compilado; regras iguais reaproveitam a compilação.
+    As sugestões guardam o resultado junto com o modelo (ver `regras_para_sugestao`).
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+    Returns:
+        MatcherRegras: Matcher das regras do usuário, ou None se ele não tem regras.
+    """
+    linhas = tuple(
+        CategoryRule.objects.filter(user_id=user_id).order_by('id').values_list('category', 'keyword')
+    )
+    return _compilar(linhas) if linhas else None
+
+
+def sugestao_por_regras(descricao, user_id=None, limite=3, matcher_usuario=None):
+    """
+    Sugere categorias pelas palavras-chave encontradas na descrição.
+    As regras do usuário (se houver) têm prioridade sobre as globais em caso de empate.
+
+    Parâmetros:
+        descricao (str): Texto digitado pelo usuário.
+        user_id (int): ID do usuário, para aplicar suas regras próprias.
+        limite (int): Quantidade máxima de categorias retornadas (None: todas).
+        matcher_usuario (MatcherRegras): Regras do usuário já carregadas (ver
+            `matcher_do_usuario`), para não consultar o banco.
+    Returns:
+        list: Categorias ordenadas por relevância.
+    """
+    texto = normalizar(descricao)
+    pontos = matcher_global.pontuar(texto)
+
+    if matcher_usuario is None and user_id is not None:
+        matcher_usuario = matcher_do_usuario(user_id)
+    if matcher_usuario is None:
+        return matcher_global.ordenar(pontos)[:limite]
+
+    pontos_usuario = matcher_usuario.pontuar(texto)
+    for categoria, valor in pontos_usuario.items():
+        pontos[categoria] = pontos.get(categoria, 0) + valor
+
+    def prioridade(categoria):
+        if categoria in pontos_usuario:
+            return (-pontos[categoria], 0, matcher_usuario.categorias.index(categoria))
+        return (-pontos[categoria], 1, matcher_global.categorias.index(categoria))
+
+    return sorted(pontos, key=prioridade)[:limite]
@@ -0,0 +1,336 @@
+import calendar
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .cache_respostas import cache_respostas
+from .models import MonthlySummary, Transaction
+
+# Limite de períodos da série do resumo (cerca de 83 anos por mês ou 19 por semana).
+PERIODOS_MAXIMOS = 1000
+
+
+def primeiro_dia(data):
+    """
+    Parâmetros:
+        data (date | str): Data (ou data ISO) da transação.
+    Returns:
+        date: Primeiro dia do mês da data.
+    """
+    if isinstance(data, str):
+        data = date.fromisoformat(data)
+    return data.replace(day=1)
+
+
+def aplicar(user_id, category_id, data, tipo, valor, quantidade, using='default'):
+    """
+    Soma (ou subtrai, com valores negativos) uma variação ao consolidado do mês,
+    com UPDATE atômico no banco; cria a linha se ainda não existir e a remove quando
+    deixa de ter transações.
+    
+    Parâmetros:
+        user_id (int): ID do usuário.
+        category_id (int): ID da categoria, ou None.
+        data (date): Data da transação.
+        tipo (str): 'income' ou 'expense'.
+        valor (Decimal): Variação do total.
+        quantidade (int): Variação da quantidade de transações.
+        using (str): Alias do banco da escrita.
+    """
+    linhas = MonthlySummary.objects.using(using).filter(
+        user_id=user_id, category_id=category_id, month=primeiro_dia(data), transaction_type=tipo,
+    )
+    if quantidade < 0:
+        linhas.filter(count__lte=-quantidade).delete()
+    if linhas.update(total=F('total') + valor, count=F('count') + quantidade):
+        return
+    if quantidade <= 0:
+        return
+    try:
+        with transaction.atomic(using=using):
+            MonthlySummary.objects.using(using).create(
+                user_id=user_id, category_id=category_id, month=primeiro_dia(data),
+                transaction_type=tipo, total=valor, count=quantidade,
+            )
+    except IntegrityError:
+        # Outra requisição criou a linha ao mesmo tempo: basta somar.
+        linhas.update(total=F('total') + valor, count=F('count') + quantidade)
+
+
+def aplicar_transacao(valores, sinal, using='default'):
+    """
+    Soma (sinal 1) ou subtrai (sinal -1) uma transação do consolidado.
+    
+    Parâmetros:
+        valores (dict): Campos da transação (user_id, category_id, date, transaction_type, value).
+        sinal (int): 1 para incluir, -1 para retirar.
+        using (str): Alias do banco da escrita.
+    """
+    aplicar(
+        valores['user_id'], valores['category_id'], valores['date'], valores['transaction_type'],
+        Decimal(str(valores['value'])) * sinal, sinal, using,
+    )
+
+
+def aplicar_transacoes(alteracoes, using='default'):
+    """
+    Aplica de uma vez as variações de várias transações, somando antes as que caem
+    na mesma linha do consolidado (uma escrita por linha, não por transação).
+    
+    Parâmetros:
+        alteracoes (iterable): Pares (valores, sinal), como em `aplicar_transacao`.
+        using (str): Alias do banco da escrita.
+    """
+    variacoes = {}
+    for valores, sinal in alteracoes:
+        chave = (valores['user_id'], valores['category_id'], primeiro_dia(valores['date']), valores['transaction_type'])
+        total, quantidade = variacoes.get(chave, (Decimal('0'), 0))
+        variacoes[chave] = (total + Decimal(str(valores['value'])) * sinal, quantidade + sinal)
+    for (user_id, category_id, mes, tipo), (total, quantidade) in variacoes.items():
+        if total or quantidade:
+            aplicar(user_id, category_id, mes, tipo, total, quantidade, using)
+
+
+def mover_para_sem_categoria(categoria, using='default'):
+    """
+    Transfere os consolidados de uma categoria que será excluída para "sem categoria",
+    acompanhando o SET NULL aplicado às suas transações.
+    
+    Parâmetros:
+        categoria (Category): Categoria em exclusão.
+        using (str): Alias do banco da escrita.
+    """
+    linhas = MonthlySummary.objects.using(using).filter(category=categoria)
+    for linha in linhas:
+        aplicar(linha.user_id, None, linha.month, linha.transaction_type, linha.total, linha.count, using)
+    linhas.delete()
+
+
+def agregar_transacoes(transacoes):
+    """
+    Agrega transações brutas na granularidade do consolidado.
+    
+    Parâmetros:
+        transacoes (QuerySet): Transações a agregar.
+    Returns:
+        dict: (user_id, category_id, mês, tipo) -> (total, quantidade).
+    """
+    agregados = (
+        transacoes.annotate(mes=TruncMonth('date'))
+        .values('user_id', 'category_id', 'mes', 'transaction_type')
+        .annotate(soma=Sum('value'), quantidade=Count('id'))
+        .order_by()
+    )
+    return {
+        (a['user_id'], a['category_id'], a['mes'], a['transaction_type']): (a['soma'], a['quantidade'])
+        for a in agregados
+    }
+
+
+def verificar_resumos(user_id=None):
+    """
+    Compara o consolidado com a agregação das transações brutas.
+    
+    Parâmetros:
+        user_id (int): Restringe a um usuário (padrão: todos).
+    Returns:
+        list: Divergências como (chave, esperado, consolidado).
+    """
+    transacoes = Transaction.objects.all()
+    resumos = MonthlySummary.objects.all()
+    if user_id is not None:
+        transacoes = transacoes.filter(user_id=user_id)
+        resumos = resumos.filter(user_id=user_id)
+    esperado = agregar_transacoes(transacoes)
+    atual = {
+        (r.user_id, r.category_id, r.month, r.transaction_type): (r.total, r.count)
+        for r in resumos
+    }
+    return [
+        (chave, esperado.get(chave), atual.get(chave))
+        for chave in sorted(set(esperado) | set(atual), key=str)
+        if esperado.get(chave) != atual.get(chave)
+    ]
+
+
+def reconstruir_resumos(user_id=None):
+    """
+    Recalcula o consolidado a partir das transações brutas e invalida as respostas
+    em cache dos usuários afetados.
+    
+    Parâmetros:
+        user_id (int): Restringe a um usuário (padrão: todos).
+    Returns:
+        int: Quantidade de linhas de consolidado gravadas.
+    """
+    transacoes = Transaction.objects.all()
+    resumos = MonthlySummary.objects.all()
+    if user_id is not None:
+        transacoes = transacoes.filter(user_id=user_id)
+        resumos = resumos.filter(user_id=user_id)
+    with transaction.atomic():
+        usuarios = set(resumos.values_list('user_id', flat=True).distinct())
+        resumos.delete()
+        linhas = [
+            MonthlySummary(
+                user_id=usuario, category_id=categoria, month=mes,
+                transaction_type=tipo, total=total, count=quantidade,
+            )
+            for (usuario, categoria, mes, tipo), (total, quantidade) in agregar_transacoes(transacoes).items()
+        ]
+        MonthlySummary.objects.bulk_create(linhas, batch_size=1000)
+        for usuario in usuarios | {linha.user_id for linha in linhas}:
+            cache_respostas.invalidar(usuario)
+    return len(linhas)
+
+
+def _fim_do_mes(data):
+    return data.replace(day=calendar.monthrange(data.year, data.month)[1])
+
+
+def _proximo_periodo(periodo, granularidade):
+    """
+    Returns:
+        date: Início do período seguinte, ou None depois do último representável.
+    """
+    try:
+        if granularidade == 'week':
+            return periodo + timedelta(days=7)
+        if periodo.month == 12:
+            return periodo.replace(year=periodo.year + 1, month=1, day=1)
+        return periodo.replace(month=periodo.month + 1, day=1)
+    except (OverflowError, ValueError):
+        return None
+
+
+def _inicio_periodo(data, granularidade):
+    if granularidade == 'week':
+        # 01/01/0001 é uma segunda-feira: a subtração nunca sai do intervalo de datas.
+        return data - timedelta(days=data.weekday())
+    return data.replace(day=1)
+
+
+def quantidade_de_periodos(inicio, fim, granularidade='month'):
+    """
+    Returns:
+        int: Quantidade de períodos (meses ou semanas) da série entre as duas datas.
+    """
+    if granularidade == 'week':
+        return (_inicio_periodo(fim, 'week') - _inicio_periodo(inicio, 'week')).days // 7 + 1
+    return (fim.year - inicio.year) * 12 + fim.month - inicio.month + 1
+
+
+def consulta_do_resumo(user, inicio=None, fim=None, granularidade='month'):
+    """
+    Monta a consulta do resumo: uma única agregação condicional, agrupada por período
+    e categoria. Quando o período cobre meses inteiros e a série é mensal, lê o
+    consolidado mensal; caso contrário, agrega as transações do intervalo.
+    
+    Parâmetros:
+        user (User): Dono das transações.
+        inicio (date): Primeiro dia considerado (padrão: sem limite).
+        fim (date): Último dia considerado (padrão: sem limite).
+        granularidade (str): 'month' ou 'week'.
+    Returns:
+        QuerySet: Linhas com periodo, category__name, category__color, receitas e despesas.
+    """
+    meses_inteiros = (inicio is None or inicio.day == 1) and (fim is None or fim == _fim_do_mes(fim))
+    if granularidade == 'month' and meses_inteiros:
+        linhas = MonthlySummary.objects.filter(user=user)
+        if inicio:
+            linhas = linhas.filter(month__gte=inicio)
+        if fim:
+            linhas = linhas.filter(month__lte=fim)
+        linhas = linhas.annotate(periodo=F('month'))
+        valor = 'total'
+    else:
+        linhas = Transaction.objects.filter(user=user)
+        if inicio:
+            linhas = linhas.filter(date__gte=inicio)
+        if fim:
+            linhas = linhas.filter(date__lte=fim)
+        truncar = TruncWeek if granularidade == 'week' else TruncMonth
+        linhas = linhas.annotate(periodo=truncar('date'))
+        valor = 'value'
+
+    return (
+        linhas.values('periodo', 'category__name', 'category__color')
+        .annotate(
+            receitas=Sum(valor, filter=Q(transaction_type='income')),
+            despesas=Sum(valor, filter=Q(transaction_type='expense')),
+        )
+        .order_by('periodo')
+    )
+
+
+def montar_resumo(linhas, inicio=None, fim=None, granularidade='month'):
+    """
+    Calcula os totais, as despesas por categoria e a série temporal a partir das
+    linhas de `consulta_do_resumo`, preenchendo com zeros os períodos vazios.
+    
+    Parâmetros:
+        linhas (iterable): Linhas da consulta do resumo.
+        inicio (date): Primeiro dia considerado (padrão: sem limite).
+        fim (date): Último dia considerado (padrão: sem limite).
+        granularidade (str): 'month' ou 'week'.
+    Returns:
+        dict: total_income, total_expense, balance, by_category e series.
+    """
+    series = {}
+    por_categoria = {}
+    for linha in linhas:
+        receitas = linha['receitas'] or 0
+        despesas = linha['despesas'] or 0
+        periodo = series.setdefault(linha['periodo'], [0, 0])
+        periodo[0] += receitas
+        periodo[1] += despesas
+        if linha['despesas'] is not None:
+            chave = (linha['category__name'] or 'Sem categoria', linha['category__color'] or '#ccc')
+            por_categoria[chave] = por_categoria.get(chave, 0) + despesas
+
+    # Preenche com zeros os períodos sem transações, para uma série contínua. Sem
+    # início ou fim, o intervalo vem das transações e pode passar do limite (o
+    # serializer só limita o informado): nesse caso a série fica só com os períodos com dados.
+    if series or (inicio and fim):
+        primeiro = _inicio_periodo(inicio, granularidade) if inicio else min(series)
+        ultimo = _inicio_periodo(fim, granularidade) if fim else max(series)
+        if quantidade_de_periodos(primeiro, ultimo, granularidade) <= PERIODOS_MAXIMOS:
+            periodo = primeiro
+            while periodo is not None and periodo <= ultimo:
+                series.setdefault(periodo, [0, 0])
+                periodo = _proximo_periodo(periodo, granularidade)
+
+    total_receitas = sum(receitas for receitas, _ in series.values())
+    total_despesas = sum(despesas for _, despesas in series.values())
+    return {
+        'total_income': total_receitas,
+        'total_expense': total_despesas,
+        'balance': total_receitas - total_despesas,
+        'by_category': [
+            {'name': nome, 'total': total, 'color': cor}
+            for (nome, cor), total in por_categoria.items()
+        ],
+        'series': [
+            {'period': periodo, 'income': receitas, 'expense': despesas, 'balance': receitas - despesas}
+            for periodo, (receitas, despesas) in sorted(series.items())
+        ],
+    }
+
+
+def resumo_do_periodo(user, inicio=None, fim=None, granularidade='month'):
+    """
+    Calcula os totais, as despesas por categoria e a série temporal de receitas,
+    despesas e saldo do período com uma única consulta (ver `consulta_do_resumo`).
+    
+    Parâmetros:
+        user (User): Dono das transações.
+        inicio (date): Primeiro dia considerado (padrão: sem limite).
+        fim (date): Último dia considerado (padrão: sem limite).
+        granularidade (str): 'month' ou 'week'.
+    Returns:
+        dict: total_income, total_expense, balance, by_category e series.
+    """
+    return montar_resumo(consulta_do_resumo(user, inicio, fim, granularidade), inicio, fim, granularidade)
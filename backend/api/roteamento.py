@@ -0,0 +1,116 @@
+import contextlib
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from .cache_respostas import cache_compartilhado
+
+# Banco escolhido para as leituras do trecho em andamento (None: o principal).
+_banco_de_leitura = ContextVar('banco_de_leitura', default=None)
+
+
+def _cache():
+    return caches[getattr(settings, 'RESPOSTAS_CACHE_ALIAS', 'default')]
+
+
+def _chave(user_id):
+    return f'escrita:recente:{user_id}'
+
+
+def replicas():
+    """
+    Returns:
+        list: Aliases de DATABASES que são réplicas de leitura do banco principal.
+    """
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def registrar_escrita(user_id):
+    """
+    Abre, agora e de novo após o commit, a janela em que as leituras do usuário ficam
+    no banco principal (REPLICAS_JANELA_ESCRITA segundos), para que ele não veja na
+    réplica, ainda atrasada, um saldo anterior à própria escrita.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+    """
+    if not replicas():
+        return
+    janela = getattr(settings, 'REPLICAS_JANELA_ESCRITA', 5)
+    _cache().set(_chave(user_id), True, timeout=janela)
+    transaction.on_commit(lambda: _cache().set(_chave(user_id), True, timeout=janela))
+
+
+def verificar_cache_das_replicas(app_configs, **kwargs):
+    """
+    System check: com réplicas, a marcação de `registrar_escrita` precisa ficar em um
+    cache visto por todos os workers; na memória local, a leitura atendida por outro
+    worker iria para a réplica logo após a escrita.
+
+    Returns:
+        list: Erro `api.E001` se houver réplicas e o cache não for compartilhado.
+    """
+    if replicas() and not cache_compartilhado(_cache()):
+        return [checks.Error(
+            'DATABASE_REPLICAS exige um cache compartilhado entre os processos.',
+            hint='Configure REDIS_URL (ou outro backend compartilhado em CACHES).',
+            id='api.E001',
+        )]
+    return []
+
+
+@contextlib.contextmanager
+def leitura_em_replica(user_id):
+    """
+    Envia para uma réplica as leituras feitas dentro do bloco, a menos que o usuário
+    tenha escrito há pouco (ver `registrar_escrita`). Escritas seguem no principal.
+
+    Parâmetros:
+        user_id (int): ID do usuário dono dos dados lidos.
+    """
+    disponiveis = replicas()
+    recente = disponiveis and _cache().get(_chave(user_id))
+    token = _banco_de_leitura.set(random.choice(disponiveis) if disponiveis and not recente else None)
+    try:
+        yield
+    finally:
+        _banco_de_leitura.reset(token)
+
+
+@contextlib.asynccontextmanager
+async def aleitura_em_replica(user_id):
+    """
+    Versão assíncrona de `leitura_em_replica`, para as views assíncronas.
+    """
+    disponiveis = replicas()
+    recente = disponiveis and await _cache().aget(_chave(user_id))
+    token = _banco_de_leitura.set(random.choice(disponiveis) if disponiveis and not recente else None)
+    try:
+        yield
+    finally:
+        _banco_de_leitura.reset(token)
+
+
+class RoteadorReplicas:
+    """
+    Router de banco: as leituras dos trechos marcados por `leitura_em_replica` vão
+    para a réplica escolhida; as demais leituras e todas as escritas vão para o
+    banco principal.
+    """
+
+    def db_for_read(self, model, **hints):
+        return _banco_de_leitura.get()
+
+    def db_for_write(self, model, **hints):
+        # Explícito: sem isso, salvar uma instância lida da réplica gravaria nela.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bancos = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+        return None
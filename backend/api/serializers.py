@@ -1,6 +1,10 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import User, Category, Transaction
+from .models import User, Category, StatementImport, Transaction
+from .resumos import PERIODOS_MAXIMOS, quantidade_de_periodos
+from .utils import formato_do_arquivo
 from datetime import date
+from decimal import Decimal
 
 
 class UserSerializer(serializers.ModelSerializer):
@@ -69,25 +73,72 @@ class CategorySerializer(serializers.ModelSerializer):
         color (str): Cor da categoria.
         monthly_limit (Decimal): Meta de gasto mensal.
         current_spent (Decimal): Gasto do mês atual na categoria.
+        current_count (int): Quantidade de despesas do mês atual na categoria.
+        current_percentage (float): Percentual da meta mensal já gasto.
     """
     current_spent = serializers.SerializerMethodField()
+    current_count = serializers.SerializerMethodField()
+    current_percentage = serializers.SerializerMethodField()
 
     class Meta:
         model = Category
         fields = '__all__'
         read_only_fields = ['user']
 
+    def _gastos_do_mes(self, obj):
+        """
+        Retorna os gastos do mês atual na categoria. Usa os valores anotados pela
+        listagem (`Category.objects.com_gastos_do_mes`) e só consulta o banco, com um
+        único aggregate, para instâncias não anotadas (criação e edição).
+        
+        Parâmetros:
+            obj (Category): Categoria.
+        Returns:
+            dict: Total gasto, quantidade de despesas e percentual da meta.
+        """
+        if not hasattr(obj, 'current_spent'):
+            anotada = Category.objects.com_gastos_do_mes().filter(pk=obj.pk).values(
+                'current_spent', 'current_count', 'current_percentage',
+            ).first() or {}
+            obj.current_spent = anotada.get('current_spent', Decimal('0'))
+            obj.current_count = anotada.get('current_count', 0)
+            obj.current_percentage = anotada.get('current_percentage')
+        return {
+            'spent': obj.current_spent,
+            'count': obj.current_count,
+            'percentage': obj.current_percentage,
+        }
+
+    def update(self, instance, validated_data):
+        """
+        Atualiza a categoria descartando os gastos anotados, que dependem da meta alterada.
+        """
+        instance = super().update(instance, validated_data)
+        for campo in ('current_spent', 'current_count', 'current_percentage'):
+            instance.__dict__.pop(campo, None)
+        return instance
+
     def get_current_spent(self, obj):
-        today = date.today()
-        month = today.month
-        year = today.year
-        qs = obj.transactions.filter(
-            transaction_type='expense',
-            date__year=year,
-            date__month=month
-        )
-        print(f"[DEBUG] Categoria {obj.name} tem {qs.count()} transações de despesa em {month}/{year}")
-        return sum(t.value for t in qs)
+        """
+        Returns:
+            Decimal: Gasto do mês atual na categoria.
+        """
+        return self._gastos_do_mes(obj)['spent']
+
+    def get_current_count(self, obj):
+        """
+        Returns:
+            int: Quantidade de despesas do mês atual na categoria.
+        """
+        return self._gastos_do_mes(obj)['count']
+
+    def get_current_percentage(self, obj):
+        """
+        Returns:
+            float: Percentual da meta mensal já gasto, ou None se não houver meta.
+        """
+        percentual = self._gastos_do_mes(obj)['percentage']
+        return round(percentual, 2) if percentual is not None else None
 
     def validate_name(self, value):
         """
@@ -103,6 +154,27 @@ class CategorySerializer(serializers.ModelSerializer):
         return value
 
 
+class CategoriaField(serializers.PrimaryKeyRelatedField):
+    """
+    Campo de categoria que, nas operações em lote, resolve o ID pelas categorias
+    pré-carregadas no contexto (`categorias`), em vez de uma consulta por item.
+    """
+
+    def to_internal_value(self, data):
+        categorias = self.context.get('categorias')
+        if categorias is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if pk not in categorias:
+            self.fail('does_not_exist', pk_value=data)
+        return categorias[pk]
+
+
 class TransactionSerializer(serializers.ModelSerializer):
     """
     Serializer para transações financeiras, com validações de valor, data e categoria.
@@ -117,6 +189,7 @@ class TransactionSerializer(serializers.ModelSerializer):
         category_name (str): Nome da categoria (somente leitura).
         category_color (str): Cor da categoria (somente leitura).
     """
+    category = CategoriaField(queryset=Category.objects.all(), allow_null=True, required=False)
     category_name = serializers.CharField(source='category.name', read_only=True)
     category_color = serializers.CharField(source='category.color', read_only=True)
 
@@ -159,8 +232,9 @@ class TransactionSerializer(serializers.ModelSerializer):
         Raises:
             serializers.ValidationError: Se a categoria não pertencer ao usuário.
         """
-        user = self.context['request'].user
-        if value and value.user != user:
+        # Fora de uma requisição (importações), o usuário vem direto no contexto.
+        user = self.context['user'] if 'user' in self.context else self.context['request'].user
+        if value and value.user_id != user.id:
             raise serializers.ValidationError('Categoria não pertence ao usuário autenticado.')
         return value
 
@@ -178,3 +252,218 @@ class TransactionSerializer(serializers.ModelSerializer):
         if value > date.today():
             raise serializers.ValidationError('A data não pode ser futura.')
         return value
+
+
+def categorias_do_lote(itens):
+    """
+    Carrega, em uma única consulta, as categorias referenciadas por um lote de itens.
+    
+    Parâmetros:
+        itens (list): Itens recebidos (dicionários com a chave opcional `category`).
+    Returns:
+        dict: ID -> Category, para o contexto de `TransactionSerializer`.
+    """
+    ids = set()
+    for item in itens:
+        try:
+            ids.add(int(item['category']))
+        except (KeyError, TypeError, ValueError):
+            continue
+    return Category.objects.in_bulk(ids) if ids else {}
+
+
+class FiltroTransacoesSerializer(serializers.Serializer):
+    """
+    Serializer dos filtros da listagem de transações. Os filtros viram comparações
+    de igualdade e intervalos atendidos pelos índices iniciados por usuário.
+    
+    Campos:
+        tipo (str): Tipo da transação.
+        categoria (list): IDs de categoria (aceita `categoria=1&categoria=2` ou `categoria=1,2`).
+        data (date): Data exata.
+        data_inicio (date): Data mínima (inclusiva).
+        data_fim (date): Data máxima (inclusiva).
+        valor_min (Decimal): Valor mínimo (inclusivo).
+        valor_max (Decimal): Valor máximo (inclusivo).
+    """
+    tipo = serializers.ChoiceField(choices=['expense', 'income'], required=False)
+    categoria = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, max_length=100)
+    data = serializers.DateField(required=False)
+    data_inicio = serializers.DateField(required=False)
+    data_fim = serializers.DateField(required=False)
+    valor_min = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    valor_max = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+    LOOKUPS = {
+        'transaction_type': 'tipo',
+        'category_id__in': 'categoria',
+        'date': 'data',
+        'date__gte': 'data_inicio',
+        'date__lte': 'data_fim',
+        'value__gte': 'valor_min',
+        'value__lte': 'valor_max',
+    }
+
+    @classmethod
+    def dos_parametros(cls, query_params):
+        """
+        Monta o serializer a partir da query string, ignorando parâmetros vazios.
+        
+        Parâmetros:
+            query_params (QueryDict): Parâmetros da requisição.
+        Returns:
+            FiltroTransacoesSerializer: Serializer ainda não validado.
+        """
+        dados = {
+            campo: query_params[campo]
+            for campo in ('tipo', 'data', 'data_inicio', 'data_fim', 'valor_min', 'valor_max')
+            if query_params.get(campo)
+        }
+        categorias = [c for valor in query_params.getlist('categoria') for c in valor.split(',') if c]
+        if categorias:
+            dados['categoria'] = categorias
+        return cls(data=dados)
+
+    def validate(self, data):
+        """
+        Garante intervalos com início menor ou igual ao fim.
+        """
+        if data.get('data_inicio') and data.get('data_fim') and data['data_inicio'] > data['data_fim']:
+            raise serializers.ValidationError("A data inicial não pode ser posterior à data final.")
+        if (data.get('valor_min') is not None and data.get('valor_max') is not None
+                and data['valor_min'] > data['valor_max']):
+            raise serializers.ValidationError("O valor mínimo não pode ser maior que o valor máximo.")
+        return data
+
+    def filtrar(self, queryset):
+        """
+        Aplica os filtros validados ao queryset de transações.
+        
+        Parâmetros:
+            queryset (QuerySet): Transações do usuário.
+        Returns:
+            QuerySet: Transações filtradas.
+        """
+        return queryset.filter(**{
+            lookup: self.validated_data[campo]
+            for lookup, campo in self.LOOKUPS.items()
+            if campo in self.validated_data
+        })
+
+
+class SugestaoLoteSerializer(serializers.Serializer):
+    """
+    Serializer da requisição de sugestões em lote.
+    
+    Campos:
+        descricoes (list): Descrições a classificar (até 1000 por requisição).
+    """
+    descricoes = serializers.ListField(
+        child=serializers.CharField(max_length=200, allow_blank=True, trim_whitespace=False),
+        allow_empty=False,
+        max_length=1000,
+    )
+
+
+class ResumoPeriodoSerializer(serializers.Serializer):
+    """
+    Serializer dos parâmetros do resumo de transações.
+    
+    Campos:
+        start (date): Primeiro dia do período (opcional).
+        end (date): Último dia do período (opcional).
+        granularity (str): Agrupamento da série temporal ('month' ou 'week').
+    """
+    start = serializers.DateField(required=False)
+    end = serializers.DateField(required=False)
+    granularity = serializers.ChoiceField(choices=['month', 'week'], default='month')
+
+    def validate(self, data):
+        """
+        Garante que o início do período não seja posterior ao fim e que a série não
+        passe de PERIODOS_MAXIMOS períodos.
+        """
+        if data.get('start') and data.get('end'):
+            if data['start'] > data['end']:
+                raise serializers.ValidationError("A data inicial não pode ser posterior à data final.")
+            if quantidade_de_periodos(data['start'], data['end'], data['granularity']) > PERIODOS_MAXIMOS:
+                raise serializers.ValidationError(
+                    f"O período não pode ter mais de {PERIODOS_MAXIMOS} "
+                    f"{'semanas' if data['granularity'] == 'week' else 'meses'}."
+                )
+        return data
+
+
+class AutocompletarSerializer(serializers.Serializer):
+    """
+    Serializer dos parâmetros do autocompletar de descrições.
+    
+    Campos:
+        q (str): Início da descrição digitada.
+        limit (int): Quantidade máxima de descrições (1 a 20).
+    """
+    q = serializers.CharField(max_length=200, allow_blank=True, trim_whitespace=False, default='')
+    limit = serializers.IntegerField(min_value=1, max_value=20, default=5)
+
+
+class SincronizacaoSerializer(serializers.Serializer):
+    """
+    Serializer dos parâmetros da sincronização incremental.
+    
+    Campos:
+        since (int): Token devolvido pela sincronização anterior (0 ou ausente na primeira).
+    """
+    since = serializers.IntegerField(min_value=0, default=0)
+
+
+class StatementImportSerializer(serializers.ModelSerializer):
+    """
+    Serializer (somente leitura) do andamento e do relatório de uma importação de extrato.
+    """
+
+    class Meta:
+        model = StatementImport
+        fields = [
+            'id', 'file_name', 'file_format', 'status', 'processed_rows', 'created_count',
+            'error_count', 'errors', 'skip_duplicates', 'duplicate_count', 'duplicate_rows',
+            'message', 'created_at', 'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class EnvioExtratoSerializer(serializers.Serializer):
+    """
+    Serializer do envio de um extrato para importação.
+    
+    Campos:
+        arquivo (File): Extrato CSV ou OFX.
+        formato (str): Formato do arquivo (padrão: pela extensão).
+        manter_duplicadas (bool): Importa também as linhas que já existem, apenas sinalizando-as.
+    """
+    arquivo = serializers.FileField()
+    formato = serializers.ChoiceField(choices=['csv', 'ofx'], required=False)
+    manter_duplicadas = serializers.BooleanField(default=False)
+
+    def validate_arquivo(self, arquivo):
+        """
+        Recusa arquivos acima de IMPORTACAO_TAMANHO_MAXIMO: a importação pela API roda
+        durante a requisição.
+        """
+        limite = getattr(settings, 'IMPORTACAO_TAMANHO_MAXIMO', 5 * 1024 * 1024)
+        if arquivo.size > limite:
+            raise serializers.ValidationError(
+                f'O arquivo passa do limite de {limite} bytes; importe-o com o comando importar_extrato.'
+            )
+        return arquivo
+
+    def validate(self, data):
+        """
+        Define o formato pela extensão quando não informado.
+        """
+        if 'formato' not in data:
+            formato = formato_do_arquivo(data['arquivo'].name)
+            if formato is None:
+                raise serializers.ValidationError({'formato': 'Informe o formato do arquivo (csv ou ofx).'})
+            data['formato'] = formato
+        return data
+
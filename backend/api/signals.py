@@ -1,6 +1,17 @@
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
-from .models import User
+from .models import User, Category, Transaction
+from . import resumos
+from .autenticacao import invalidar_usuario
+from .autocompletar import atualizar_indice, invalidar_indice
+from .cache_respostas import cache_respostas
+from .lote import em_lote
+from .roteamento import registrar_escrita
+from .sincronizacao import ENTIDADES, exclusao_do_usuario, registrar_alteracoes
+from .sugestoes import atualizar_modelo, invalidar_modelo
+
+CAMPOS_RESUMO = ('user_id', 'category_id', 'date', 'transaction_type', 'value')
 
 
 def notify_user_created(user):
@@ -26,3 +37,353 @@ def user_created_signal(sender, instance, created, **kwargs):
     """
     if created:
         notify_user_created(instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def usuario_autenticado_signal(sender, instance, **kwargs):
+    """
+    Signal Observer: descarta o usuário guardado pela autenticação JWT a cada escrita
+    (inclusive a desativação e a criação, que pode reaproveitar o ID).
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (User): Instância salva ou removida.
+        **kwargs: Argumentos adicionais.
+    """
+    invalidar_usuario(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Transaction)
+@receiver(post_delete, sender=Transaction)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def versao_dados_signal(sender, instance, **kwargs):
+    """
+    Signal Observer: troca a versão dos dados do usuário a cada escrita, invalidando
+    as respostas em cache (usuários novos começam com uma versão nova), e mantém suas
+    leituras no banco principal enquanto as réplicas alcançam a escrita.
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Model): Instância salva ou removida.
+        **kwargs: Argumentos adicionais.
+    """
+    if sender is User:
+        if kwargs.get('created'):
+            cache_respostas.invalidar(instance.pk)
+        return
+    if not em_lote():
+        cache_respostas.invalidar(instance.user_id)
+        registrar_escrita(instance.user_id)
+
+
+@receiver(post_save, sender=Transaction)
+@receiver(post_save, sender=Category)
+def sincronizacao_salva_signal(sender, instance, raw, using, **kwargs):
+    """
+    Signal Observer: registra a transação ou categoria salva para a sincronização incremental.
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Model): Instância salva.
+        raw (bool): Indica carga de fixture.
+        using (str): Alias do banco.
+        **kwargs: Argumentos adicionais.
+    """
+    if raw or em_lote():
+        return
+    registrar_alteracoes(instance.user_id, ENTIDADES[sender], [instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Transaction)
+@receiver(post_delete, sender=Category)
+def sincronizacao_removida_signal(sender, instance, using, origin=None, **kwargs):
+    """
+    Signal Observer: registra a exclusão (tombstone) da transação ou categoria para
+    a sincronização incremental.
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Model): Instância removida.
+        using (str): Alias do banco.
+        origin (object): Instância ou QuerySet que originou a exclusão.
+        **kwargs: Argumentos adicionais.
+    """
+    if em_lote() or exclusao_do_usuario(origin):
+        return
+    registrar_alteracoes(instance.user_id, ENTIDADES[sender], [instance.pk], removidos=True, using=using)
+
+
+@receiver(pre_save, sender=Transaction)
+def transacao_carregar_estado_signal(sender, instance, raw, using, update_fields, **kwargs):
+    """
+    Signal Observer: garante que o estado anterior de uma transação editada seja
+    conhecido (consultando o banco só quando a instância não veio dele).
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Transaction): Instância a ser salva.
+        raw (bool): Indica carga de fixture.
+        using (str): Alias do banco.
+        update_fields (set): Campos atualizados, se restritos.
+        **kwargs: Argumentos adicionais.
+    """
+    if raw or instance.pk is None:
+        return
+    anteriores = instance.valores_salvos or {}
+    if {'normalized_description', *CAMPOS_RESUMO} <= anteriores.keys():
+        return
+    atuais = Transaction.objects.using(using).filter(pk=instance.pk).values().first()
+    if atuais is not None:
+        instance._valores_salvos = {**atuais, **anteriores}
+
+
+@receiver(post_save, sender=Transaction)
+def transacao_resumo_signal(sender, instance, created, raw, using, **kwargs):
+    """
+    Signal Observer: atualiza o consolidado mensal na mesma transação do banco
+    da gravação (retirando a versão anterior, no caso de edição).
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Transaction): Instância salva.
+        created (bool): Indica se foi criada.
+        raw (bool): Indica carga de fixture.
+        using (str): Alias do banco.
+        **kwargs: Argumentos adicionais.
+    """
+    if raw or em_lote():
+        return
+    atuais = {campo: getattr(instance, campo) for campo in CAMPOS_RESUMO}
+    if not created:
+        anteriores = {campo: (instance.valores_salvos or {}).get(campo) for campo in CAMPOS_RESUMO}
+        if anteriores == atuais:
+            return
+        if anteriores['user_id'] is not None:
+            resumos.aplicar_transacao(anteriores, -1, using)
+    resumos.aplicar_transacao(atuais, 1, using)
+
+
+@receiver(post_delete, sender=Transaction)
+def transacao_resumo_removida_signal(sender, instance, using, **kwargs):
+    """
+    Signal Observer: retira a transação excluída do consolidado mensal.
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Transaction): Instância removida.
+        using (str): Alias do banco.
+        **kwargs: Argumentos adicionais.
+    """
+    if em_lote():
+        return
+    valores = {**{campo: getattr(instance, campo) for campo in CAMPOS_RESUMO}, **(instance.valores_salvos or {})}
+    resumos.aplicar_transacao(valores, -1, using)
+
+
+@receiver(pre_delete, sender=Category)
+def categoria_resumo_signal(sender, instance, using, origin=None, **kwargs):
+    """
+    Signal Observer: move os consolidados da categoria excluída para "sem categoria",
+    como o SET NULL faz com as transações (que não disparam signals nesse caso), e
+    registra essas transações como alteradas para a sincronização incremental.
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Category): Instância em exclusão.
+        using (str): Alias do banco.
+        origin (object): Instância ou QuerySet que originou a exclusão.
+        **kwargs: Argumentos adicionais.
+    """
+    resumos.mover_para_sem_categoria(instance, using)
+    if not exclusao_do_usuario(origin):
+        registrar_alteracoes(
+            instance.user_id, 'transaction',
+            Transaction.objects.using(using).filter(category=instance).values_list('id', flat=True),
+            using=using,
+        )
+
+
+def _apos_commit(user_id, alteracoes):
+    """
+    Aplica as alterações no modelo de sugestão do usuário somente após o commit,
+    para que uma transação desfeita não deixe o modelo com dados inexistentes.
+    """
+    transaction.on_commit(lambda: atualizar_modelo(user_id, alteracoes))
+
+
+@receiver(post_save, sender=Transaction)
+def transacao_salva_signal(sender, instance, created, **kwargs):
+    """
+    Signal Observer: treina incrementalmente o modelo de sugestão com a transação
+    criada ou editada (esquecendo a versão anterior, no caso de edição).
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Transaction): Instância salva.
+        created (bool): Indica se foi criada.
+        **kwargs: Argumentos adicionais.
+    """
+    if em_lote():
+        return
+    anteriores = instance.valores_salvos
+    if not created and (anteriores is None or not {'normalized_description', 'category_id'} <= anteriores.keys()):
+        # Estado anterior desconhecido (instância não carregada do banco): retreina.
+        user_id = instance.user_id
+        transaction.on_commit(lambda: invalidar_modelo(user_id))
+        return
+
+    esquecer = []
+    if not created and anteriores.get('category_id') is not None:
+        esquecer.append((anteriores['normalized_description'], anteriores['category_id']))
+    aprender = []
+    nomes = {}
+    if instance.category_id is not None:
+        aprender.append((instance.normalized_description, instance.category_id))
+        nomes[instance.category_id] = instance.category.name
+    if esquecer == aprender:
+        return
+
+    alteracoes = []
+    if esquecer:
+        alteracoes.append(('esquecer', *map(list, zip(*esquecer))))
+    if aprender:
+        alteracoes.append(('aprender', *map(list, zip(*aprender)), nomes))
+    _apos_commit(instance.user_id, alteracoes)
+
+
+@receiver(post_delete, sender=Transaction)
+def transacao_removida_signal(sender, instance, **kwargs):
+    """
+    Signal Observer: remove a transação excluída do modelo de sugestão.
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Transaction): Instância removida.
+        **kwargs: Argumentos adicionais.
+    """
+    if em_lote():
+        return
+    valores = instance.valores_salvos or {
+        'normalized_description': instance.normalized_description,
+        'category_id': instance.category_id,
+    }
+    if valores['category_id'] is not None:
+        descricao, categoria_id = valores['normalized_description'], valores['category_id']
+        _apos_commit(instance.user_id, [('esquecer', [descricao], [categoria_id])])
+
+
+@receiver(post_save, sender=Category)
+def categoria_salva_signal(sender, instance, created, **kwargs):
+    """
+    Signal Observer: reflete a renomeação da categoria nas sugestões.
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Category): Instância salva.
+        created (bool): Indica se foi criada.
+        **kwargs: Argumentos adicionais.
+    """
+    if not created:
+        categoria_id, nome = instance.pk, instance.name
+        _apos_commit(instance.user_id, [('renomear_categoria', categoria_id, nome)])
+
+
+@receiver(post_delete, sender=Category)
+def categoria_removida_signal(sender, instance, **kwargs):
+    """
+    Signal Observer: remove a categoria excluída do modelo de sugestão
+    (suas transações passam a ficar sem categoria).
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Category): Instância removida.
+        **kwargs: Argumentos adicionais.
+    """
+    categoria_id = instance.pk
+    _apos_commit(instance.user_id, [('remover_categoria', categoria_id)])
+
+
+def _item_indice(valores):
+    return valores['description'], valores['category_id'], valores['value']
+
+
+@receiver(post_save, sender=Transaction)
+def autocompletar_salva_signal(sender, instance, created, raw, **kwargs):
+    """
+    Signal Observer: atualiza o índice de autocompletar com a transação criada ou
+    editada (retirando a versão anterior, no caso de edição).
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Transaction): Instância salva.
+        created (bool): Indica se foi criada.
+        raw (bool): Indica carga de fixture.
+        **kwargs: Argumentos adicionais.
+    """
+    if raw or em_lote():
+        return
+    anteriores = instance.valores_salvos
+    if not created and (anteriores is None or not {'description', 'category_id', 'value'} <= anteriores.keys()):
+        invalidar_indice(instance.user_id)
+        return
+    esquecer = [] if created else [_item_indice(anteriores)]
+    aprender = [(instance.description, instance.category_id, instance.value)]
+    nomes = {instance.category_id: instance.category.name} if instance.category_id is not None else {}
+
+    def atualizar(indice):
+        indice.esquecer(esquecer)
+        indice.aprender(aprender, nomes)
+
+    atualizar_indice(instance.user_id, atualizar)
+
+
+@receiver(post_delete, sender=Transaction)
+def autocompletar_removida_signal(sender, instance, **kwargs):
+    """
+    Signal Observer: retira a transação excluída do índice de autocompletar.
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Transaction): Instância removida.
+        **kwargs: Argumentos adicionais.
+    """
+    if em_lote():
+        return
+    item = _item_indice({
+        'description': instance.description, 'category_id': instance.category_id, 'value': instance.value,
+        **(instance.valores_salvos or {}),
+    })
+    atualizar_indice(instance.user_id, lambda indice: indice.esquecer([item]))
+
+
+@receiver(post_save, sender=Category)
+def autocompletar_categoria_salva_signal(sender, instance, created, **kwargs):
+    """
+    Signal Observer: reflete a renomeação da categoria no índice de autocompletar.
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Category): Instância salva.
+        created (bool): Indica se foi criada.
+        **kwargs: Argumentos adicionais.
+    """
+    if not created:
+        categoria_id, nome = instance.pk, instance.name
+        atualizar_indice(instance.user_id, lambda indice: indice.renomear_categoria(categoria_id, nome))
+
+
+@receiver(post_delete, sender=Category)
+def autocompletar_categoria_removida_signal(sender, instance, **kwargs):
+    """
+    Signal Observer: retira a categoria excluída do índice de autocompletar.
+    
+    Parâmetros:
+        sender (Model): Classe do modelo que enviou o signal.
+        instance (Category): Instância removida.
+        **kwargs: Argumentos adicionais.
+    """
+    categoria_id = instance.pk
+    atualizar_indice(instance.user_id, lambda indice: indice.remover_categoria(categoria_id))
@@ -0,0 +1,95 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router
+from django.utils import timezone
+
+from .models import Category, ChangeLogEntry, Transaction, User
+
+ENTIDADES = {Transaction: 'transaction', Category: 'category'}
+LIMITE_ALTERACOES = 1000
+
+
+def registrar_alteracoes(user_id, entidade, ids, removidos=False, using=None):
+    """
+    Registra objetos alterados (ou excluídos) para a sincronização incremental. Os
+    registros anteriores dos mesmos objetos são descartados, de modo que o registro
+    cresce com a quantidade de objetos e exclusões, e não com a de escritas.
+
+    Parâmetros:
+        user_id (int): Dono dos objetos.
+        entidade (str): 'transaction' ou 'category'.
+        ids (iterable): IDs dos objetos.
+        removidos (bool): Se os objetos foram excluídos.
+        using (str): Alias do banco (padrão: o de escrita).
+    """
+    ids = list(ids)
+    if not ids:
+        return
+    registros = ChangeLogEntry.objects.using(using or router.db_for_write(ChangeLogEntry))
+    registros.filter(user_id=user_id, entity=entidade, object_id__in=ids).delete()
+    registros.bulk_create(
+        [ChangeLogEntry(user_id=user_id, entity=entidade, object_id=id_, deleted=removidos) for id_ in ids],
+        batch_size=1000,
+    )
+
+
+def exclusao_do_usuario(origin):
+    """
+    Returns:
+        bool: Se a exclusão partiu da remoção do próprio usuário (nada a registrar,
+        pois o registro de alterações dele é removido junto).
+    """
+    return isinstance(origin, User) or getattr(origin, 'model', None) is User
+
+
+def alteracoes_desde(user, token, limite=LIMITE_ALTERACOES):
+    """
+    Retorna as transações e categorias do usuário criadas, alteradas ou excluídas
+    depois do token, lendo apenas os registros novos (índice por usuário e ID) e os
+    objetos correspondentes.
+
+    Uma escrita ainda não confirmada pode ter recebido um ID menor que o de outra já
+    confirmada. Por isso o feed para no primeiro registro com menos de
+    SINCRONIZACAO_JANELA segundos: o token nunca passa de um registro que ainda pode
+    ser confirmado depois (desde que as transações do banco durem menos que a janela).
+
+    Parâmetros:
+        user (User): Usuário sincronizado.
+        token (int): Token devolvido pela sincronização anterior (0 para a primeira).
+        limite (int): Máximo de registros lidos por chamada.
+    Returns:
+        dict: `token` (próximo token), `has_more`, `categories` e `transactions`
+        (QuerySets com os objetos atuais) e `deleted` (IDs excluídos por tipo).
+    """
+    corte = timezone.now() - timedelta(seconds=getattr(settings, 'SINCRONIZACAO_JANELA', 5))
+    entradas = list(
+        ChangeLogEntry.objects.filter(user=user, id__gt=token).order_by('id')
+        .values_list('id', 'entity', 'object_id', 'deleted', 'created_at')[:limite + 1]
+    )
+    recente = next((posicao for posicao, entrada in enumerate(entradas) if entrada[4] > corte), None)
+    if recente is not None:
+        # Os registros recentes ficam para a próxima chamada, sem `has_more`.
+        entradas = entradas[:recente]
+    has_more = len(entradas) > limite
+    entradas = entradas[:limite]
+    alterados = {'category': set(), 'transaction': set()}
+    removidos = {'category': set(), 'transaction': set()}
+    for _, entidade, object_id, excluido, _ in entradas:
+        (removidos if excluido else alterados)[entidade].add(object_id)
+
+    categorias = Category.objects.filter(user=user, id__in=alterados['category']).com_gastos_do_mes().order_by('id')
+    transacoes = (
+        Transaction.objects.filter(user=user, id__in=alterados['transaction'])
+        .select_related('category').order_by('id')
+    )
+    return {
+        'token': entradas[-1][0] if entradas else token,
+        'has_more': has_more,
+        'categories': categorias,
+        'transactions': transacoes,
+        'deleted': {
+            'categories': sorted(removidos['category']),
+            'transactions': sorted(removidos['transaction']),
+        },
+    }
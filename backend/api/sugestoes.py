@@ -0,0 +1,617 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+from .artefatos import armazem_artefatos
+from .classificador import ClassificadorIncremental
+from .models import Transaction
+from .regras import matcher_do_usuario, sugestao_por_regras
+from .utils import normalizar
+
+
+# Abaixo deste tamanho de histórico, as regras fixas complementam as sugestões.
+HISTORICO_MINIMO = 10
+
+
+def construir_modelo(user_id):
+    """
+    Treina o classificador do usuário a partir de todo o seu histórico categorizado.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+    Returns:
+        ClassificadorIncremental: Modelo treinado.
+    """
+    modelo = ClassificadorIncremental()
+    linhas = (
+        Transaction.objects.filter(user_id=user_id)
+        .exclude(category=None)
+        .order_by('id')
+        .values_list('normalized_description', 'category_id', 'category__name')
+    )
+    descricoes, categorias, nomes = [], [], {}
+    for descricao, categoria_id, nome in linhas.iterator(chunk_size=2000):
+        descricoes.append(descricao)
+        categorias.append(categoria_id)
+        nomes[categoria_id] = nome
+        if len(descricoes) == 2000:
+            modelo.aprender(descricoes, categorias, nomes)
+            descricoes, categorias = [], []
+    if descricoes:
+        modelo.aprender(descricoes, categorias, nomes)
+    return modelo
+
+
+class CacheModelos:
+    """
+    Cache LRU de modelos de sugestão por usuário, com contadores de acerto e falha.
+
+    Atributos:
+        tamanho_maximo (int): Quantidade máxima de usuários mantidos em memória.
+        acertos (int): Consultas atendidas pelo cache.
+        falhas (int): Consultas que precisaram construir o modelo.
+    """
+
+    def __init__(self, tamanho_maximo):
+        self.tamanho_maximo = tamanho_maximo
+        self.acertos = 0
+        self.falhas = 0
+        self._modelos = OrderedDict()
+        self._geracoes = {}
+        self._lock = threading.Lock()
+
+    def obter(self, user_id, construir, valido=None):
+        """
+        Retorna o modelo do usuário, construindo-o em caso de falha.
+
+        Parâmetros:
+            user_id (int): ID do usuário.
+            construir (callable): Função que recebe o user_id e retorna o modelo.
+            valido (callable): Opcional; recebe o modelo em cache e diz se ainda pode ser usado.
+        Returns:
+            object: Modelo do usuário.
+        """
+        with self._lock:
+            modelo = self._modelos.get(user_id)
+            if modelo is not None and valido is not None and not valido(modelo):
+                del self._modelos[user_id]
+                modelo = None
+            if modelo is not None:
+                self._modelos.move_to_end(user_id)
+                self.acertos += 1
+                return modelo
+            self.falhas += 1
+            geracao = self._geracoes.get(user_id, 0)
+
+        modelo = construir(user_id)
+
+        with self._lock:
+            # Só guarda o modelo se nenhuma escrita o invalidou durante a construção.
+            if self._geracoes.get(user_id, 0) == geracao:
+                self._modelos[user_id] = modelo
+                self._modelos.move_to_end(user_id)
+                while len(self._modelos) > self.tamanho_maximo:
+                    self._modelos.popitem(last=False)
+        return modelo
+
+    def atualizar(self, user_id, funcao):
+        """
+        Aplica uma atualização incremental ao modelo do usuário, se estiver em memória.
+        Construções em andamento são descartadas, pois podem ter lido o histórico antigo.
+
+        Parâmetros:
+            user_id (int): ID do usuário.
+            funcao (callable): Função que recebe o modelo e o atualiza.
+        """
+        with self._lock:
+            self._geracoes[user_id] = self._geracoes.get(user_id, 0) + 1
+            modelo = self._modelos.get(user_id)
+            if modelo is not None:
+                funcao(modelo)
+
+    def invalidar(self, user_id):
+        """
+        Descarta o modelo do usuário após mudanças no seu histórico.
+
+        Parâmetros:
+            user_id (int): ID do usuário.
+        """
+        with self._lock:
+            self._modelos.pop(user_id, None)
+            self._geracoes[user_id] = self._geracoes.get(user_id, 0) + 1
+
+    def limpar(self):
+        """
+        Remove todos os modelos e zera os contadores.
+        """
+        with self._lock:
+            self._modelos.clear()
+            self._geracoes.clear()
+            self.acertos = 0
+            self.falhas = 0
+
+    def estatisticas(self):
+        """
+        Returns:
+            dict: Acertos, falhas, taxa de acerto e ocupação do cache.
+        """
+        with self._lock:
+            total = self.acertos + self.falhas
+            return {
+                'acertos': self.acertos,
+                'falhas': self.falhas,
+                'taxa_acerto': self.acertos / total if total else 0.0,
+                'tamanho': len(self._modelos),
+                'tamanho_maximo': self.tamanho_maximo,
+            }
+
+
+cache_modelos = CacheModelos(getattr(settings, 'SUGESTOES_CACHE_TAMANHO', 256))
+
+
+def _chave(user_id):
+    return f'usuario-{user_id}'
+
+
+def _versao_vigente(armazem, user_id):
+    """
+    Returns:
+        str: Versão do artefato somada ao tamanho do diário, que muda a cada alteração
+        (None se não houver artefato).
+    """
+    versao = armazem.versao(_chave(user_id))
+    return None if versao is None else f'{versao}+{armazem.tamanho_diario(_chave(user_id))}'
+
+
+def aplicar_alteracoes(modelo, alteracoes):
+    """
+    Aplica ao modelo uma lista de alterações serializáveis, como guardadas no diário
+    dos artefatos: ('esquecer', descrições, categorias), ('aprender', descrições,
+    categorias, nomes), ('renomear_categoria', id, nome) ou ('remover_categoria', id).
+
+    Parâmetros:
+        modelo (ClassificadorIncremental): Modelo a atualizar.
+        alteracoes (list): Alterações, na ordem em que ocorreram.
+    """
+    for nome, *argumentos in alteracoes:
+        if nome == 'aprender':
+            descricoes, categorias, nomes = argumentos
+            # Em JSON, as chaves dos nomes voltam como texto.
+            modelo.aprender(descricoes, categorias, {int(categoria): n for categoria, n in nomes.items()})
+        else:
+            getattr(modelo, nome)(*argumentos)
+
+
+def _reconstruir(armazem, user_id):
+    """
+    Treina o modelo a partir do histórico e grava uma nova versão do artefato.
+    Deve ser chamada com o bloqueio da chave do usuário.
+    """
+    modelo = construir_modelo(user_id)
+    modelo.versao = f'{armazem.salvar(_chave(user_id), *modelo.exportar())}+0'
+    return modelo
+
+
+def _importar(artefato):
+    versao, arrays, meta = artefato
+    try:
+        return ClassificadorIncremental.importar(arrays, meta, versao)
+    except ValueError:
+        return None
+
+
+def _importar_usuario(armazem, user_id):
+    """
+    Mapeia a versão vigente do artefato e aplica as alterações do diário.
+
+    Returns:
+        ClassificadorIncremental: Modelo, ou None se não houver artefato compatível.
+    """
+    # Lida antes do diário: uma alteração registrada durante a leitura só faz o
+    # modelo parecer desatualizado (e ser recarregado), nunca o contrário.
+    vigente = _versao_vigente(armazem, user_id)
+    artefato = armazem.carregar(_chave(user_id))
+    if artefato is None:
+        return None
+    modelo = _importar(artefato)
+    if modelo is None:
+        return None
+    versao = artefato[0]
+    alteracoes = armazem.diario(_chave(user_id), versao)
+    aplicar_alteracoes(modelo, [alteracao for entrada in alteracoes for alteracao in entrada])
+    modelo.versao = vigente if vigente and vigente.startswith(versao + '+') else f'{versao}+0'
+    return modelo
+
+
+def carregar_modelo(user_id):
+    """
+    Carrega o modelo do usuário a partir do artefato vigente em disco (memory mapping)
+    e de seu diário, treinando e gravando um novo se não houver. Sem
+    SUGESTOES_ARTEFATOS_DIR configurado, treina o modelo em memória.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+    Returns:
+        ClassificadorIncremental: Modelo do usuário.
+    """
+    armazem = armazem_artefatos()
+    if armazem is None:
+        return construir_modelo(user_id)
+    modelo = _importar_usuario(armazem, user_id)
+    if modelo is not None:
+        return modelo
+    with armazem.bloqueio(_chave(user_id)):
+        # Outro worker pode ter gravado o artefato enquanto esperávamos o bloqueio.
+        return _importar_usuario(armazem, user_id) or _reconstruir(armazem, user_id)
+
+
+def reconstruir_modelo(user_id):
+    """
+    Retreina o modelo do usuário a partir de todo o histórico, substituindo o artefato
+    vigente (quando configurado) e o modelo em memória.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+    Returns:
+        ClassificadorIncremental: Modelo reconstruído.
+    """
+    armazem = armazem_artefatos()
+    cache_modelos.invalidar(user_id)
+    if armazem is None:
+        return cache_modelos.obter(user_id, construir_modelo)
+    with armazem.bloqueio(_chave(user_id)):
+        modelo = _reconstruir(armazem, user_id)
+    cache_modelos.invalidar(user_id)
+    return modelo
+
+
+def atualizar_modelo(user_id, alteracoes):
+    """
+    Aplica uma atualização incremental ao modelo do usuário. Com artefatos em disco,
+    a atualização é só acrescentada ao diário da versão vigente, sob bloqueio entre
+    processos; o artefato inteiro é regravado (compactando o diário) apenas a cada
+    SUGESTOES_DIARIO_MAXIMO atualizações. Os demais workers a aplicam na próxima consulta.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+        alteracoes (list): Alterações serializáveis (ver `aplicar_alteracoes`).
+    """
+    armazem = armazem_artefatos()
+    if armazem is None:
+        cache_modelos.atualizar(user_id, lambda modelo: aplicar_alteracoes(modelo, alteracoes))
+        return
+    chave = _chave(user_id)
+    with armazem.bloqueio(chave):
+        versao = armazem.versao(chave)
+        if versao is None:
+            armazem.remover(chave)
+        elif len(armazem.diario(chave, versao)) + 1 < getattr(settings, 'SUGESTOES_DIARIO_MAXIMO', 100):
+            armazem.registrar(chave, versao, alteracoes)
+        else:
+            modelo = _importar_usuario(armazem, user_id)
+            if modelo is None:
+                armazem.remover(chave)
+            else:
+                aplicar_alteracoes(modelo, alteracoes)
+                armazem.salvar(chave, *modelo.exportar())
+    cache_modelos.invalidar(user_id)
+
+
+def invalidar_modelo(user_id):
+    """
+    Descarta o modelo do usuário (em memória e em disco) para que seja retreinado
+    na próxima consulta. Usada quando o histórico muda sem passar pelos signals.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+    """
+    armazem = armazem_artefatos()
+    if armazem is not None:
+        with armazem.bloqueio(_chave(user_id)):
+            armazem.remover(_chave(user_id))
+    cache_modelos.invalidar(user_id)
+
+
+def obter_modelo(user_id):
+    """
+    Retorna o modelo do usuário pelo cache em memória, recarregando-o quando
+    outro worker publicou uma versão mais nova do artefato.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+    Returns:
+        ClassificadorIncremental: Modelo do usuário.
+    """
+    armazem = armazem_artefatos()
+    valido = None
+    if armazem is not None:
+        valido = lambda modelo: modelo.versao == _versao_vigente(armazem, user_id)
+    return cache_modelos.obter(user_id, carregar_modelo, valido)
+
+
+CHAVE_GLOBAL = 'global'
+
+_modelo_global = None
+_lock_global = threading.Lock()
+
+
+def construir_modelo_global(minimo_usuarios=3):
+    """
+    Treina o modelo global de partida a frio com as transações categorizadas de todos
+    os usuários, anonimizado: só entram categorias (identificadas pelo nome normalizado)
+    e termos de descrição usados por pelo menos `minimo_usuarios` usuários distintos,
+    de modo que nada específico de um único usuário chegue ao modelo.
+
+    Parâmetros:
+        minimo_usuarios (int): Quantidade mínima de usuários por categoria e por termo.
+    Returns:
+        ClassificadorIncremental: Modelo com categorias identificadas pelo nome normalizado.
+    """
+    linhas = (
+        Transaction.objects.exclude(category=None)
+        .values_list('user_id', 'normalized_description', 'category__name')
+    )
+
+    # 1ª passada: quantos usuários usam cada termo e cada categoria.
+    usuarios_termo, usuarios_categoria, grafias = {}, {}, {}
+    for user_id, descricao, nome in linhas.iterator(chunk_size=5000):
+        chave = normalizar(nome).strip()
+        usuarios_categoria.setdefault(chave, set()).add(user_id)
+        contagem = grafias.setdefault(chave, {})
+        contagem[nome] = contagem.get(nome, 0) + 1
+        for termo in set(ClassificadorIncremental.tokenizar(descricao)):
+            usuarios = usuarios_termo.setdefault(termo, set())
+            if len(usuarios) < minimo_usuarios:
+                usuarios.add(user_id)
+    termos = {t for t, usuarios in usuarios_termo.items() if len(usuarios) >= minimo_usuarios}
+    nomes = {
+        chave: max(grafias[chave], key=grafias[chave].get)
+        for chave, usuarios in usuarios_categoria.items()
+        if len(usuarios) >= minimo_usuarios
+    }
+    del usuarios_termo, usuarios_categoria
+
+    # 2ª passada: treina só com os termos e categorias aprovados.
+    modelo = ClassificadorIncremental()
+    descricoes, categorias = [], []
+    for _, descricao, nome in linhas.iterator(chunk_size=5000):
+        chave = normalizar(nome).strip()
+        if chave not in nomes:
+            continue
+        filtrados = [t for t in ClassificadorIncremental.tokenizar(descricao) if t in termos]
+        if not filtrados:
+            continue
+        descricoes.append(' '.join(filtrados))
+        categorias.append(chave)
+        if len(descricoes) == 5000:
+            modelo.aprender(descricoes, categorias, nomes)
+            descricoes, categorias = [], []
+    if descricoes:
+        modelo.aprender(descricoes, categorias, nomes)
+    return modelo
+
+
+def publicar_modelo_global(modelo):
+    """
+    Grava o modelo global como nova versão do artefato `global`.
+
+    Parâmetros:
+        modelo (ClassificadorIncremental): Modelo treinado por `construir_modelo_global`.
+    Returns:
+        str: Versão publicada.
+    Raises:
+        ImproperlyConfigured: Se SUGESTOES_ARTEFATOS_DIR não estiver configurado.
+    """
+    armazem = armazem_artefatos()
+    if armazem is None:
+        raise ImproperlyConfigured('Configure SUGESTOES_ARTEFATOS_DIR para publicar o modelo global.')
+    with armazem.bloqueio(CHAVE_GLOBAL):
+        return armazem.salvar(CHAVE_GLOBAL, *modelo.exportar())
+
+
+def modelo_global():
+    """
+    Retorna o modelo global, mapeado do disco uma única vez por processo
+    (e de novo apenas quando uma nova versão é publicada).
+
+    Returns:
+        ClassificadorIncremental: Modelo global, ou None se não houver artefato publicado.
+    """
+    global _modelo_global
+    armazem = armazem_artefatos()
+    versao = armazem.versao(CHAVE_GLOBAL) if armazem is not None else None
+    if versao is None:
+        return None
+    modelo = _modelo_global
+    if modelo is not None and modelo.versao == versao:
+        return modelo
+    with _lock_global:
+        if _modelo_global is None or _modelo_global.versao != versao:
+            artefato = armazem.carregar(CHAVE_GLOBAL)
+            _modelo_global = _importar(artefato) if artefato is not None else None
+        return _modelo_global
+
+
+def mesclar_sugestoes(modelo, global_, descricoes, peso, limite=3):
+    """
+    Combina as probabilidades do modelo do usuário e do modelo global, ponderadas
+    pelo tamanho do histórico. Categorias com o mesmo nome normalizado são somadas,
+    prevalecendo a grafia do usuário.
+
+    Parâmetros:
+        modelo (ClassificadorIncremental): Modelo do usuário.
+        global_ (ClassificadorIncremental): Modelo global.
+        descricoes (list): Textos normalizados a classificar.
+        peso (float): Peso do modelo do usuário, entre 0 e 1.
+        limite (int): Quantidade máxima de categorias por descrição.
+    Returns:
+        list: Uma lista de categorias para cada descrição, na mesma ordem.
+    """
+    indices, nomes = {}, []
+    colunas = []
+    for classificador, fator in ((modelo, peso), (global_, 1 - peso)):
+        nomes_modelo, probabilidades = classificador.probabilidades_lote(descricoes)
+        posicoes = []
+        for nome in nomes_modelo:
+            chave = normalizar(nome).strip()
+            if chave not in indices:
+                indices[chave] = len(nomes)
+                nomes.append(nome)
+            posicoes.append(indices[chave])
+        colunas.append((posicoes, probabilidades * fator))
+    if not nomes:
+        return [[] for _ in descricoes]
+    scores = np.zeros((len(descricoes), len(nomes)))
+    for posicoes, probabilidades in colunas:
+        np.add.at(scores, (slice(None), posicoes), probabilidades)
+    ordem = np.argsort(-scores, axis=1, kind='stable')[:, :limite]
+    return [[nomes[i] for i in linha] for linha in ordem]
+
+
+def combinar_sugestoes(similares, regras, limite=3):
+    """
+    Combina as sugestões do histórico com as das regras fixas.
+
+    Parâmetros:
+        similares (list): Categorias ordenadas pelo classificador do histórico.
+        regras (list): Categorias encontradas pelas palavras-chave.
+        limite (int): Quantidade máxima de categorias retornadas.
+    Returns:
+        list: Ranking combinado.
+    """
+    ranking = []
+
+    # 1. Categorias que aparecem nas duas listas (mais relevantes)
+    for cat in similares:
+        if cat in regras and cat not in ranking:
+            ranking.append(cat)
+
+    # 2. Depois as mais parecidas (do histórico)
+    for cat in similares:
+        if cat not in ranking:
+            ranking.append(cat)
+
+    # 3. Por fim, as que vieram só das regras
+    for cat in regras:
+        if cat not in ranking:
+            ranking.append(cat)
+
+    return ranking[:limite]
+
+
+def regras_para_sugestao(modelo, user_id):
+    """
+    Regras próprias do usuário, guardadas junto com o modelo em memória: são lidas do
+    banco uma vez por versão do modelo, e não a cada sugestão. Mudar as regras muda
+    essa versão (ver `invalidar_regras`).
+
+    Returns:
+        MatcherRegras: Regras do usuário, só se o histórico é curto o bastante para as
+        regras entrarem nas sugestões (senão None).
+    """
+    if len(modelo) >= HISTORICO_MINIMO:
+        return None
+    if not hasattr(modelo, 'regras_usuario'):
+        modelo.regras_usuario = matcher_do_usuario(user_id)
+    return modelo.regras_usuario
+
+
+def _esquecer_regras(modelo):
+    modelo.__dict__.pop('regras_usuario', None)
+
+
+def invalidar_regras(user_id):
+    """
+    Faz as sugestões relerem as regras próprias do usuário. Com artefatos em disco,
+    acrescenta uma entrada vazia ao diário, o que muda a versão do modelo e faz todos os
+    workers recarregá-lo; sem artefatos, descarta as regras do modelo deste processo.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+    """
+    if armazem_artefatos() is None:
+        cache_modelos.atualizar(user_id, _esquecer_regras)
+    else:
+        atualizar_modelo(user_id, [])
+
+
+def sugerir_com_modelo(modelo, user_id, descricoes, limite=3, matcher_usuario=None):
+    """
+    Parte de `sugerir_para_usuario` que não consulta o banco (só CPU e o modelo global
+    já mapeado): pode rodar em um executor, fora do event loop das views assíncronas.
+
+    Parâmetros:
+        modelo (ClassificadorIncremental): Modelo do usuário (ver `obter_modelo`).
+        user_id (int): ID do usuário.
+        descricoes (list): Textos a classificar.
+        limite (int): Quantidade máxima de categorias por descrição.
+        matcher_usuario (MatcherRegras): Regras do usuário (ver `regras_para_sugestao`).
+    Returns:
+        list: Uma lista de categorias para cada descrição, na mesma ordem.
+    """
+    global_ = modelo_global()
+    normalizadas = [normalizar(d) for d in descricoes]
+    if global_ is None:
+        similares = modelo.sugerir_lote(normalizadas, limite)
+    else:
+        peso = len(modelo) / (len(modelo) + HISTORICO_MINIMO)
+        similares = mesclar_sugestoes(modelo, global_, normalizadas, peso, limite)
+    if len(modelo) >= HISTORICO_MINIMO:
+        return similares
+    return [
+        combinar_sugestoes(similar, sugestao_por_regras(descricao, matcher_usuario=matcher_usuario), limite)
+        for descricao, similar in zip(descricoes, similares)
+    ]
+
+
+def sugestoes_confiaveis(user_id, descricoes, confianca_minima, matcher_usuario=None):
+    """
+    Candidatas para categorizar lançamentos sem revisão do usuário (importação). Ao
+    contrário de `sugerir_para_usuario`, que sempre devolve as mais prováveis (o
+    Naive Bayes sempre aponta alguma categoria, nem que seja só pela frequência), só
+    entram as categorias de regras de palavra-chave que casaram com a descrição e as
+    do modelo do usuário com probabilidade de pelo menos `confianca_minima`, para
+    descrições com algum termo já aprendido.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+        descricoes (list): Textos a classificar.
+        confianca_minima (float): Probabilidade mínima de uma sugestão do modelo.
+        matcher_usuario (MatcherRegras): Regras do usuário (ver `matcher_do_usuario`).
+    Returns:
+        list: Para cada descrição, os nomes das candidatas em ordem de preferência
+        (regras primeiro, depois o modelo pela probabilidade).
+    """
+    modelo = obter_modelo(user_id)
+    normalizadas = [normalizar(d) for d in descricoes]
+    nomes, probabilidades = modelo.probabilidades_lote(normalizadas)
+    reconhecidas = modelo.reconhecidas(normalizadas)
+    candidatas = []
+    for posicao, descricao in enumerate(descricoes):
+        lista = sugestao_por_regras(descricao, limite=None, matcher_usuario=matcher_usuario)
+        # Sem nenhum termo conhecido, a probabilidade vem só da frequência das categorias.
+        if nomes and reconhecidas[posicao]:
+            linha = probabilidades[posicao]
+            lista += [nomes[i] for i in np.argsort(-linha, kind='stable') if linha[i] >= confianca_minima]
+        candidatas.append(lista)
+    return candidatas
+
+
+def sugerir_para_usuario(user_id, descricoes, limite=3):
+    """
+    Sugere categorias para uma ou mais descrições usando o modelo do usuário em cache,
+    mesclado com o modelo global (com peso maior quanto menor o histórico).
+    Com histórico curto, o resultado é combinado também com as regras fixas.
+
+    Parâmetros:
+        user_id (int): ID do usuário.
+        descricoes (list): Textos a classificar.
+        limite (int): Quantidade máxima de categorias por descrição.
+    Returns:
+        list: Uma lista de categorias para cada descrição, na mesma ordem.
+    """
+    modelo = obter_modelo(user_id)
+    return sugerir_com_modelo(modelo, user_id, descricoes, limite, regras_para_sugestao(modelo, user_id))
@@ -1,10 +1,43 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from io import StringIO
+from unittest import mock
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.core.checks import Tags, run_checks
+from django.core.management import call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import CommandError
+from django.core.cache import cache
+from django.db import connection, connections, router
+from django.db.models import F
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 from rest_framework.test import APIClient
 from rest_framework import status
-from .models import User, Category, Transaction
+from rest_framework_simplejwt.tokens import RefreshToken
+from .models import User, Category, CategoryRule, ChangeLogEntry, MonthlySummary, StatementImport, Transaction
 from .serializers import UserSerializer, CategorySerializer, TransactionSerializer
+from .regras import MatcherRegras, definir_regras_usuario, matcher_do_usuario, remover_regras_usuario, sugestao_por_regras
+from . import assincronas, autocompletar
+from .autocompletar import IndiceDescricoes, cache_indices, obter_indice
+from .cache_respostas import CacheRespostas, cache_respostas
+from .artefatos import armazem_artefatos
+from .classificador import ClassificadorIncremental
+from .importacao import criar_importacao, processar_importacao
+from .resumos import verificar_resumos
+from .roteamento import leitura_em_replica
+from .sincronizacao import alteracoes_desde
+from .utils import normalizar
+from .sugestoes import CacheModelos, construir_modelo, cache_modelos, modelo_global, obter_modelo, sugerir_para_usuario
 from datetime import date, timedelta
+from decimal import Decimal
 
 
 class UserSerializerTest(TestCase):
@@ -104,7 +137,7 @@ class APITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         # Atualiza categoria
-        cat_id = response.data[0]['id']
+        cat_id = response.data['results'][0]['id']
         response = self.client.put(f'/api/categories/{cat_id}/', {'name': 'CatEdit'})
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
@@ -136,7 +169,7 @@ class APITest(TestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         
         # Atualiza transação
-        trans_id = response.data[0]['id']
+        trans_id = response.data['results'][0]['id']
         data['value'] = 2000
         response = self.client.put(f'/api/transactions/{trans_id}/', data)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -144,3 +177,1402 @@ class APITest(TestCase):
         # Deleta transação
         response = self.client.delete(f'/api/transactions/{trans_id}/')
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+
+
+class SugestaoCacheTest(TestCase):
+    def setUp(self):
+        cache_modelos.limpar()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='sug@email.com', username='suguser', name='Sug', password='123456')
+        self.client.force_authenticate(self.user)
+        self.mercado = Category.objects.create(name='Mercado', user=self.user)
+        self.transporte = Category.objects.create(name='Transporte', user=self.user)
+        for descricao, categoria in [('Compra no mercado', self.mercado), ('Corrida de uber', self.transporte)]:
+            Transaction.objects.create(
+                description=descricao, value=10, transaction_type='expense',
+                date=date.today(), category=categoria, user=self.user,
+            )
+
+    def test_model_is_reused_between_requests(self):
+        response = self.client.get('/api/categorias/sugestoes/', {'q': 'uber'})
+        self.assertEqual(response.data[0], 'Transporte')
+        self.client.get('/api/categorias/sugestoes/', {'q': 'uber ao centro'})
+        stats = cache_modelos.estatisticas()
+        self.assertEqual((stats['acertos'], stats['falhas']), (1, 1))
+
+    def test_transaction_write_updates_model_incrementally(self):
+        self.client.get('/api/categorias/sugestoes/', {'q': 'farmacia'})
+        with self.captureOnCommitCallbacks(execute=True):
+            transacao = Transaction.objects.create(
+                description='Farmácia do bairro', value=5, transaction_type='expense',
+                date=date.today(), category=self.mercado, user=self.user,
+            )
+        self.assertEqual(self.client.get('/api/categorias/sugestoes/', {'q': 'farmacia'}).data[0], 'Mercado')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            transacao.category = self.transporte
+            transacao.save()
+            self.transporte.name = 'Locomoção'
+            self.transporte.save()
+        self.assertEqual(self.client.get('/api/categorias/sugestoes/', {'q': 'farmacia'}).data[0], 'Locomoção')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.transporte.delete()
+        self.assertEqual(self.client.get('/api/categorias/sugestoes/', {'q': 'farmacia'}).data, ['Mercado', 'Saúde'])
+        self.assertEqual(cache_modelos.estatisticas()['falhas'], 1)
+
+    def test_user_rules_are_cached_with_the_model(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            definir_regras_usuario(self.user.id, {'Pets': ['racao']})
+        self.assertIn('Pets', sugerir_para_usuario(self.user.id, ['Ração'])[0])
+        with self.assertNumQueries(0):
+            self.assertIn('Pets', sugerir_para_usuario(self.user.id, ['Ração'])[0])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            definir_regras_usuario(self.user.id, {'Casa': ['racao']})
+        self.assertIn('Casa', sugerir_para_usuario(self.user.id, ['Ração'])[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            remover_regras_usuario(self.user.id)
+        self.assertNotIn('Casa', sugerir_para_usuario(self.user.id, ['Ração'])[0])
+        self.assertEqual(cache_modelos.estatisticas()['falhas'], 1)
+
+    def test_lru_eviction(self):
+        cache = CacheModelos(tamanho_maximo=2)
+        for user_id in (1, 2, 1, 3):
+            cache.obter(user_id, lambda uid: object())
+        cache.obter(2, lambda uid: object())
+        stats = cache.estatisticas()
+        self.assertEqual(stats['tamanho'], 2)
+        self.assertEqual((stats['acertos'], stats['falhas']), (1, 4))
+
+    def test_batch_matches_single_endpoint(self):
+        descricoes = ['uber para casa', '', 'mercado do bairro', 'almoço']
+        response = self.client.post('/api/categorias/sugestoes/lote/', {'descricoes': descricoes}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['descricao'] for item in response.data], descricoes)
+        for item in response.data:
+            esperado = self.client.get('/api/categorias/sugestoes/', {'q': item['descricao']}).data
+            self.assertEqual(item['sugestoes'], esperado)
+
+    def test_batch_rejects_invalid_payload(self):
+        response = self.client.post('/api/categorias/sugestoes/lote/', {'descricoes': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class MatcherRegrasTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='regras@email.com', username='regrasuser', name='R', password='123456')
+
+    def test_rules_are_normalized_and_deduplicated(self):
+        matcher = MatcherRegras({'Calçados': ['tênis', 'tenis', 'TENIS de corrida'], 'Outros': ['tenis']})
+        self.assertEqual(matcher.palavras, {'tenis': 'Calçados', 'tenis de corrida': 'Calçados'})
+
+    def test_ranks_by_matched_keywords_in_one_pass(self):
+        self.assertEqual(sugestao_por_regras('Tênis de corrida e camiseta'), ['Calçados', 'Roupas'])
+        self.assertEqual(sugestao_por_regras('Almoço e Uber'), ['Alimentação', 'Transporte'])
+        self.assertEqual(sugestao_por_regras('Transferência'), [])
+
+    def test_overlapping_keywords_of_different_categories(self):
+        matcher = MatcherRegras({'A': ['casa'], 'B': ['casamento'], 'C': ['mento']})
+        self.assertEqual(matcher.pontuar('casamento'), {'A': 1, 'B': 1, 'C': 1})
+
+    def test_user_rules_do_not_change_global_table(self):
+        definir_regras_usuario(self.user.id, {'Pets': ['ração', 'veterinário']})
+        self.assertEqual(sugestao_por_regras('Ração e remédio', self.user.id), ['Pets', 'Saúde'])
+        self.assertEqual(sugestao_por_regras('Ração e remédio'), ['Saúde'])
+
+    def test_user_rules_are_persisted_and_shared(self):
+        definir_regras_usuario(self.user.id, {'Pets': ['ração', ' ração '], 'Casa': ['diarista']})
+        self.assertEqual(CategoryRule.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(sugestao_por_regras('Diarista', self.user.id), ['Casa'])
+
+        # Outro processo lê as mesmas regras do banco; trocá-las vale na próxima sugestão.
+        CategoryRule.objects.filter(user=self.user, keyword='diarista').update(keyword='faxina')
+        self.assertEqual(sugestao_por_regras('Diarista', self.user.id), [])
+        self.assertEqual(sugestao_por_regras('Faxina', self.user.id), ['Casa'])
+        remover_regras_usuario(self.user.id)
+        self.assertIsNone(matcher_do_usuario(self.user.id))
+
+
+class ClassificadorIncrementalTest(TestCase):
+    def test_learn_and_forget_match_training_from_scratch(self):
+        historico = [(normalizar(d), c) for d, c in [('Uber trabalho', 1), ('Almoço restaurante', 2), ('Uber casa', 1), ('Mercado', 2)]]
+        incremental = ClassificadorIncremental()
+        for descricao, categoria in historico + [('Cinema', 3)]:
+            incremental.aprender([descricao], [categoria], {1: 'Transporte', 2: 'Alimentação', 3: 'Lazer'})
+        incremental.esquecer(['Cinema'], [3])
+
+        completo = ClassificadorIncremental()
+        completo.aprender(*zip(*historico), {1: 'Transporte', 2: 'Alimentação'})
+
+        consultas = ['uber', 'restaurante japones', 'cinema']
+        self.assertEqual(incremental.sugerir_lote(consultas), completo.sugerir_lote(consultas))
+        self.assertEqual(incremental.sugerir(normalizar('UBER')), ['Transporte', 'Alimentação'])
+        self.assertEqual(len(incremental), 4)
+
+    def test_rebuild_command(self):
+        user = User.objects.create_user(email='cmd@email.com', username='cmduser', name='Cmd', password='123456')
+        categoria = Category.objects.create(name='Transporte', user=user)
+        for i in range(5):
+            Transaction.objects.create(
+                description=f'Uber {i}', value=10, transaction_type='expense',
+                date=date.today() - timedelta(days=i), category=categoria, user=user,
+            )
+        saida = StringIO()
+        call_command('reconstruir_modelos_sugestao', usuario=user.id, avaliar=True, stdout=saida)
+        self.assertIn(f'Usuário {user.id}: 5 transações, 1 categorias, acurácia top-1 100.0%', saida.getvalue())
+
+
+class ArtefatosSugestaoTest(TestCase):
+    def setUp(self):
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        configuracao = self.settings(SUGESTOES_ARTEFATOS_DIR=diretorio)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        cache_modelos.limpar()
+        self.user = User.objects.create_user(email='art@email.com', username='artuser', name='Art', password='123456')
+        self.categoria = Category.objects.create(name='Transporte', user=self.user)
+        Transaction.objects.create(
+            description='Uber trabalho', value=10, transaction_type='expense',
+            date=date.today(), category=self.categoria, user=self.user,
+        )
+
+    def test_rule_change_publishes_a_new_model_version(self):
+        versao = obter_modelo(self.user.id).versao
+        self.assertEqual(sugerir_para_usuario(self.user.id, ['Diarista']), [['Transporte']])
+        with self.captureOnCommitCallbacks(execute=True):
+            definir_regras_usuario(self.user.id, {'Casa': ['diarista']})
+        # Os demais workers veem a versão mudar e releem as regras junto com o modelo.
+        self.assertNotEqual(obter_modelo(self.user.id).versao, versao)
+        self.assertEqual(sugerir_para_usuario(self.user.id, ['Diarista']), [['Transporte', 'Casa']])
+
+    def test_workers_load_shared_artifact_and_pick_up_new_versions(self):
+        versao = obter_modelo(self.user.id).versao
+        self.assertIsNotNone(versao)
+
+        # Um novo worker (cache vazio) mapeia o artefato em vez de treinar de novo.
+        cache_modelos.limpar()
+        with self.assertNumQueries(0):
+            modelo = obter_modelo(self.user.id)
+        self.assertEqual(modelo.versao, versao)
+        self.assertIsInstance(modelo._compilado[1], np.memmap)
+
+        lazer = Category.objects.create(name='Lazer', user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(
+                description='Cinema', value=30, transaction_type='expense',
+                date=date.today(), category=lazer, user=self.user,
+            )
+        novo = obter_modelo(self.user.id)
+        self.assertNotEqual(novo.versao, versao)
+        self.assertEqual(novo.sugerir('cinema')[0], 'Lazer')
+        self.assertEqual(len(novo), 2)
+
+    def test_writes_go_to_the_journal_until_it_is_compacted(self):
+        armazem = armazem_artefatos()
+        versao = obter_modelo(self.user.id).versao
+        vigente = armazem.versao(f'usuario-{self.user.id}')
+        lazer = Category.objects.create(name='Lazer', user=self.user)
+        with self.settings(SUGESTOES_DIARIO_MAXIMO=3):
+            for descricao in ('Cinema', 'Teatro'):
+                with self.captureOnCommitCallbacks(execute=True):
+                    Transaction.objects.create(
+                        description=descricao, value=30, transaction_type='expense',
+                        date=date.today(), category=lazer, user=self.user,
+                    )
+            # O artefato não foi regravado; outro worker aplica o diário ao carregá-lo.
+            self.assertEqual(armazem.versao(f'usuario-{self.user.id}'), vigente)
+            cache_modelos.limpar()
+            modelo = obter_modelo(self.user.id)
+            self.assertNotEqual(modelo.versao, versao)
+            self.assertEqual((len(modelo), modelo.sugerir('teatro')[0]), (3, 'Lazer'))
+
+            with self.captureOnCommitCallbacks(execute=True):
+                lazer.name = 'Diversão'
+                lazer.save()
+        self.assertNotEqual(armazem.versao(f'usuario-{self.user.id}'), vigente)
+        self.assertEqual(armazem.tamanho_diario(f'usuario-{self.user.id}'), 0)
+        cache_modelos.limpar()
+        self.assertEqual(obter_modelo(self.user.id).sugerir('cinema')[0], 'Diversão')
+
+    def test_global_model_serves_users_without_history(self):
+        for i in range(3):
+            outro = User.objects.create_user(email=f'g{i}@email.com', username=f'g{i}', name='G', password='123456')
+            pedagio = Category.objects.create(name='Transporte', user=outro)
+            Transaction.objects.create(
+                description=f'Pedágio rodovia cliente{i}', value=10, transaction_type='expense',
+                date=date.today(), category=pedagio, user=outro,
+            )
+        call_command('treinar_modelo_global', stdout=StringIO())
+        global_ = modelo_global()
+        self.assertEqual(set(global_.nomes), {'transporte'})
+        # Só 'pedagio' e 'rodovia' são usados por 3 usuários; 'cliente0' etc. ficam de fora.
+        self.assertEqual(len(global_._compilado[1]), 2)
+
+        novo = User.objects.create_user(email='novo@email.com', username='novo', name='Novo', password='123456')
+        self.assertEqual(sugerir_para_usuario(novo.id, ['pedagio']), [['Transporte']])
+
+
+class DescricaoNormalizadaTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='norm@email.com', username='normuser', name='Norm', password='123456')
+        self.client.force_authenticate(self.user)
+
+    def test_normalized_description_is_kept_in_sync(self):
+        transacao = Transaction.objects.create(
+            description='Café da MANHÃ', value=8, transaction_type='expense', date=date.today(), user=self.user,
+        )
+        self.assertEqual(transacao.normalized_description, 'cafe da manha')
+        transacao.description = 'Pão de açúcar'
+        transacao.save(update_fields=['description'])
+        transacao.refresh_from_db()
+        self.assertEqual(transacao.normalized_description, 'pao de acucar')
+
+    def test_search_is_accent_insensitive(self):
+        for descricao in ['Café da manhã', 'Cafeteria', 'Mercado']:
+            Transaction.objects.create(
+                description=descricao, value=8, transaction_type='expense', date=date.today(), user=self.user,
+            )
+        response = self.client.get('/api/transactions/', {'search': 'CAFÉ'})
+        self.assertEqual(sorted(t['description'] for t in response.data['results']), ['Cafeteria', 'Café da manhã'])
+        response = self.client.get('/api/transactions/', {'search': 'manhã, cafe'})
+        self.assertEqual([t['description'] for t in response.data['results']], ['Café da manhã'])
+
+    @unittest.skipUnless(connection.vendor == 'postgresql', 'Busca textual só existe no PostgreSQL.')
+    def test_full_text_search_uses_trigger_maintained_vector(self):
+        for descricao in ['Café da manhã', 'Café, café e mais café', 'Mercado']:
+            Transaction.objects.create(
+                description=descricao, value=8, transaction_type='expense', date=date.today(), user=self.user,
+            )
+        response = self.client.get('/api/transactions/', {'search': 'caf'})
+        # Ordenado por relevância: a descrição com mais ocorrências vem primeiro.
+        self.assertEqual([t['description'] for t in response.data['results']], ['Café, café e mais café', 'Café da manhã'])
+
+        transacoes = Transaction.objects.filter(user=self.user)
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE api_transaction SET search_vector = NULL WHERE user_id = %s', [self.user.id])
+        transacoes.update(value=9)
+        self.assertFalse(transacoes.filter(search_vector__isnull=False).exists())
+        transacoes.update(normalized_description='padaria')
+        self.assertEqual(transacoes.filter(search_vector__isnull=False).count(), 3)
+        self.assertEqual(self.client.get('/api/transactions/', {'search': 'padar'}).data['count'], 3)
+
+    def test_search_benchmark_leaves_no_data(self):
+        saida = StringIO()
+        call_command('medir_busca', linhas=300, repeticoes=2, stdout=saida)
+        self.assertIn("'cafe':", saida.getvalue())
+        self.assertEqual(User.objects.count(), 1)
+        self.assertFalse(Transaction.objects.exists())
+
+
+class CategoryListQueryTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='q@email.com', username='quser', name='Q', password='123456')
+        self.client.force_authenticate(self.user)
+
+    def criar_categorias(self, quantidade):
+        hoje = date.today()
+        for i in range(quantidade):
+            categoria = Category.objects.create(name=f'Cat {i}', user=self.user, monthly_limit=200)
+            for valor, tipo, dia in [(50, 'expense', hoje), (25, 'expense', hoje), (90, 'income', hoje),
+                                     (70, 'expense', hoje.replace(day=1) - timedelta(days=1))]:
+                Transaction.objects.create(
+                    description='Teste', value=valor, transaction_type=tipo,
+                    date=dia, category=categoria, user=self.user,
+                )
+
+    def test_category_list_query_count_is_constant(self):
+        self.criar_categorias(1)
+        with self.assertNumQueries(2) as consultas_uma:
+            self.client.get('/api/categories/')
+        self.criar_categorias(30)
+        with self.assertNumQueries(len(consultas_uma.captured_queries)):
+            response = self.client.get('/api/categories/', {'page_size': 100})
+        self.assertEqual(response.data['count'], 31)
+        categoria = response.data['results'][0]
+        self.assertEqual(categoria['current_spent'], Decimal('75'))
+        self.assertEqual(categoria['current_count'], 2)
+        self.assertEqual(categoria['current_percentage'], 37.5)
+
+    def test_updated_limit_is_reflected_in_response(self):
+        self.criar_categorias(1)
+        categoria = Category.objects.get(user=self.user)
+        response = self.client.patch(f'/api/categories/{categoria.id}/', {'monthly_limit': '300'})
+        self.assertEqual(response.data['current_percentage'], 25.0)
+
+
+class ResumoMensalTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='r@email.com', username='ruser', name='R', password='123456')
+        self.client.force_authenticate(self.user)
+        self.mercado = Category.objects.create(name='Mercado', user=self.user)
+        self.lazer = Category.objects.create(name='Lazer', user=self.user)
+
+    def resumo(self, categoria, mes, tipo='expense'):
+        return MonthlySummary.objects.filter(
+            user=self.user, category=categoria, month=mes, transaction_type=tipo,
+        ).values_list('total', 'count').first()
+
+    def test_rollup_follows_create_update_and_delete(self):
+        transacao = Transaction.objects.create(
+            description='Feira', value=40, transaction_type='expense',
+            date=date(2024, 3, 10), category=self.mercado, user=self.user,
+        )
+        Transaction.objects.create(
+            description='Padaria', value=10, transaction_type='expense',
+            date=date(2024, 3, 12), category=self.mercado, user=self.user,
+        )
+        self.assertEqual(self.resumo(self.mercado, date(2024, 3, 1)), (Decimal('50'), 2))
+
+        transacao.category = self.lazer
+        transacao.date = date(2024, 4, 2)
+        transacao.value = 45
+        transacao.save()
+        self.assertEqual(self.resumo(self.mercado, date(2024, 3, 1)), (Decimal('10'), 1))
+        self.assertEqual(self.resumo(self.lazer, date(2024, 4, 1)), (Decimal('45'), 1))
+
+        # Instância que não veio do banco: o estado anterior é consultado antes de salvar.
+        Transaction(
+            pk=transacao.pk, description='Feira', value=45, transaction_type='income',
+            date=date(2024, 4, 2), category=self.lazer, user=self.user,
+        ).save()
+        self.assertIsNone(self.resumo(self.lazer, date(2024, 4, 1)))
+        self.assertEqual(self.resumo(self.lazer, date(2024, 4, 1), 'income'), (Decimal('45'), 1))
+
+        Transaction.objects.get(pk=transacao.pk).delete()
+        self.assertIsNone(self.resumo(self.lazer, date(2024, 4, 1), 'income'))
+        self.assertEqual(verificar_resumos(self.user.id), [])
+
+    def test_deleted_category_moves_rollup_to_uncategorized(self):
+        for categoria in (self.mercado, None):
+            Transaction.objects.create(
+                description='Compra', value=30, transaction_type='expense',
+                date=date(2024, 5, 3), category=categoria, user=self.user,
+            )
+        self.mercado.delete()
+        self.assertEqual(self.resumo(None, date(2024, 5, 1)), (Decimal('60'), 2))
+        self.assertEqual(verificar_resumos(self.user.id), [])
+
+        response = self.client.get('/api/transactions/summary/')
+        self.assertEqual(response.data['total_expense'], Decimal('60'))
+        self.assertEqual(response.data['by_category'], [{'name': 'Sem categoria', 'total': Decimal('60'), 'color': '#ccc'}])
+
+    def test_rebuild_command_repairs_writes_that_skip_signals(self):
+        Transaction.objects.create(
+            description='Cinema', value=20, transaction_type='expense',
+            date=date(2024, 6, 8), category=self.lazer, user=self.user,
+        )
+        Transaction.objects.filter(user=self.user).update(value=25)
+        with self.assertRaises(CommandError):
+            call_command('reconstruir_resumos', '--verificar', stdout=StringIO())
+
+        call_command('reconstruir_resumos', '--usuario', str(self.user.id), stdout=StringIO())
+        self.assertEqual(self.resumo(self.lazer, date(2024, 6, 1)), (Decimal('25'), 1))
+        call_command('reconstruir_resumos', '--verificar', stdout=StringIO())
+
+    def test_summary_by_period_in_one_query(self):
+        for valor, tipo, dia, categoria in [
+            (1000, 'income', date(2024, 1, 5), None),
+            (200, 'expense', date(2024, 1, 20), self.mercado),
+            (50, 'expense', date(2024, 3, 2), self.lazer),
+            (70, 'expense', date(2024, 4, 1), self.lazer),
+        ]:
+            Transaction.objects.create(
+                description='Teste', value=valor, transaction_type=tipo,
+                date=dia, category=categoria, user=self.user,
+            )
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/transactions/summary/', {'start': '2024-01-01', 'end': '2024-03-31'})
+        self.assertEqual(response.data['balance'], Decimal('750'))
+        self.assertEqual(
+            [(p['period'], p['income'], p['expense']) for p in response.data['series']],
+            [(date(2024, 1, 1), Decimal('1000'), Decimal('200')), (date(2024, 2, 1), 0, 0),
+             (date(2024, 3, 1), 0, Decimal('50'))],
+        )
+        self.assertEqual({c['name']: c['total'] for c in response.data['by_category']},
+                         {'Mercado': Decimal('200'), 'Lazer': Decimal('50')})
+
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/transactions/summary/', {
+                'start': '2024-01-15', 'end': '2024-04-01', 'granularity': 'week',
+            })
+        self.assertEqual(response.data['total_expense'], Decimal('320'))
+        series = response.data['series']
+        self.assertEqual(series[0]['period'], date(2024, 1, 15))
+        self.assertEqual(series[0]['expense'], Decimal('200'))
+        self.assertEqual(len(series), 12)
+        self.assertEqual(series[-1], {'period': date(2024, 4, 1), 'income': 0, 'expense': Decimal('70'), 'balance': Decimal('-70')})
+
+        response = self.client.get('/api/transactions/summary/', {'start': '2024-05-01', 'end': '2024-01-01'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_summary_limits_periods_and_handles_the_last_representable_dates(self):
+        for parametros, periodos in (
+            ({'start': '9999-12-01', 'end': '9999-12-31'}, [date(9999, 12, 1)]),
+            ({'start': '9999-12-25', 'end': '9999-12-31', 'granularity': 'week'}, [date(9999, 12, 20), date(9999, 12, 27)]),
+        ):
+            response = self.client.get('/api/transactions/summary/', parametros)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual([item['period'] for item in response.data['series']], periodos)
+
+        for parametros in (
+            {'start': '0001-01-01', 'end': '9999-12-31'},
+            {'start': '0001-01-01', 'end': '2024-12-31', 'granularity': 'week'},
+        ):
+            response = self.client.get('/api/transactions/summary/', parametros)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Sem período informado, a série vem das transações: extremos distantes não
+        # geram uma série preenchida de milhares de períodos.
+        for dia in (date(2000, 1, 3), date(9999, 12, 31)):
+            Transaction.objects.create(
+                description='Compra', value=10, transaction_type='expense',
+                date=dia, category=self.mercado, user=self.user,
+            )
+        response = self.client.get('/api/transactions/summary/', {'granularity': 'week'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['series']), 2)
+        response = self.client.get('/api/transactions/summary/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total_expense'], Decimal('20'))
+
+
+class PlanoConsultasTest(TestCase):
+    """
+    Confere, pelo EXPLAIN das consultas que os endpoints realmente executam, que cada
+    caminho de acesso a Transaction usa o índice composto correspondente.
+    """
+    USUARIOS = 40
+    TRANSACOES_POR_USUARIO = 250
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create([
+            User(email=f'plano{i}@email.com', username=f'plano{i}', name='P', password='!')
+            for i in range(cls.USUARIOS)
+        ])
+        usuarios = list(User.objects.filter(username__startswith='plano'))
+        Category.objects.bulk_create([
+            Category(name=f'Cat {i}', user=usuario) for usuario in usuarios for i in range(5)
+        ])
+        categorias = {}
+        for categoria in Category.objects.filter(user__in=usuarios):
+            categorias.setdefault(categoria.user_id, []).append(categoria)
+        inicio = date(2022, 1, 1)
+        Transaction.objects.bulk_create([
+            Transaction(
+                description=f'Compra {j}', normalized_description=f'compra {j}', value=j % 97 + 1,
+                transaction_type='income' if j % 5 == 0 else 'expense',
+                date=inicio + timedelta(days=j * 3), user=usuario,
+                category=categorias[usuario.id][j % 5] if j % 7 else None,
+            )
+            for usuario in usuarios for j in range(cls.TRANSACOES_POR_USUARIO)
+        ], batch_size=1000)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cls.usuario = usuarios[0]
+        cls.categoria = categorias[cls.usuario.id][0]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+
+    def planos(self, executar):
+        """
+        Executa a função capturando as consultas e retorna o EXPLAIN das que leem transações.
+        """
+        with CaptureQueriesContext(connection) as contexto:
+            executar()
+        prefixo = 'EXPLAIN QUERY PLAN ' if connection.vendor == 'sqlite' else 'EXPLAIN '
+        planos = []
+        with connection.cursor() as cursor:
+            for consulta in contexto.captured_queries:
+                sql = consulta['sql']
+                if sql.startswith('SELECT') and 'api_transaction' in sql:
+                    cursor.execute(prefixo + sql)
+                    planos.append('\n'.join(' '.join(map(str, linha)) for linha in cursor.fetchall()))
+        return '\n'.join(planos)
+
+    def assertUsaIndice(self, indice, executar):
+        plano = self.planos(executar)
+        self.assertIn(indice, plano)
+        self.assertNotRegex(plano, r'(?m)(Seq Scan on api_transaction|SCAN api_transaction$)')
+
+    def test_list_and_filters_use_composite_indexes(self):
+        casos = [
+            ('transaction_user_date_idx', {'ordering': '-date'}),
+            ('transaction_user_value_idx', {'ordering': '-value'}),
+            ('transaction_user_type_date_idx', {'tipo': 'expense', 'ordering': '-date'}),
+            ('transaction_user_cat_date_idx', {'categoria': self.categoria.id, 'ordering': '-date'}),
+        ]
+        for indice, parametros in casos:
+            with self.subTest(parametros=parametros):
+                self.assertUsaIndice(indice, lambda: self.client.get('/api/transactions/', parametros))
+
+    def test_summary_and_suggestions_use_composite_indexes(self):
+        self.assertUsaIndice('transaction_user_date_idx', lambda: self.client.get('/api/transactions/summary/', {
+            'start': '2022-03-10', 'end': '2022-06-20', 'granularity': 'week',
+        }))
+        # Qualquer índice composto iniciado pelo usuário atende a leitura do histórico.
+        self.assertUsaIndice('transaction_user_', lambda: construir_modelo(self.usuario.id))
+
+
+class PaginacaoPorCursorTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='cur@email.com', username='curuser', name='C', password='123456')
+        self.client.force_authenticate(self.user)
+        self.categoria = Category.objects.create(name='Mercado', user=self.user)
+        inicio = date(2024, 1, 1)
+        Transaction.objects.bulk_create([
+            Transaction(
+                description=f'Compra {i}', value=i % 7 + 1, transaction_type='expense',
+                # Várias transações por dia, para exercitar o desempate pelo id.
+                date=inicio + timedelta(days=i // 4), user=self.user,
+                category=self.categoria if i % 2 else None,
+            )
+            for i in range(45)
+        ])
+
+    def percorrer(self, parametros):
+        ids = []
+        response = self.client.get('/api/transactions/', {'pagination': 'cursor', 'page_size': 10, **parametros})
+        while True:
+            self.assertNotIn('count', response.data)
+            ids.extend(item['id'] for item in response.data['results'])
+            if response.data['next'] is None:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_walks_all_pages_in_order_without_count(self):
+        esperado = list(Transaction.objects.order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(self.percorrer({}), esperado)
+
+        esperado = list(Transaction.objects.order_by('value', 'id').values_list('id', flat=True))
+        self.assertEqual(self.percorrer({'ordering': 'value'}), esperado)
+
+        esperado = list(
+            Transaction.objects.filter(category=self.categoria).order_by('date', 'id').values_list('id', flat=True)
+        )
+        self.assertEqual(self.percorrer({'categoria': self.categoria.id, 'ordering': 'date'}), esperado)
+
+    def test_deep_page_costs_the_same_as_first(self):
+        with self.assertNumQueries(1):
+            primeira = self.client.get('/api/transactions/', {'pagination': 'cursor', 'page_size': 5})
+        response = primeira
+        for _ in range(5):
+            response = self.client.get(response.data['next'])
+        with CaptureQueriesContext(connection) as contexto:
+            self.client.get(response.data['next'])
+        self.assertEqual(len(contexto.captured_queries), 1)
+        self.assertNotIn('OFFSET', contexto.captured_queries[0]['sql'].upper())
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/transactions/', {'cursor': 'invalido'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_relevance_ordered_search_keeps_page_numbers(self):
+        # Simula a busca textual do PostgreSQL, que ordena por relevância.
+        def por_relevancia(queryset, palavras):
+            if not palavras:
+                return queryset
+            return queryset.annotate(relevancia=F('value')).order_by('-relevancia', '-date', '-id')
+
+        esperado = list(Transaction.objects.order_by('-value', '-date', '-id').values_list('id', flat=True))
+        with mock.patch('api.views.buscar_transacoes', por_relevancia):
+            response = self.client.get('/api/transactions/', {'pagination': 'cursor', 'search': 'compra'})
+            self.assertEqual(response.data['count'], 45)
+            self.assertEqual([item['id'] for item in response.data['results']], esperado[:20])
+            segunda = self.client.get(response.data['next'])
+            self.assertEqual([item['id'] for item in segunda.data['results']], esperado[20:40])
+
+            cursor = self.client.get('/api/transactions/', {'pagination': 'cursor'}).data['next']
+            response = self.client.get(cursor + '&search=compra')
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+class FiltrosTransacoesTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='fil@email.com', username='filuser', name='F', password='123456')
+        self.client.force_authenticate(self.user)
+        self.categoria = Category.objects.create(name='Mercado', user=self.user)
+        Transaction.objects.bulk_create([
+            Transaction(
+                description=f'Compra {i}', value=i % 7 + 1, transaction_type='expense',
+                date=date(2024, 1, 1) + timedelta(days=i // 4), user=self.user,
+                category=self.categoria if i % 2 else None,
+            )
+            for i in range(30)
+        ])
+
+    def test_range_and_multi_category_filters(self):
+        outra = Category.objects.create(name='Lazer', user=self.user)
+        Transaction.objects.create(
+            description='Cinema', value=40, transaction_type='expense',
+            date=date(2024, 1, 3), category=outra, user=self.user,
+        )
+        parametros = {
+            'data_inicio': '2024-01-02', 'data_fim': '2024-01-05', 'valor_min': '3', 'valor_max': '40',
+            'categoria': f'{self.categoria.id},{outra.id}', 'page_size': 100,
+        }
+        response = self.client.get('/api/transactions/', parametros)
+        esperado = set(Transaction.objects.filter(
+            date__range=(date(2024, 1, 2), date(2024, 1, 5)), value__range=(3, 40),
+            category__in=[self.categoria, outra],
+        ).values_list('id', flat=True))
+        self.assertEqual({item['id'] for item in response.data['results']}, esperado)
+        self.assertEqual(response.data['count'], len(esperado))
+
+        response = self.client.get('/api/transactions/', [('categoria', outra.id), ('categoria', self.categoria.id)])
+        self.assertEqual(response.data['count'], Transaction.objects.exclude(category=None).count())
+
+    def test_invalid_filters_are_rejected(self):
+        for parametros in [
+            {'data_inicio': '2024-13-01'}, {'valor_min': 'abc'}, {'categoria': '1,x'}, {'tipo': 'outro'},
+            {'data': 'ontem'}, {'data_inicio': '2024-02-01', 'data_fim': '2024-01-01'},
+            {'valor_min': '10', 'valor_max': '5'},
+        ]:
+            with self.subTest(parametros=parametros):
+                response = self.client.get('/api/transactions/', parametros)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class TransacoesEmLoteTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='lote@email.com', username='loteuser', name='L', password='123456')
+        self.client.force_authenticate(self.user)
+        self.mercado = Category.objects.create(name='Mercado', user=self.user)
+        self.lazer = Category.objects.create(name='Lazer', user=self.user)
+        outro = User.objects.create_user(email='outro@email.com', username='outrouser', name='O', password='123456')
+        self.alheia = Category.objects.create(name='Alheia', user=outro)
+        cache_modelos.limpar()
+
+    def itens(self, quantidade):
+        return [
+            {'description': f'Feira {i}', 'value': '10.50', 'transaction_type': 'expense',
+             'date': str(date(2024, 2, 1 + i % 28)), 'category': self.mercado.id if i % 2 else None}
+            for i in range(quantidade)
+        ]
+
+    def test_bulk_create_is_atomic_and_reports_errors_per_item(self):
+        itens = self.itens(3)
+        itens[1]['value'] = '-1'
+        itens[2]['category'] = self.alheia.id
+        response = self.client.post('/api/transactions/bulk/', {'itens': itens}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        erros = response.data['itens']
+        self.assertEqual(sorted(erros), [1, 2])
+        self.assertIn('value', erros[1])
+        self.assertIn('category', erros[2])
+        self.assertFalse(Transaction.objects.exists())
+
+    def test_bulk_create_query_count_does_not_grow_with_items(self):
+        with CaptureQueriesContext(connection) as poucos:
+            self.client.post('/api/transactions/bulk/', {'itens': self.itens(4)}, format='json')
+        with CaptureQueriesContext(connection) as muitos:
+            response = self.client.post('/api/transactions/bulk/', {'itens': self.itens(200)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['results']), 200)
+        self.assertEqual(response.data['results'][1]['category_name'], 'Mercado')
+        self.assertLessEqual(len(muitos.captured_queries), len(poucos.captured_queries) + 2)
+        self.assertEqual(Transaction.objects.filter(normalized_description='feira 3').count(), 2)
+        self.assertEqual(verificar_resumos(self.user.id), [])
+
+    def test_bulk_update_and_delete_keep_rollup_and_model_in_sync(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            criadas = self.client.post('/api/transactions/bulk/', {'itens': self.itens(12)}, format='json').data['results']
+        ids = [item['id'] for item in criadas]
+
+        alteracoes = [{'id': i, 'category': self.lazer.id, 'description': 'Cinema com amigos'} for i in ids[:6]]
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch('/api/transactions/bulk/', {'itens': alteracoes}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({item['category_name'] for item in response.data['results']}, {'Lazer'})
+        self.assertEqual(Transaction.objects.filter(category=self.lazer, normalized_description='cinema com amigos').count(), 6)
+        self.assertEqual(verificar_resumos(self.user.id), [])
+        self.assertEqual(obter_modelo(self.user.id).sugerir('cinema com amigos')[0], 'Lazer')
+
+        response = self.client.patch('/api/transactions/bulk/', {'itens': [{'id': ids[0]}, {'id': 999999}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data['itens']), [1])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete('/api/transactions/bulk/', {'ids': ids[:6]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Transaction.objects.count(), 6)
+        self.assertEqual(verificar_resumos(self.user.id), [])
+        self.assertEqual(len(obter_modelo(self.user.id)), 3)
+
+    def test_bulk_rejects_non_scalar_ids_by_position(self):
+        transacao = Transaction.objects.create(
+            description='Feira', value=10, transaction_type='expense', date=date(2024, 3, 1), user=self.user,
+        )
+        response = self.client.delete('/api/transactions/bulk/', {'ids': [transacao.id, [1], {'id': 1}, True]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['ids'], {1: ['ID inválido.'], 2: ['ID inválido.'], 3: ['ID inválido.']})
+
+        response = self.client.patch('/api/transactions/bulk/', {'itens': [{'id': {}}, {'id': transacao.id}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data['itens']), [0])
+        self.assertTrue(Transaction.objects.filter(pk=transacao.pk).exists())
+
+
+class ImportacaoExtratoTest(TestCase):
+    CSV = (
+        'Data;Descrição;Valor;Categoria\n'
+        '05/03/2024;Supermercado Dia;-1.234,56;Mercado\n'
+        '06/03/2024;Uber para o trabalho;-25,90;\n'
+        '31/02/2024;Data errada;-10,00;\n'
+        '07/03/2024;Salário;5.000,00;\n'
+        '\n'
+        '08/03/2024;Valor zerado;0;\n'
+    )
+
+    def setUp(self):
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        configuracao = self.settings(IMPORTACOES_DIR=diretorio)
+        configuracao.enable()
+        self.addCleanup(configuracao.disable)
+        cache_modelos.limpar()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='imp@email.com', username='impuser', name='I', password='123456')
+        self.client.force_authenticate(self.user)
+        self.mercado = Category.objects.create(name='Mercado', user=self.user)
+        self.transporte = Category.objects.create(name='Transporte', user=self.user)
+
+    def test_csv_upload_reports_rows_and_assigns_categories(self):
+        arquivo = SimpleUploadedFile('extrato.csv', self.CSV.encode('utf-8'))
+        response = self.client.post('/api/transactions/imports/', {'arquivo': arquivo}, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], 'done')
+        self.assertEqual(response.data['processed_rows'], 5)
+        self.assertEqual(response.data['created_count'], 3)
+        self.assertEqual([erro['linha'] for erro in response.data['errors']], [4, 7])
+
+        mercado = Transaction.objects.get(normalized_description='supermercado dia')
+        self.assertEqual((mercado.value, mercado.transaction_type, mercado.category), (Decimal('1234.56'), 'expense', self.mercado))
+        self.assertEqual(Transaction.objects.get(normalized_description='uber para o trabalho').category, self.transporte)
+        self.assertEqual(Transaction.objects.get(normalized_description='salario').transaction_type, 'income')
+        self.assertEqual(verificar_resumos(self.user.id), [])
+
+        detalhe = self.client.get(f"/api/transactions/imports/{response.data['id']}/")
+        self.assertEqual(detalhe.data['error_count'], 2)
+
+    def test_suggested_category_matches_names_with_surrounding_spaces(self):
+        streaming = Category.objects.create(name=' Streaming ', user=self.user)
+        for dia in range(1, 4):
+            Transaction.objects.create(
+                description='Netflix assinatura', value=40, transaction_type='expense',
+                date=date(2024, 2, dia), category=streaming, user=self.user,
+            )
+        cache_modelos.limpar()
+        response = self.client.post('/api/transactions/imports/', {
+            'arquivo': SimpleUploadedFile('extrato.csv', 'data,descricao,valor\n2024-03-01,Netflix assinatura mensal,-40.00\n'.encode()),
+        }, format='multipart')
+        self.assertEqual(response.data['created_count'], 1)
+        self.assertEqual(Transaction.objects.get(date=date(2024, 3, 1)).category, streaming)
+
+    def test_uncertain_or_mismatched_suggestions_leave_rows_uncategorized(self):
+        for dia in range(1, 10):
+            Transaction.objects.create(
+                description='Feira do bairro', value=30, transaction_type='expense',
+                date=date(2024, 2, dia), category=self.mercado, user=self.user,
+            )
+        cache_modelos.limpar()
+        conteudo = (
+            'data,descricao,valor\n'
+            '2024-03-01,Pagamento boleto xyz,-80.00\n'
+            '2024-03-02,Feira do bairro,-30.00\n'
+            '2024-03-03,Feira do bairro reembolso,30.00\n'
+            '2024-03-04,Uber centro,-15.00\n'
+        )
+        response = self.client.post('/api/transactions/imports/', {
+            'arquivo': SimpleUploadedFile('extrato.csv', conteudo.encode()),
+        }, format='multipart')
+        self.assertEqual(response.data['created_count'], 4)
+        categorias = dict(
+            Transaction.objects.filter(date__gte=date(2024, 3, 1)).values_list('date', 'category')
+        )
+        # Sem termo conhecido nem regra, e receita para uma categoria só de despesas: sem categoria.
+        self.assertEqual(categorias, {
+            date(2024, 3, 1): None,
+            date(2024, 3, 2): self.mercado.id,
+            date(2024, 3, 3): None,
+            date(2024, 3, 4): self.transporte.id,
+        })
+
+    @override_settings(IMPORTACAO_TAMANHO_MAXIMO=64)
+    def test_upload_above_size_limit_is_rejected(self):
+        response = self.client.post('/api/transactions/imports/', {
+            'arquivo': SimpleUploadedFile('extrato.csv', self.CSV.encode('utf-8')),
+        }, format='multipart')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('arquivo', response.data)
+        self.assertFalse(StatementImport.objects.exists())
+
+    def test_reimported_overlapping_statement_skips_duplicates(self):
+        primeiro = 'data,descricao,valor\n2024-03-01,Café,-5.00\n2024-03-01,Café,-5.00\n2024-03-02,Padaria,-8.00\n'
+        segundo = primeiro.replace('Café', 'CAFE') + '2024-03-01,Cafe,-5.00\n2024-03-03,Cinema,-30.00\n'
+        for conteudo in (primeiro, segundo):
+            response = self.client.post('/api/transactions/imports/', {
+                'arquivo': SimpleUploadedFile('extrato.csv', conteudo.encode()),
+            }, format='multipart')
+        self.assertEqual((response.data['created_count'], response.data['duplicate_count']), (2, 3))
+        self.assertEqual(response.data['duplicate_rows'], [2, 3, 4])
+        self.assertEqual(Transaction.objects.filter(normalized_description='cafe').count(), 3)
+
+        response = self.client.post('/api/transactions/imports/', {
+            'arquivo': SimpleUploadedFile('extrato.csv', primeiro.encode()), 'manter_duplicadas': 'true',
+        }, format='multipart')
+        self.assertEqual((response.data['created_count'], response.data['duplicate_count']), (3, 3))
+
+    def test_fingerprint_follows_edits_and_bulk_create_can_skip_duplicates(self):
+        transacao = Transaction.objects.create(
+            description='Feira', value=40, transaction_type='expense', date=date(2024, 3, 10), user=self.user,
+        )
+        antes = transacao.fingerprint
+        transacao.value = 41
+        transacao.save(update_fields=['value'])
+        transacao.refresh_from_db()
+        self.assertNotEqual(transacao.fingerprint, antes)
+
+        itens = [
+            {'description': 'FEIRA', 'value': '41.00', 'transaction_type': 'expense', 'date': '2024-03-10'},
+            {'description': 'Feira', 'value': '40', 'transaction_type': 'expense', 'date': '2024-03-10'},
+        ]
+        response = self.client.post('/api/transactions/bulk/', {'itens': itens, 'ignorar_duplicadas': True}, format='json')
+        self.assertEqual(response.data['duplicadas'], [0])
+        self.assertEqual([item['value'] for item in response.data['results']], ['40.00'])
+
+    def test_resume_after_failure_does_not_duplicate_rows(self):
+        linhas = ''.join(f'2024-01-{dia:02d},Compra {dia},-{dia}.00\n' for dia in range(1, 11))
+        importacao = criar_importacao(
+            self.user, SimpleUploadedFile('extrato.csv', ('data,descricao,valor\n' + linhas).encode()), 'extrato.csv', 'csv',
+        )
+
+        def interromper(importacao):
+            raise RuntimeError('queda do worker')
+
+        with self.assertRaises(RuntimeError):
+            processar_importacao(importacao, tamanho_lote=4, progresso=interromper)
+        importacao.refresh_from_db()
+        self.assertEqual((importacao.status, importacao.processed_rows), ('failed', 4))
+        self.assertEqual(Transaction.objects.count(), 4)
+
+        response = self.client.post(f'/api/transactions/imports/{importacao.id}/resume/')
+        self.assertEqual(response.data['status'], 'done')
+        self.assertEqual(response.data['created_count'], 10)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 10)
+        self.assertEqual(self.client.post(f'/api/transactions/imports/{importacao.id}/resume/').status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+    def test_ofx_command_streams_single_line_file_in_chunks(self):
+        transacoes = ''.join(
+            f'<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>202402{i % 28 + 1:02d}120000[-3:BRT]<TRNAMT>-{i + 1}.50'
+            f'<FITID>{i}<MEMO>Pagamento {i}</STMTTRN>'
+            for i in range(3000)
+        )
+        conteudo = 'OFXHEADER:100\nCHARSET:1252\n\n<OFX><BANKTRANLIST>' + transacoes + '</BANKTRANLIST></OFX>'
+        caminho = os.path.join(tempfile.mkdtemp(), 'extrato.ofx')
+        self.addCleanup(shutil.rmtree, os.path.dirname(caminho), ignore_errors=True)
+        with open(caminho, 'w', encoding='cp1252') as arquivo:
+            arquivo.write(conteudo)
+
+        saida = StringIO()
+        call_command('importar_extrato', caminho, '--usuario', str(self.user.id), '--lote', '1000', stdout=saida)
+        self.assertEqual(saida.getvalue().count('linhas processadas'), 3)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 3000)
+        ultima = Transaction.objects.get(normalized_description='pagamento 2999')
+        self.assertEqual((ultima.value, ultima.date), (Decimal('3000.50'), date(2024, 2, 4)))
+        self.assertEqual(StatementImport.objects.get().status, 'done')
+
+
+class ExportacaoTransacoesTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='exp@email.com', username='expuser', name='E', password='123456')
+        self.client.force_authenticate(self.user)
+        self.categoria = Category.objects.create(name='Mercado', user=self.user, color='#123456')
+        Transaction.objects.bulk_create([
+            Transaction(
+                description='=SOMA(A1)' if i == 0 else f'Compra {i}', value=Decimal(i + 1),
+                transaction_type='expense', date=date(2024, 1, 1) + timedelta(days=i),
+                category=self.categoria if i % 2 else None, user=self.user,
+            )
+            for i in range(1200)
+        ])
+
+    def baixar(self, parametros):
+        with CaptureQueriesContext(connection) as contexto:
+            response = self.client.get('/api/transactions/export/', parametros)
+            conteudo = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(contexto.captured_queries), 1)
+        return response, conteudo
+
+    def test_csv_export_streams_and_round_trips_through_import(self):
+        response, conteudo = self.baixar({'data_inicio': '2024-01-01', 'data_fim': '2024-12-31'})
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        linhas = conteudo.splitlines()
+        self.assertEqual(linhas[0], 'data,descricao,valor,tipo,categoria,cor_categoria')
+        self.assertEqual(len(linhas), 1 + 366)
+        self.assertEqual(linhas[1], "2024-01-01,'=SOMA(A1),1.00,expense,,")
+        self.assertEqual(linhas[2], '2024-01-02,Compra 1,2.00,expense,Mercado,#123456')
+
+        outro = User.objects.create_user(email='exp2@email.com', username='exp2user', name='E', password='123456')
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        with override_settings(IMPORTACOES_DIR=diretorio):
+            importacao = criar_importacao(outro, SimpleUploadedFile('t.csv', conteudo.encode()), 't.csv', 'csv')
+            processar_importacao(importacao)
+        self.assertEqual((importacao.created_count, importacao.error_count), (366, 0))
+
+    def test_ndjson_export_uses_api_fields(self):
+        _, conteudo = self.baixar({'formato': 'ndjson', 'categoria': self.categoria.id})
+        linhas = [json.loads(linha) for linha in conteudo.splitlines()]
+        self.assertEqual(len(linhas), 600)
+        self.assertEqual(linhas[0]['category_name'], 'Mercado')
+        self.assertEqual(linhas[0]['value'], '2.00')
+
+        response = self.client.get('/api/transactions/export/', {'formato': 'xlsx'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class CacheRespostasTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='cache@email.com', username='cacheuser', name='C', password='123456')
+        self.client.force_authenticate(self.user)
+        self.categoria = Category.objects.create(name='Mercado', user=self.user, monthly_limit=100)
+        Transaction.objects.create(
+            description='Feira', value=40, transaction_type='expense',
+            date=date.today(), category=self.categoria, user=self.user,
+        )
+
+    def test_repeated_reads_are_served_from_cache(self):
+        antes = cache_respostas.estatisticas()
+        primeira = self.client.get('/api/transactions/summary/').data
+        categorias = self.client.get('/api/categories/').data
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/transactions/summary/').data, primeira)
+            self.assertEqual(self.client.get('/api/categories/').data, categorias)
+        self.client.get('/api/transactions/summary/', {'granularity': 'week'})
+        depois = cache_respostas.estatisticas()
+        self.assertEqual(depois['acertos'] - antes['acertos'], 2)
+        self.assertEqual(depois['falhas'] - antes['falhas'], 3)
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'outro_worker': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'outro_worker'},
+    })
+    def test_local_memory_cache_expires_versions_missed_by_other_workers(self):
+        # A memória local de outro worker não recebe a troca de versão feita por este.
+        outro_worker = CacheRespostas('outro_worker', timeout=86400, timeout_local=30)
+        etag = outro_worker.etag(self.user.id, 'resumo', {})
+        self.assertEqual(outro_worker.obter(self.user.id, 'resumo', {}, lambda: 'antigo'), 'antigo')
+        cache_respostas.invalidar(self.user.id)
+        self.assertEqual(outro_worker.etag(self.user.id, 'resumo', {}), etag)
+
+        with mock.patch('time.time', return_value=time.time() + 31):
+            self.assertNotEqual(outro_worker.etag(self.user.id, 'resumo', {}), etag)
+            self.assertEqual(outro_worker.obter(self.user.id, 'resumo', {}, lambda: 'novo'), 'novo')
+
+    def test_writes_bump_only_the_owner_version(self):
+        outro = User.objects.create_user(email='cache2@email.com', username='cache2user', name='D', password='123456')
+        versao_outro = cache_respostas.versao(outro.id)
+        self.assertEqual(self.client.get('/api/categories/').data['results'][0]['current_spent'], Decimal('40'))
+
+        self.client.post('/api/transactions/', {
+            'description': 'Padaria', 'value': '10', 'transaction_type': 'expense',
+            'date': date.today().isoformat(), 'category': self.categoria.id,
+        })
+        self.assertEqual(self.client.get('/api/categories/').data['results'][0]['current_spent'], Decimal('50'))
+        self.client.patch(f'/api/categories/{self.categoria.id}/', {'monthly_limit': '200'})
+        self.assertEqual(self.client.get('/api/categories/').data['results'][0]['current_percentage'], 25.0)
+        self.client.delete('/api/transactions/bulk/', {'ids': list(
+            Transaction.objects.filter(user=self.user).values_list('id', flat=True)
+        )}, format='json')
+        self.assertEqual(self.client.get('/api/transactions/summary/').data['total_expense'], 0)
+        self.assertEqual(cache_respostas.versao(outro.id), versao_outro)
+
+        self.assertEqual(self.client.get('/api/respostas/estatisticas/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_unchanged_responses_return_304_without_queries(self):
+        for url, parametros in [('/api/transactions/', {'ordering': '-date'}), ('/api/categories/', {'page_size': 5}),
+                                ('/api/transactions/summary/', {'granularity': 'week'})]:
+            etag = self.client.get(url, parametros)['ETag']
+            self.assertFalse(etag.startswith('W/'))
+            with self.assertNumQueries(0):
+                response = self.client.get(url, parametros, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+            self.assertEqual(response['ETag'], etag)
+            self.assertFalse(response.content)
+
+        etag = self.client.get('/api/transactions/')['ETag']
+        self.assertNotEqual(self.client.get('/api/transactions/', {'ordering': 'value'})['ETag'], etag)
+        self.client.post('/api/transactions/', {
+            'description': 'Padaria', 'value': '10', 'transaction_type': 'expense',
+            'date': date.today().isoformat(), 'category': self.categoria.id,
+        })
+        response = self.client.get('/api/transactions/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+@override_settings(SINCRONIZACAO_JANELA=0)
+class SincronizacaoTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='sync@email.com', username='syncuser', name='S', password='123456')
+        self.client.force_authenticate(self.user)
+        self.categoria = Category.objects.create(name='Mercado', user=self.user)
+        self.transacoes = [
+            Transaction.objects.create(
+                description=f'Compra {i}', value=10 + i, transaction_type='expense',
+                date=date(2024, 5, 1 + i), category=self.categoria, user=self.user,
+            )
+            for i in range(3)
+        ]
+
+    def sincronizar(self, token):
+        response = self.client.get('/api/sync/', {'since': token})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_feed_returns_only_changes_since_token(self):
+        inicial = self.client.get('/api/sync/').data
+        self.assertEqual([c['name'] for c in inicial['categories']], ['Mercado'])
+        self.assertEqual(len(inicial['transactions']), 3)
+        self.assertFalse(inicial['has_more'])
+        self.assertEqual(self.sincronizar(inicial['token'])['transactions'], [])
+
+        editada, removida, _ = self.transacoes
+        self.client.patch(f'/api/transactions/{editada.id}/', {'value': '99'})
+        self.client.patch(f'/api/transactions/{editada.id}/', {'value': '98'})
+        self.client.delete(f'/api/transactions/{removida.id}/')
+        self.client.post('/api/transactions/bulk/', {'itens': [
+            {'description': 'Nova', 'value': '5', 'transaction_type': 'income', 'date': '2024-05-10'},
+        ]}, format='json')
+        self.client.patch(f'/api/categories/{self.categoria.id}/', {'color': '#000000'})
+        with self.assertNumQueries(3):
+            delta = self.sincronizar(inicial['token'])
+        self.assertEqual([c['color'] for c in delta['categories']], ['#000000'])
+        self.assertEqual([(t['description'], t['value']) for t in delta['transactions']],
+                         [('Compra 0', '98.00'), ('Nova', '5.00')])
+        self.assertEqual(delta['deleted'], {'categories': [], 'transactions': [removida.id]})
+        self.assertEqual(self.sincronizar(delta['token'])['deleted']['transactions'], [])
+        # Cada objeto guarda só o registro da última alteração.
+        self.assertEqual(ChangeLogEntry.objects.filter(user=self.user).count(), 1 + 4)
+
+        parcial = alteracoes_desde(self.user, inicial['token'], limite=1)
+        self.assertTrue(parcial['has_more'])
+        self.assertEqual(self.sincronizar(parcial['token'])['token'], delta['token'])
+
+    def test_category_delete_emits_tombstone_and_detached_transactions(self):
+        token = self.sincronizar(0)['token']
+        self.client.delete(f'/api/categories/{self.categoria.id}/')
+        delta = self.sincronizar(token)
+        self.assertEqual(delta['deleted']['categories'], [self.categoria.id])
+        self.assertEqual([t['category'] for t in delta['transactions']], [None, None, None])
+
+        self.user.delete()
+        self.assertFalse(ChangeLogEntry.objects.exists())
+
+    @override_settings(SINCRONIZACAO_JANELA=5)
+    def test_recent_entries_wait_for_the_safety_window(self):
+        antigo = timezone.now() - timedelta(minutes=1)
+        ChangeLogEntry.objects.update(created_at=antigo)
+        token = self.sincronizar(0)['token']
+
+        # A edição mais antiga pode estar em uma transação ainda não confirmada: nem
+        # ela nem a posterior (já confirmada, com ID maior) entram antes da janela.
+        for transacao in self.transacoes[:2]:
+            self.client.patch(f'/api/transactions/{transacao.id}/', {'value': '50'})
+        anterior, posterior = ChangeLogEntry.objects.filter(id__gt=token).order_by('id')
+        ChangeLogEntry.objects.filter(id=posterior.id).update(created_at=antigo)
+        delta = self.sincronizar(token)
+        self.assertEqual((delta['token'], delta['transactions'], delta['has_more']), (token, [], False))
+
+        ChangeLogEntry.objects.filter(id=anterior.id).update(created_at=antigo)
+        delta = self.sincronizar(token)
+        self.assertEqual([t['id'] for t in delta['transactions']], [t.id for t in self.transacoes[:2]])
+        self.assertEqual(delta['token'], posterior.id)
+
+    def test_invalid_token_is_rejected(self):
+        response = self.client.get('/api/sync/', {'since': 'abc'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class AutocompletarTest(TestCase):
+    def setUp(self):
+        cache_indices.limpar()
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='auto@email.com', username='autouser', name='A', password='123456')
+        self.client.force_authenticate(self.user)
+        self.transporte = Category.objects.create(name='Transporte', user=self.user)
+        self.lazer = Category.objects.create(name='Lazer', user=self.user)
+        for descricao, categoria, valor in [
+            ('Uber trabalho', self.transporte, 23), ('UBER  Trabalho', self.transporte, 23),
+            ('Uber trabalho', self.lazer, 30), ('Uber Eats', self.lazer, 45), ('Padaria', None, 8),
+        ]:
+            Transaction.objects.create(
+                description=descricao, value=valor, transaction_type='expense',
+                date=date(2024, 5, 1), category=categoria, user=self.user,
+            )
+
+    def completar(self, q, **parametros):
+        return self.client.get('/api/transactions/autocomplete/', {'q': q, **parametros}).data
+
+    def test_completes_prefix_with_usual_category_and_value(self):
+        resultado = self.completar('úber')
+        self.assertEqual([(r['description'], r['count']) for r in resultado], [('Uber trabalho', 3), ('Uber Eats', 1)])
+        self.assertEqual(
+            (resultado[0]['category'], resultado[0]['category_name'], resultado[0]['value']),
+            (self.transporte.id, 'Transporte', Decimal('23')),
+        )
+        self.assertEqual(len(self.completar('u', limit=1)), 1)
+        self.assertEqual(self.completar('uber t')[0]['description'], 'Uber trabalho')
+        self.assertEqual(self.completar('  '), [])
+        with self.assertNumQueries(0):
+            self.assertEqual(self.completar('taxi'), [])
+
+    def test_index_is_updated_incrementally_on_writes(self):
+        self.completar('uber')
+        indice = obter_indice(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/transactions/bulk/', {'itens': [
+                {'description': 'Uber Eats', 'value': '45', 'transaction_type': 'expense', 'date': '2024-05-02'}
+                for _ in range(3)
+            ]}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.get(description='Padaria').delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.transporte.name = 'Mobilidade'
+            self.transporte.save()
+        with self.assertNumQueries(0):
+            resultado = self.completar('uber')
+        self.assertIs(obter_indice(self.user.id), indice)
+        self.assertEqual([(r['description'], r['count']) for r in resultado], [('Uber Eats', 4), ('Uber trabalho', 3)])
+        self.assertEqual(resultado[1]['category_name'], 'Mobilidade')
+        self.assertEqual(self.completar('pad'), [])
+
+    def test_index_is_rebuilt_after_writes_from_another_process(self):
+        indice = obter_indice(self.user.id)
+        # Escrita confirmada por outro processo: só o contador compartilhado muda aqui.
+        Transaction.objects.filter(description='Padaria').update(description='Pastel')
+        autocompletar._incrementar(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            Transaction.objects.create(
+                description='Pastelaria', value=10, transaction_type='expense', date=date(2024, 5, 3), user=self.user,
+            )
+        self.assertIsNone(indice.contador)
+        self.assertEqual([r['description'] for r in self.completar('past')], ['Pastel', 'Pastelaria'])
+        self.assertIsNot(obter_indice(self.user.id), indice)
+
+    def test_removing_every_use_drops_the_description(self):
+        indice = IndiceDescricoes()
+        indice.aprender([('Café', None, 5), ('Cafe', None, 5)])
+        indice.esquecer([('Café', None, 5)])
+        self.assertEqual(indice.completar('caf')[0]['description'], 'Cafe')
+        indice.esquecer([('Cafe', None, 5)])
+        self.assertEqual((len(indice), indice.completar('caf')), (0, []))
+
+    def test_stored_rankings_follow_writes(self):
+        indice = IndiceDescricoes()
+        indice.aprender([(f'Loja {i}', None, 1) for i in range(400) for _ in range(i % 7)])
+        self.assertEqual(indice.completar('loja', 2)[0]['count'], 6)
+        indice.aprender([('Loja 399', None, 1)] * 10)
+        indice.esquecer([('Loja 6', None, 1)] * 6)
+        esperado = IndiceDescricoes()
+        esperado.aprender([(f'Loja {i}', None, 1) for i in range(400) for _ in range(i % 7) if i != 6])
+        esperado.aprender([('Loja 399', None, 1)] * 10)
+        self.assertEqual(indice.completar('lo', 20), esperado.completar('lo', 20))
+        self.assertEqual(indice.completar('loja', 1)[0]['description'], 'Loja 399')
+
+    def test_deploy_requires_a_cache_shared_between_workers(self):
+        def erros(**kwargs):
+            return [erro.id for erro in run_checks(tags=[Tags.caches], **kwargs)]
+
+        self.assertIn('api.E001', erros(include_deployment_checks=True))
+        self.assertNotIn('api.E001', erros())
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        compartilhado = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': diretorio}}
+        with override_settings(CACHES=compartilhado):
+            self.assertNotIn('api.E001', erros(include_deployment_checks=True))
+
+
+class ViewsAssincronasTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='async@email.com', username='asyncuser', name='A', password='123456')
+        self.client.force_authenticate(self.user)
+        self.token = str(RefreshToken.for_user(self.user).access_token)
+        self.fabrica = AsyncRequestFactory()
+        for i in range(3):
+            categoria = Category.objects.create(name=f'Categoria {i}', user=self.user, monthly_limit=100)
+            Transaction.objects.create(
+                description=f'Compra {i}', value=10 + i, transaction_type='expense',
+                date=date.today(), category=categoria, user=self.user,
+            )
+        Transaction.objects.create(
+            description='Salário', value=1000, transaction_type='income', date=date(2024, 1, 5), user=self.user,
+        )
+
+    def requisicao(self, url, parametros=None, **cabecalhos):
+        return self.fabrica.get(url, parametros or {}, headers={'Authorization': f'Bearer {self.token}', **cabecalhos})
+
+    async def test_async_views_match_the_sync_ones(self):
+        casos = [
+            (assincronas.transaction_summary, '/api/transactions/summary/', {'granularity': 'week'}),
+            (assincronas.transaction_summary, '/api/transactions/summary/', {'start': '2024-01-01', 'end': '2024-03-31'}),
+            (assincronas.listar_categorias, '/api/categories/', {'page_size': 2}),
+            (assincronas.listar_categorias, '/api/categories/', {'page_size': 2, 'page': 2}),
+            (assincronas.sugerir_categorias, '/api/categorias/sugestoes/', {'q': 'compra 1'}),
+        ]
+        for view, url, parametros in casos:
+            esperado = await sync_to_async(self.client.get)(url, parametros)
+            response = await view(self.requisicao(url, parametros))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(json.loads(response.content), json.loads(esperado.content))
+
+        response = await assincronas.transaction_summary(self.requisicao('/api/transactions/summary/', {'granularity': 'dia'}))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = await assincronas.listar_categorias(self.requisicao('/api/categories/', {'page': 9}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    async def test_authentication_and_conditional_requests(self):
+        response = await assincronas.transaction_summary(self.fabrica.get('/api/transactions/summary/'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertIn('WWW-Authenticate', response)
+        invalido = self.fabrica.get('/api/categories/', headers={'Authorization': 'Bearer invalido'})
+        self.assertEqual((await assincronas.listar_categorias(invalido)).status_code, status.HTTP_401_UNAUTHORIZED)
+
+        etag = (await assincronas.listar_categorias(self.requisicao('/api/categories/')))['ETag']
+        self.assertEqual(etag, (await sync_to_async(self.client.get)('/api/categories/'))['ETag'])
+        response = await assincronas.listar_categorias(self.requisicao('/api/categories/', **{'If-None-Match': etag}))
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    async def test_category_creation_goes_through_the_sync_view(self):
+        request = self.fabrica.post(
+            '/api/categories/', {'name': 'Nova', 'color': '#fff'}, content_type='application/json',
+            headers={'Authorization': f'Bearer {self.token}'},
+        )
+        response = await assincronas.listar_categorias(request)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertTrue(await Category.objects.filter(user=self.user, name='Nova').aexists())
+
+
+class AutenticacaoCacheTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='jwt@email.com', username='jwtuser', name='J', password='123456')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_user_is_loaded_once_and_dropped_on_save(self):
+        self.assertEqual(self.client.get('/api/transactions/summary/').status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get('/api/transactions/summary/').status_code, status.HTTP_200_OK)
+
+        self.user.name = 'Jota'
+        self.user.save()
+        with CaptureQueriesContext(connection) as consultas:
+            self.client.get('/api/transactions/summary/')
+        self.assertEqual(len([c for c in consultas if 'api_user' in c['sql']]), 1)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/transactions/summary/').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.user.delete()
+        self.assertEqual(self.client.get('/api/transactions/summary/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_cache_keeps_only_what_authentication_needs(self):
+        self.client.get('/api/transactions/summary/')
+        resumo = cache.get(f'usuario:{self.user.id}')
+        self.assertEqual(set(resumo), {'pk', 'is_active', 'credencial'})
+        self.assertNotIn(self.user.password, resumo.values())
+
+        # Os demais campos do usuário são lidos do banco só quando usados.
+        autenticacao = assincronas.JWTAuthenticationEmCache()
+        user = autenticacao.get_user(RefreshToken.for_user(self.user).access_token)
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, 'jwt@email.com')
+
+        avisos = [aviso.id for aviso in run_checks(tags=[Tags.caches], include_deployment_checks=True)]
+        self.assertIn('api.W001', avisos)
+        with override_settings(USUARIOS_CACHE_TIMEOUT=0):
+            avisos = [aviso.id for aviso in run_checks(tags=[Tags.caches], include_deployment_checks=True)]
+            self.assertNotIn('api.W001', avisos)
+
+
+@override_settings(DATABASE_REPLICAS=['sqlite'])
+class ReplicaLeituraTest(TestCase):
+    # A réplica é outro banco SQLite, vazio: o que for lido dela não tem as transações.
+    databases = {'default', 'sqlite'}
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = User.objects.create_user(email='replica@email.com', username='replicauser', name='R', password='123456')
+        self.client.force_authenticate(self.user)
+        self.transacao = Transaction.objects.create(
+            description='Mercado', value=40, transaction_type='expense', date=date.today(), user=self.user,
+        )
+        cache_modelos.invalidar(self.user.id)
+
+    def fim_da_janela(self):
+        cache.delete(f'escrita:recente:{self.user.id}')
+
+    def test_reads_go_to_the_replica_outside_the_write_window(self):
+        self.fim_da_janela()
+        leituras = [
+            ('/api/transactions/', {}, lambda r: r.data['count'] == 0),
+            ('/api/transactions/summary/', {}, lambda r: r.data['total_expense'] == 0),
+            (f'/api/transactions/{self.transacao.id}/', {}, lambda r: r.status_code == status.HTTP_404_NOT_FOUND),
+            ('/api/categorias/sugestoes/', {'q': 'mercado'}, lambda r: r.status_code == status.HTTP_200_OK),
+        ]
+        for url, parametros, esperado in leituras:
+            with CaptureQueriesContext(connections['sqlite']) as replica:
+                response = self.client.get(url, parametros)
+            self.assertTrue(replica.captured_queries, url)
+            self.assertTrue(esperado(response), url)
+
+        # Escritas e demais leituras continuam no principal.
+        response = self.client.post('/api/transactions/', {
+            'description': 'Padaria', 'value': '10', 'transaction_type': 'expense', 'date': date.today().isoformat(),
+        })
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 2)
+        self.transacao._state.db = 'sqlite'
+        self.assertEqual(router.db_for_write(Transaction, instance=self.transacao), 'default')
+
+    def test_replicas_require_a_cache_shared_between_workers(self):
+        erros = [erro.id for erro in run_checks(tags=[Tags.caches])]
+        self.assertIn('api.E001', erros)
+
+        diretorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, diretorio, ignore_errors=True)
+        compartilhado = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': diretorio}}
+        with override_settings(CACHES=compartilhado):
+            self.assertNotIn('api.E001', [erro.id for erro in run_checks(tags=[Tags.caches])])
+        with override_settings(DATABASE_REPLICAS=[]):
+            self.assertNotIn('api.E001', [erro.id for erro in run_checks(tags=[Tags.caches])])
+
+    def test_recent_writes_keep_the_user_reading_from_the_primary(self):
+        self.client.patch(f'/api/transactions/{self.transacao.id}/', {'value': '50'})
+        with CaptureQueriesContext(connections['sqlite']) as replica:
+            self.assertEqual(self.client.get('/api/transactions/').data['count'], 1)
+            self.assertEqual(self.client.get('/api/transactions/summary/').data['total_expense'], Decimal('50'))
+            self.assertEqual(self.client.get(f'/api/transactions/{self.transacao.id}/').status_code, status.HTTP_200_OK)
+        self.assertEqual(len(replica), 0)
+
+        outro = User.objects.create_user(email='replica2@email.com', username='replica2', name='S', password='123456')
+        with leitura_em_replica(outro.id), CaptureQueriesContext(connections['sqlite']) as replica:
+            self.assertFalse(Transaction.objects.filter(user=outro).exists())
+        self.assertEqual(len(replica), 1)
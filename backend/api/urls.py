@@ -1,6 +1,12 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CategoryViewSet, TransactionViewSet, sugerir_categorias, transaction_summary
+from . import assincronas
+from .views import (
+    CategoryViewSet, TransactionViewSet, autocompletar_descricoes, estatisticas_respostas, estatisticas_sugestoes,
+    exportar_transacoes, importacao_extrato, importar_extrato, retomar_importacao, sincronizar, sugerir_categorias,
+    sugerir_categorias_lote, transaction_summary,
+)
 
 
 router = DefaultRouter()
@@ -9,6 +15,23 @@ router.register(r'transactions', TransactionViewSet, basename='transaction')
 
 urlpatterns = [
     path("transactions/summary/", transaction_summary),
+    path("transactions/export/", exportar_transacoes),
+    path("transactions/autocomplete/", autocompletar_descricoes),
+    path("transactions/imports/", importar_extrato),
+    path("transactions/imports/<int:pk>/", importacao_extrato),
+    path("transactions/imports/<int:pk>/resume/", retomar_importacao),
     path('categorias/sugestoes/', sugerir_categorias),
+    path('categorias/sugestoes/lote/', sugerir_categorias_lote),
+    path('categorias/sugestoes/estatisticas/', estatisticas_sugestoes),
+    path('respostas/estatisticas/', estatisticas_respostas),
+    path('sync/', sincronizar),
     path('', include(router.urls)),
 ]
+
+if getattr(settings, 'VIEWS_ASSINCRONAS', False):
+    # Sob ASGI, as leituras mais frequentes são atendidas sem passar por threads de sync_to_async.
+    urlpatterns = [
+        path("transactions/summary/", assincronas.transaction_summary),
+        path('categorias/sugestoes/', assincronas.sugerir_categorias),
+        path('categories/', assincronas.listar_categorias),
+    ] + urlpatterns
@@ -1,5 +1,40 @@
+import hashlib
+import os
 import unicodedata
+from decimal import Decimal
 
 
 def normalizar(texto):
     return unicodedata.normalize('NFKD', texto).encode('ASCII', 'ignore').decode('utf-8').lower()
+
+
+def formato_do_arquivo(nome):
+    """
+    Identifica o formato de um extrato pela extensão do arquivo.
+
+    Parâmetros:
+        nome (str): Nome do arquivo.
+    Returns:
+        str: 'csv' ou 'ofx', ou None se a extensão não for reconhecida.
+    """
+    extensao = os.path.splitext(nome)[1].lower()
+    return {'.csv': 'csv', '.txt': 'csv', '.ofx': 'ofx', '.qfx': 'ofx'}.get(extensao)
+
+
+def fingerprint_transacao(data, valor, tipo, descricao_normalizada):
+    """
+    Calcula a impressão digital usada para reconhecer uma transação reimportada:
+    mesma data, valor, tipo e descrição normalizada geram o mesmo hash.
+
+    Parâmetros:
+        data (date | str): Data da transação.
+        valor (Decimal | str): Valor da transação.
+        tipo (str): 'income' ou 'expense'.
+        descricao_normalizada (str): Descrição já normalizada.
+    Returns:
+        str: Hash hexadecimal de 32 caracteres.
+    """
+    valor = Decimal(str(valor)).quantize(Decimal('0.01'))
+    chave = f'{data}|{valor}|{tipo}|{" ".join(descricao_normalizada.split())}'
+    return hashlib.sha256(chave.encode('utf-8')).hexdigest()[:32]
+
@@ -1,27 +1,63 @@
-from collections import defaultdict
-from django.db.models import Sum
-from rest_framework import generics, permissions, viewsets, filters
-from rest_framework.decorators import api_view, permission_classes
+from datetime import date
+
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils.http import parse_etags
+from rest_framework import generics, permissions, viewsets, filters, status
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from .serializers import UserSerializer, CategorySerializer, TransactionSerializer
-from .models import User, Category, Transaction
-from .utils import normalizar
+from .serializers import (
+    UserSerializer, CategorySerializer, TransactionSerializer, FiltroTransacoesSerializer, SugestaoLoteSerializer,
+    ResumoPeriodoSerializer, SincronizacaoSerializer, AutocompletarSerializer, StatementImportSerializer,
+    EnvioExtratoSerializer, categorias_do_lote,
+)
+from .autocompletar import obter_indice
+from .busca import buscar_transacoes, palavras_da_busca
+from .cache_respostas import cache_respostas
+from .exportacao import FORMATOS as FORMATOS_EXPORTACAO
+from .importacao import criar_importacao, processar_importacao
+from .lote import atualizar_transacoes, criar_transacoes, remover_transacoes, separar_duplicadas
+from .models import User, Category, StatementImport, Transaction
+from .paginacao import PaginacaoPorCursor
+from .resumos import resumo_do_periodo
+from .roteamento import leitura_em_replica
+from .sincronizacao import alteracoes_desde
+from .sugestoes import cache_modelos, sugerir_para_usuario
+
+
+def etag_confere(request, etag):
+    """
+    Returns:
+        bool: Se a ETag (ou `*`) foi enviada em If-None-Match (comparação fraca).
+    """
+    enviadas = {valor.removeprefix('W/') for valor in parse_etags(request.headers.get('If-None-Match', ''))}
+    return etag in enviadas or '*' in enviadas
 
 
-REGRAS_FIXAS = {
-    "Alimentação": ["mercado", "comida", "restaurante", "supermercado", "lanche", "almoço", "jantar", "café"],
-    "Transporte": ["uber", "gasolina", "ônibus", "metrô", "99", "moto", "bicicleta"],
-    "Saúde": ["farmácia", "remédio", "médico", "hospital", "dentista"],
-    "Roupas": ["roupa", "vestido", "calça", "camiseta", "camisa", "saia", "calção", "bermuda", "short",  "cueca", "calcinha", "sutiã", "roupa íntima"],
-    "Calçados": ["sapato", "tênis", "sandália", "chinelo", "bota", "botas", "sneaker", "tenis", "tenis de corrida", "tenis de caminhada", "tenis de corrida", "tenis de caminhada"],
-    "Lazer": ["cinema", "teatro", "show", "stand up"],
-    "Casa": ["aluguel", "condomínio", "água", "luz", "internet"],
-    "Outros": ["presente", "presente para alguém", "presente para mim", "presente para alguém", "presente para mim"],
-}
+def resposta_condicional(request, nome, parametros, gerar):
+    """
+    Responde 304 (sem corpo) quando a ETag enviada em If-None-Match ainda vale para o
+    usuário, sem executar as consultas nem serializar nada; caso contrário, gera a
+    resposta e a marca com a ETag atual.
+    
+    Parâmetros:
+        request (Request): Requisição autenticada.
+        nome (str): Nome do endpoint.
+        parametros (object): Parâmetros que alteram a resposta (serializáveis em JSON).
+        gerar (callable): Função que gera a resposta completa.
+    Returns:
+        Response: Resposta 304 ou a gerada.
+    """
+    etag = cache_respostas.etag(request.user.id, nome, parametros)
+    if etag_confere(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+    response = gerar()
+    if response.status_code == status.HTTP_200_OK:
+        response['ETag'] = etag
+    return response
 
 
 class CreateUserView(generics.CreateAPIView):
@@ -41,6 +77,21 @@ class CreateUserView(generics.CreateAPIView):
     permission_classes = [permissions.AllowAny]
 
 
+class BuscaNormalizadaFilter(filters.SearchFilter):
+    """
+    Busca sobre a descrição normalizada (sem acentos e em minúsculas), de modo que
+    "cafe" encontra "Café". No PostgreSQL, usa a busca textual indexada por GIN, com
+    cada palavra como prefixo e resultados ordenados por relevância (ver `api/busca.py`).
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        """
+        Returns:
+            QuerySet: Transações que contêm todas as palavras buscadas.
+        """
+        return buscar_transacoes(queryset, palavras_da_busca(request.query_params.get(self.search_param, '')))
+
+
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 20
     page_size_query_param = 'page_size'
@@ -68,12 +119,31 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """
-        Retorna apenas as categorias do usuário autenticado.
+        Retorna apenas as categorias do usuário autenticado, com os gastos do mês
+        atual anotados na mesma consulta.
         
         Returns:
             QuerySet: Categorias do usuário.
         """
-        return Category.objects.filter(user=self.request.user)
+        return Category.objects.filter(user=self.request.user).com_gastos_do_mes().order_by('id')
+
+    def list(self, request, *args, **kwargs):
+        """
+        Lista as categorias usando o cache de respostas do usuário, válido até a
+        próxima escrita em suas transações ou categorias (ou a virada do dia, que
+        pode mudar o mês dos gastos anotados). Responde 304 se a ETag do cliente vale.
+        
+        Returns:
+            Response: Página de categorias.
+        """
+        def calcular():
+            return super(CategoryViewSet, self).list(request, *args, **kwargs).data
+
+        parametros = {'query': sorted(request.query_params.lists()), 'hoje': date.today()}
+        return resposta_condicional(
+            request, 'categorias', parametros,
+            lambda: Response(cache_respostas.obter(request.user.id, 'categorias', parametros, calcular)),
+        )
 
     def perform_create(self, serializer):
         """
@@ -103,10 +173,36 @@ class TransactionViewSet(viewsets.ModelViewSet):
     serializer_class = TransactionSerializer
     permission_classes = [permissions.IsAuthenticated]
     pagination_class = StandardResultsSetPagination
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['description']
+    filter_backends = [BuscaNormalizadaFilter, filters.OrderingFilter]
+    search_fields = ['normalized_description']
     ordering_fields = ['date', 'value']
 
+    @property
+    def paginator(self):
+        """
+        Usa a paginação por cursor quando pedida (`?pagination=cursor`) ou ao seguir
+        um cursor; caso contrário, mantém a paginação por número de página.
+        """
+        if not hasattr(self, '_paginator'):
+            parametros = self.request.query_params
+            if parametros.get('pagination') == 'cursor' or 'cursor' in parametros:
+                self._paginator = PaginacaoPorCursor()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    def paginate_queryset(self, queryset):
+        """
+        Resultados da busca ordenados por relevância continuam paginados por número de
+        página mesmo com `?pagination=cursor`, pois a relevância não serve de chave; um
+        cursor recebido para essa ordenação é rejeitado.
+        """
+        if isinstance(self.paginator, PaginacaoPorCursor) and not self.paginator.aceita(queryset):
+            if 'cursor' in self.request.query_params:
+                raise NotFound('Cursor inválido.')
+            self._paginator = self.pagination_class()
+        return super().paginate_queryset(queryset)
+
     def get_queryset(self):
         """
         Retorna apenas as transações do usuário autenticado.
@@ -114,18 +210,37 @@ class TransactionViewSet(viewsets.ModelViewSet):
         Returns:
             QuerySet: Transações do usuário.
         """
-        queryset = Transaction.objects.filter(user=self.request.user)
-        # Filtros customizados
-        tipo = self.request.query_params.get('tipo')
-        categoria = self.request.query_params.get('categoria')
-        data = self.request.query_params.get('data')
-        if tipo:
-            queryset = queryset.filter(transaction_type=tipo)
-        if categoria:
-            queryset = queryset.filter(category__id=categoria)
-        if data:
-            queryset = queryset.filter(date=data)
-        return queryset
+        # category_name e category_color vêm do JOIN, sem uma consulta por transação.
+        queryset = Transaction.objects.filter(user=self.request.user).select_related('category')
+        # Filtros customizados, validados antes de chegar ao banco.
+        filtros = FiltroTransacoesSerializer.dos_parametros(self.request.query_params)
+        filtros.is_valid(raise_exception=True)
+        return filtros.filtrar(queryset)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Lista as transações, respondendo 304 se a ETag do cliente (If-None-Match)
+        ainda vale para a versão dos dados do usuário e os mesmos parâmetros.
+        A consulta vai para uma réplica de leitura, se houver.
+        
+        Returns:
+            Response: Página de transações.
+        """
+        with leitura_em_replica(request.user.id):
+            return resposta_condicional(
+                request, 'transacoes', sorted(request.query_params.lists()),
+                lambda: super(TransactionViewSet, self).list(request, *args, **kwargs),
+            )
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Retorna uma transação, lida de uma réplica de leitura se houver.
+        
+        Returns:
+            Response: Transação.
+        """
+        with leitura_em_replica(request.user.id):
+            return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         """
@@ -136,35 +251,99 @@ class TransactionViewSet(viewsets.ModelViewSet):
         """
         serializer.save(user=self.request.user)
 
+    LIMITE_LOTE = 500
 
-def sugestao_por_regras(descricao):
-    descricao = normalizar(descricao)
-    correspondencias = []
-    for categoria, palavras in REGRAS_FIXAS.items():
-        for palavra in palavras:
-            if normalizar(palavra) in descricao:
-                correspondencias.append(categoria)
-                break
-    return correspondencias[:3]
-
-
-def sugestao_por_similaridade(descricao, transacoes):
-    descricoes = [normalizar(t.description) for t in transacoes]
-    descricao_normalizada = normalizar(descricao)
-    categorias = [t.category.name for t in transacoes]
-
-    vectorizer = TfidfVectorizer()
-    tfidf_matrix = vectorizer.fit_transform(descricoes + [descricao_normalizada])
-    similaridades = cosine_similarity(tfidf_matrix[-1], tfidf_matrix[:-1])[0]
-
-    categoria_scores = defaultdict(float)
-    for i, score in enumerate(similaridades):
-        cat = categorias[i]
-        if score > categoria_scores[cat]:
-            categoria_scores[cat] = score
-
-    sugestoes_ordenadas = sorted(categoria_scores.items(), key=lambda x: x[1], reverse=True)
-    return [cat for cat, _ in sugestoes_ordenadas[:3]]
+    def _itens_do_lote(self, chave):
+        """
+        Returns:
+            list: Itens do corpo da requisição em `chave`.
+        Raises:
+            ValidationError: Se não houver uma lista com 1 a LIMITE_LOTE itens.
+        """
+        itens = self.request.data.get(chave) if hasattr(self.request.data, 'get') else None
+        if not isinstance(itens, list) or not itens:
+            raise ValidationError({chave: ['Envie uma lista não vazia.']})
+        if len(itens) > self.LIMITE_LOTE:
+            raise ValidationError({chave: [f'Envie no máximo {self.LIMITE_LOTE} itens por requisição.']})
+        return itens
+
+    def _transacoes_do_lote(self, ids, chave):
+        """
+        Carrega as transações do usuário pelos IDs em uma consulta.
+        
+        Returns:
+            dict: ID -> Transaction.
+        Raises:
+            ValidationError: Com os erros por posição, se algum ID for inválido, repetido ou inexistente.
+        """
+        validos = [i for i in ids if isinstance(i, int) and not isinstance(i, bool)]
+        transacoes = Transaction.objects.filter(user=self.request.user).select_related('category').in_bulk(validos)
+        erros = {}
+        vistos = set()
+        for posicao, i in enumerate(ids):
+            # Só inteiros chegam aos testes de pertinência: listas e objetos não são hashable.
+            if not isinstance(i, int) or isinstance(i, bool):
+                erros[posicao] = ['ID inválido.']
+                continue
+            if i not in transacoes:
+                erros[posicao] = ['Transação não encontrada.']
+                continue
+            if i in vistos:
+                erros[posicao] = ['Transação repetida no lote.']
+            vistos.add(i)
+        if erros:
+            raise ValidationError({chave: erros})
+        return transacoes
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request):
+        """
+        Cria (POST `itens`), edita parcialmente (PATCH `itens`, cada um com `id`) ou
+        remove (DELETE `ids`) várias transações em uma requisição. Os itens são
+        validados juntos, com as categorias carregadas em uma consulta; se algum for
+        inválido, nada é gravado e a resposta traz os erros por posição. Na criação,
+        `ignorar_duplicadas: true` pula os itens que já existem e informa suas posições.
+        
+        Parâmetros:
+            request (Request): Corpo com `itens` ou `ids`.
+        Returns:
+            Response: Transações criadas ou atualizadas, ou 204 na remoção.
+        """
+        if request.method == 'DELETE':
+            ids = self._itens_do_lote('ids')
+            transacoes = self._transacoes_do_lote(ids, 'ids')
+            remover_transacoes(request.user, list(transacoes.values()))
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        itens = self._itens_do_lote('itens')
+        contexto = {**self.get_serializer_context(), 'categorias': categorias_do_lote(itens)}
+
+        if request.method == 'POST':
+            serializer = TransactionSerializer(data=itens, many=True, context=contexto)
+            if not serializer.is_valid():
+                raise ValidationError({'itens': serializer.errors})
+            dados = serializer.validated_data
+            duplicadas = []
+            if request.data.get('ignorar_duplicadas') is True:
+                dados, duplicadas = separar_duplicadas(request.user, dados)
+            criadas = criar_transacoes(request.user, dados)
+            resposta = TransactionSerializer(criadas, many=True, context=contexto).data
+            return Response({'results': resposta, 'duplicadas': duplicadas}, status=status.HTTP_201_CREATED)
+
+        if not all(isinstance(item, dict) for item in itens):
+            raise ValidationError({'itens': ['Cada item deve ser um objeto com `id`.']})
+        transacoes = self._transacoes_do_lote([item.get('id') for item in itens], 'itens')
+        alteracoes = []
+        erros = {}
+        for posicao, item in enumerate(itens):
+            serializer = TransactionSerializer(transacoes[item['id']], data=item, partial=True, context=contexto)
+            if not serializer.is_valid():
+                erros[posicao] = serializer.errors
+            alteracoes.append((serializer.instance, serializer.validated_data))
+        if erros:
+            raise ValidationError({'itens': erros})
+        atualizadas = atualizar_transacoes(request.user, alteracoes)
+        return Response({'results': TransactionSerializer(atualizadas, many=True, context=contexto).data})
 
 
 @api_view(['GET'])
@@ -175,67 +354,216 @@ def sugerir_categorias(request):
     if not descricao:
         return Response([])
 
-    transacoes_usuario = Transaction.objects.filter(user=user).exclude(category=None)
+    with leitura_em_replica(user.id):
+        return Response(sugerir_para_usuario(user.id, [descricao])[0])
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def autocompletar_descricoes(request):
+    """
+    Completa a descrição digitada com as descrições já usadas pelo usuário que começam
+    por ela, das mais frequentes para as menos, com a categoria e o valor habituais.
+    Atendido pelo índice de prefixos em memória, sem consultar as transações.
+    
+    Parâmetros:
+        request (Request): Query params `q` (início da descrição) e `limit` (padrão: 5).
+    Returns:
+        Response: Lista com description, count, category, category_name e value.
+    """
+    serializer = AutocompletarSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    prefixo = serializer.validated_data['q']
+    if not prefixo.strip():
+        return Response([])
+    return Response(obter_indice(request.user.id).completar(prefixo, serializer.validated_data['limit']))
+
+
+@api_view(['POST'])
+def sugerir_categorias_lote(request):
+    """
+    Sugere categorias para várias descrições de uma vez (importações e fila offline do app).
+    
+    Parâmetros:
+        request (Request): Corpo com a lista `descricoes`.
+    Returns:
+        Response: Lista com as 3 categorias sugeridas para cada descrição, na mesma ordem.
+    """
+    serializer = SugestaoLoteSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    descricoes = [d.strip() for d in serializer.validated_data['descricoes']]
+
+    preenchidas = [d for d in descricoes if d]
+    with leitura_em_replica(request.user.id):
+        sugestoes = iter(sugerir_para_usuario(request.user.id, preenchidas) if preenchidas else [])
+    return Response([
+        {'descricao': d, 'sugestoes': next(sugestoes) if d else []}
+        for d in descricoes
+    ])
 
-    if transacoes_usuario.count() < 10:
-        regras = sugestao_por_regras(descricao)
-        similares = sugestao_por_similaridade(descricao, transacoes_usuario)
-        # Prioriza categorias que aparecem em ambos
-        ranking = []
 
-        # 1. Categorias que aparecem nas duas listas (mais relevantes)
-        for cat in similares:
-            if cat in regras and cat not in ranking:
-                ranking.append(cat)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def estatisticas_sugestoes(request):
+    """
+    Retorna os contadores do cache de modelos de sugestão (somente administradores).
 
-        # 2. Depois as mais parecidas (do histórico)
-        for cat in similares:
-            if cat not in ranking:
-                ranking.append(cat)
+    Returns:
+        Response: Acertos, falhas, taxa de acerto e ocupação do cache.
+    """
+    return Response(cache_modelos.estatisticas())
 
-        # 3. Por fim, as que vieram só das regras
-        for cat in regras:
-            if cat not in ranking:
-                ranking.append(cat)
 
-        # Retorna top 3
-        return Response(ranking[:3])
-    else:
-        similares = sugestao_por_similaridade(descricao, transacoes_usuario)
-        return Response(similares)
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def estatisticas_respostas(request):
+    """
+    Retorna os contadores do cache de respostas (somente administradores).
+
+    Returns:
+        Response: Acertos, falhas, taxa de acerto e backend do cache.
+    """
+    return Response(cache_respostas.estatisticas())
 
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def transaction_summary(request):
-    user = request.user
-
-    income = Transaction.objects.filter(user=user, transaction_type="income").aggregate(
-        total=Sum("value")
-    )["total"] or 0
+    """
+    Resume as transações do usuário em um período: totais, despesas por categoria e
+    a série de receitas, despesas e saldo por mês ou semana. Responde 304 se a ETag
+    do cliente (If-None-Match) ainda vale.
+    
+    Parâmetros:
+        request (Request): Query params opcionais `start`, `end` (AAAA-MM-DD) e
+            `granularity` ('month' ou 'week').
+    Returns:
+        Response: Totais, `by_category` e `series`.
+    """
+    serializer = ResumoPeriodoSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    parametros = serializer.validated_data
 
-    expense = Transaction.objects.filter(user=user, transaction_type="expense").aggregate(
-        total=Sum("value")
-    )["total"] or 0
+    def gerar():
+        resumo = cache_respostas.obter(
+            request.user.id, 'resumo', parametros,
+            lambda: resumo_do_periodo(request.user, parametros.get('start'), parametros.get('end'), parametros['granularity']),
+        )
+        return Response({**resumo, 'granularity': parametros['granularity']})
 
-    by_category_qs = (
-        Transaction.objects.filter(user=user, transaction_type="expense")
-        .values("category__name", "category__color")
-        .annotate(total=Sum("value"))
-    )
+    with leitura_em_replica(request.user.id):
+        return resposta_condicional(request, 'resumo', parametros, gerar)
 
-    by_category = [
-        {
-            "name": item["category__name"] or "Sem categoria",
-            "total": item["total"],
-            "color": item["category__color"] or "#ccc",
-        }
-        for item in by_category_qs
-    ]
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def sincronizar(request):
+    """
+    Sincronização incremental: retorna só as transações e categorias criadas ou
+    alteradas depois do token `since`, e os IDs das excluídas. Enquanto `has_more`
+    for verdadeiro, o cliente repete a chamada com o novo `token`.
+    
+    Parâmetros:
+        request (Request): Query param `since` (token da sincronização anterior; ausente na primeira).
+    Returns:
+        Response: `token`, `has_more`, `categories`, `transactions` e `deleted`.
+    """
+    serializer = SincronizacaoSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    alteracoes = alteracoes_desde(request.user, serializer.validated_data['since'])
+    contexto = {'request': request}
     return Response({
-        "total_income": income,
-        "total_expense": expense,
-        "balance": income - expense,
-        "by_category": by_category,
+        **alteracoes,
+        'categories': CategorySerializer(alteracoes['categories'], many=True, context=contexto).data,
+        'transactions': TransactionSerializer(alteracoes['transactions'], many=True, context=contexto).data,
     })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def importar_extrato(request):
+    """
+    Importa um extrato CSV ou OFX enviado em `arquivo` (multipart). O arquivo é lido
+    como fluxo e gravado em lotes; categorias ausentes são preenchidas pelas sugestões
+    confiáveis. A importação roda durante a requisição, por isso o tamanho do arquivo
+    é limitado (IMPORTACAO_TAMANHO_MAXIMO).
+    
+    Parâmetros:
+        request (Request): Arquivo `arquivo` e, opcionalmente, `formato` ('csv' ou 'ofx') e
+            `manter_duplicadas` (importa as linhas já existentes em vez de pulá-las).
+    Returns:
+        Response: Relatório da importação (linhas processadas, criadas e erros por linha).
+    """
+    serializer = EnvioExtratoSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    arquivo = serializer.validated_data['arquivo']
+    importacao = criar_importacao(
+        request.user, arquivo, arquivo.name, serializer.validated_data['formato'],
+        ignorar_duplicadas=not serializer.validated_data['manter_duplicadas'],
+    )
+    processar_importacao(importacao)
+    return Response(StatementImportSerializer(importacao).data, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def importacao_extrato(request, pk):
+    """
+    Retorna o andamento e o relatório de uma importação do usuário.
+    
+    Parâmetros:
+        request (Request): Requisição autenticada.
+        pk (int): ID da importação.
+    Returns:
+        Response: Situação, contadores e erros por linha.
+    """
+    importacao = get_object_or_404(StatementImport, pk=pk, user=request.user)
+    return Response(StatementImportSerializer(importacao).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def retomar_importacao(request, pk):
+    """
+    Retoma uma importação interrompida ou com falha a partir da última linha gravada.
+    
+    Parâmetros:
+        request (Request): Requisição autenticada.
+        pk (int): ID da importação.
+    Returns:
+        Response: Relatório atualizado, ou 400 se a importação já foi concluída.
+    """
+    importacao = get_object_or_404(StatementImport, pk=pk, user=request.user)
+    if importacao.status == 'done':
+        raise ValidationError({'status': ['A importação já foi concluída.']})
+    processar_importacao(importacao)
+    return Response(StatementImportSerializer(importacao).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def exportar_transacoes(request):
+    """
+    Exporta o histórico de transações do usuário como um fluxo, sem paginação: as
+    linhas são lidas do banco em lotes e enviadas à medida que são geradas.
+    
+    Parâmetros:
+        request (Request): Query params `formato` ('csv' ou 'ndjson', padrão csv) e os
+            mesmos filtros da listagem (`data_inicio`, `data_fim`, `tipo`, `categoria`...).
+    Returns:
+        StreamingHttpResponse: Arquivo CSV (no formato aceito pela importação) ou NDJSON.
+    """
+    formato = request.query_params.get('formato', 'csv')
+    if formato not in FORMATOS_EXPORTACAO:
+        raise ValidationError({'formato': ['Use csv ou ndjson.']})
+    filtros = FiltroTransacoesSerializer.dos_parametros(request.query_params)
+    filtros.is_valid(raise_exception=True)
+    gerar, tipo_conteudo = FORMATOS_EXPORTACAO[formato]
+
+    resposta = StreamingHttpResponse(
+        gerar(filtros.filtrar(Transaction.objects.filter(user=request.user))),
+        content_type=tipo_conteudo,
+    )
+    resposta['Content-Disposition'] = f'attachment; filename="transacoes-{date.today():%Y-%m-%d}.{formato}"'
+    return resposta
+
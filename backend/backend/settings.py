@@ -14,7 +14,7 @@ import os
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
-from decouple import config
+from decouple import Csv, config
 
 
 SECRET_KEY = config('SECRET_KEY')
@@ -39,7 +39,7 @@ ALLOWED_HOSTS = ['*']
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.autenticacao.JWTAuthenticationEmCache',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -114,6 +114,26 @@ DATABASES = {
     }
 }
 
+# Réplica de leitura do PostgreSQL (opcional): mesmo banco e credenciais, outro host.
+# Nos testes, espelha o banco principal.
+if config('DB_REPLICA_HOST', default=''):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': config('DB_REPLICA_HOST'),
+        'PORT': config('DB_REPLICA_PORT', default=DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+# Aliases de DATABASES usados como réplicas pelas leituras da listagem e do detalhe
+# de transações, do resumo e das sugestões (vazio: tudo no banco principal)
+DATABASE_REPLICAS = config(
+    'DATABASE_REPLICAS', default='replica' if 'replica' in DATABASES else '', cast=Csv(),
+)
+DATABASE_ROUTERS = ['api.roteamento.RoteadorReplicas']
+# Segundos, após cada escrita do usuário, em que suas leituras ficam no banco principal
+# (deve superar o atraso de replicação)
+REPLICAS_JANELA_ESCRITA = config('REPLICAS_JANELA_ESCRITA', default=5, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -160,3 +180,49 @@ CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOWS_CREDENTIALS = True
 
 AUTH_USER_MODEL = 'api.User'
+
+# Quantidade máxima de usuários com modelo de sugestão mantido em memória (LRU)
+SUGESTOES_CACHE_TAMANHO = config('SUGESTOES_CACHE_TAMANHO', default=256, cast=int)
+
+# Quantidade máxima de usuários com índice de autocompletar mantido em memória (LRU)
+AUTOCOMPLETAR_CACHE_TAMANHO = config('AUTOCOMPLETAR_CACHE_TAMANHO', default=256, cast=int)
+
+# Pasta dos artefatos dos modelos de sugestão, compartilhados entre workers via memory mapping
+# (vazio desativa a persistência e cada processo treina seus modelos em memória)
+SUGESTOES_ARTEFATOS_DIR = config('SUGESTOES_ARTEFATOS_DIR', default='')
+# Alterações acumuladas no diário de um modelo antes de o artefato ser regravado por inteiro
+SUGESTOES_DIARIO_MAXIMO = config('SUGESTOES_DIARIO_MAXIMO', default=100, cast=int)
+
+# Pasta onde os extratos enviados ficam guardados até o fim da importação (para permitir retomá-la)
+IMPORTACOES_DIR = config('IMPORTACOES_DIR', default=str(BASE_DIR / 'importacoes'))
+# Tamanho máximo, em bytes, do extrato enviado pela API, que é processado durante a
+# requisição (extratos maiores vão pelo comando importar_extrato)
+IMPORTACAO_TAMANHO_MAXIMO = config('IMPORTACAO_TAMANHO_MAXIMO', default=5 * 1024 * 1024, cast=int)
+
+# Cache das respostas de leitura (resumo e categorias): Redis se REDIS_URL estiver
+# definida (requer o pacote redis), senão memória local do processo
+REDIS_URL = config('REDIS_URL', default='')
+CACHES = {
+    'default': (
+        {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': REDIS_URL}
+        if REDIS_URL else
+        {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    ),
+}
+RESPOSTAS_CACHE_ALIAS = 'default'
+# Validade das respostas em cache, em segundos (a invalidação por escrita é imediata)
+RESPOSTAS_CACHE_TIMEOUT = config('RESPOSTAS_CACHE_TIMEOUT', default=86400, cast=int)
+# Validade, em segundos, das respostas e ETags sem REDIS_URL: a memória local não é
+# compartilhada e um worker só vê as escritas atendidas por outro quando elas expiram
+RESPOSTAS_CACHE_TIMEOUT_LOCAL = config('RESPOSTAS_CACHE_TIMEOUT_LOCAL', default=30, cast=int)
+# Validade, em segundos, do usuário guardado pela autenticação JWT (salvar o usuário o descarta na hora)
+USUARIOS_CACHE_TIMEOUT = config('USUARIOS_CACHE_TIMEOUT', default=60, cast=int)
+
+# Idade mínima, em segundos, de uma alteração para entrar na sincronização incremental:
+# deve superar a duração das transações do banco, que podem confirmar registros com IDs
+# menores depois de outros já lidos
+SINCRONIZACAO_JANELA = config('SINCRONIZACAO_JANELA', default=5, cast=int)
+
+# Atende o resumo, as sugestões de categoria e a listagem de categorias com views
+# assíncronas nativas (ative ao servir a aplicação por ASGI, via backend.asgi)
+VIEWS_ASSINCRONAS = config('VIEWS_ASSINCRONAS', default=False, cast=bool)
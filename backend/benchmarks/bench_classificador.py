@@ -0,0 +1,121 @@
+"""
+Compara, em histórico sintético, o classificador incremental com a similaridade
+TF-IDF (reajustada a cada requisição, como antes do cache, e ajustada uma única vez).
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.bench_classificador
+"""
+import random
+import time
+from collections import defaultdict
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+from api.classificador import ClassificadorIncremental
+from api.utils import normalizar
+
+
+CATEGORIAS = {
+    'Alimentação': ['mercado', 'padaria', 'restaurante', 'lanche', 'pizza', 'ifood', 'açougue', 'feira'],
+    'Transporte': ['uber', 'gasolina', 'ônibus', 'metrô', 'estacionamento', 'pedágio', '99', 'oficina'],
+    'Saúde': ['farmácia', 'remédio', 'consulta', 'exame', 'dentista', 'plano', 'academia', 'vacina'],
+    'Casa': ['aluguel', 'condomínio', 'luz', 'água', 'internet', 'gás', 'faxina', 'reforma'],
+    'Lazer': ['cinema', 'show', 'netflix', 'spotify', 'viagem', 'hotel', 'bar', 'jogo'],
+    'Educação': ['curso', 'livro', 'faculdade', 'escola', 'material', 'udemy', 'idiomas', 'apostila'],
+}
+RUIDO = ['do', 'da', 'no', 'centro', 'bairro', 'pix', 'cartão', 'mensal', 'semana', 'loja', 'online', 'sao', 'joao']
+
+
+def gerar(n, semente):
+    aleatorio = random.Random(semente)
+    nomes = list(CATEGORIAS)
+    linhas = []
+    for _ in range(n):
+        categoria = aleatorio.choice(nomes)
+        palavras = aleatorio.sample(CATEGORIAS[categoria], 1) + aleatorio.sample(RUIDO, aleatorio.randint(1, 3))
+        if aleatorio.random() < 0.15:
+            # Descrições ambíguas: uma palavra de outra categoria.
+            palavras.append(aleatorio.choice(CATEGORIAS[aleatorio.choice(nomes)]))
+        aleatorio.shuffle(palavras)
+        linhas.append((' '.join(palavras), categoria))
+    return linhas
+
+
+def tfidf_reajustado(descricao, historico):
+    """Implementação anterior ao cache: reajusta o TF-IDF a cada consulta."""
+    descricoes = [normalizar(d) for d, _ in historico]
+    categorias = [c for _, c in historico]
+    matriz = TfidfVectorizer().fit_transform(descricoes + [normalizar(descricao)])
+    similaridades = cosine_similarity(matriz[-1], matriz[:-1])[0]
+    scores = defaultdict(float)
+    for categoria, score in zip(categorias, similaridades):
+        if score > scores[categoria]:
+            scores[categoria] = score
+    return [c for c, _ in sorted(scores.items(), key=lambda x: x[1], reverse=True)[:3]]
+
+
+class TfidfAjustado:
+    """Similaridade TF-IDF ajustada uma vez (modelo mantido em cache)."""
+
+    def __init__(self, historico):
+        indices = {}
+        self.codigos = np.array([indices.setdefault(c, len(indices)) for _, c in historico])
+        self.categorias = list(indices)
+        self.vectorizer = TfidfVectorizer()
+        self.matriz = self.vectorizer.fit_transform([normalizar(d) for d, _ in historico])
+
+    def sugerir(self, descricao):
+        similaridades = (self.matriz @ self.vectorizer.transform([normalizar(descricao)]).T).toarray().ravel()
+        scores = np.zeros(len(self.categorias))
+        np.maximum.at(scores, self.codigos, similaridades)
+        return [self.categorias[i] for i in np.argsort(-scores, kind='stable')[:3]]
+
+
+def medir(sugerir, consultas):
+    inicio = time.perf_counter()
+    resultados = [sugerir(d) for d, _ in consultas]
+    latencia = (time.perf_counter() - inicio) / len(consultas) * 1000
+    top1 = np.mean([bool(r) and r[0] == c for r, (_, c) in zip(resultados, consultas)])
+    top3 = np.mean([c in r for r, (_, c) in zip(resultados, consultas)])
+    return latencia, top1, top3
+
+
+def main():
+    consultas = gerar(200, semente=1)
+    ids = {nome: i for i, nome in enumerate(CATEGORIAS)}
+    nomes = {i: nome for nome, i in ids.items()}
+    print(f"{'histórico':>10} {'modelo':<22} {'ms/consulta':>12} {'top-1':>7} {'top-3':>7} {'ms/escrita':>11}")
+    for tamanho in (100, 1000, 10000):
+        historico = gerar(tamanho, semente=tamanho)
+
+        modelos = []
+        if tamanho <= 1000:
+            modelos.append(('TF-IDF reajustado', lambda d: tfidf_reajustado(d, historico), None))
+
+        inicio = time.perf_counter()
+        ajustado = TfidfAjustado(historico)
+        escrita_tfidf = (time.perf_counter() - inicio) * 1000
+        modelos.append(('TF-IDF em cache', ajustado.sugerir, escrita_tfidf))
+
+        # Descrições do histórico normalizadas uma vez (Transaction.normalized_description);
+        # a consulta é normalizada a cada requisição.
+        normalizado = [(normalizar(d), c) for d, c in historico]
+        incremental = ClassificadorIncremental()
+        incremental.aprender([d for d, _ in normalizado], [ids[c] for _, c in normalizado], nomes)
+        inicio = time.perf_counter()
+        for descricao, categoria in normalizado[:100]:
+            incremental.aprender([descricao], [ids[categoria]], nomes)
+            incremental.sugerir(descricao)
+        escrita_incremental = (time.perf_counter() - inicio) / 100 * 1000
+        modelos.append(('incremental (NB)', lambda d: incremental.sugerir(normalizar(d)), escrita_incremental))
+
+        for nome, sugerir, escrita in modelos:
+            latencia, top1, top3 = medir(sugerir, consultas)
+            escrita = f'{escrita:11.2f}' if escrita is not None else f"{'-':>11}"
+            print(f'{tamanho:>10} {nome:<22} {latencia:12.3f} {top1:7.1%} {top3:7.1%} {escrita}')
+
+
+if __name__ == '__main__':
+    main()
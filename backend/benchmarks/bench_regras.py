@@ -0,0 +1,61 @@
+"""
+Microbenchmark do casamento de palavras-chave: laço original x MatcherRegras.
+
+Uso (a partir da pasta backend):
+    python -m benchmarks.bench_regras
+"""
+import os
+import timeit
+
+import django
+
+# `api.regras` importa os models: o Django precisa estar configurado antes.
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+django.setup()
+
+from api.regras import REGRAS_FIXAS, matcher_global, sugestao_por_regras
+from api.utils import normalizar
+
+
+DESCRICOES = [
+    "Almoço no restaurante do centro",
+    "Uber para o aeroporto",
+    "Farmácia São João - remédio",
+    "Tênis de corrida e camiseta",
+    "Pagamento do aluguel e condomínio",
+    "Presente para mim",
+    "Transferência recebida",
+    "Ingresso de cinema com pipoca",
+]
+
+
+def sugestao_por_regras_laco(descricao):
+    """Implementação anterior: normaliza cada palavra-chave a cada chamada."""
+    descricao = normalizar(descricao)
+    correspondencias = []
+    for categoria, palavras in REGRAS_FIXAS.items():
+        for palavra in palavras:
+            if normalizar(palavra) in descricao:
+                correspondencias.append(categoria)
+                break
+    return correspondencias[:3]
+
+
+def medir(funcao, repeticoes=2000):
+    tempo = min(timeit.repeat(lambda: [funcao(d) for d in DESCRICOES], number=repeticoes, repeat=5))
+    return tempo / (repeticoes * len(DESCRICOES)) * 1e6
+
+
+def main():
+    for descricao in DESCRICOES:
+        assert set(sugestao_por_regras_laco(descricao)) <= set(matcher_global.pontuar(normalizar(descricao))), descricao
+
+    laco = medir(sugestao_por_regras_laco)
+    matcher = medir(sugestao_por_regras)
+    print(f"laço original:  {laco:8.2f} µs/descrição")
+    print(f"MatcherRegras:  {matcher:8.2f} µs/descrição")
+    print(f"ganho:          {laco / matcher:8.1f}x")
+
+
+if __name__ == '__main__':
+    main()